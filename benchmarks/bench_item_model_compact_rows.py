@@ -0,0 +1,116 @@
+"""
+Memory and access speed benchmark of MTableModel rows.
+Compare dict rows with the compact __slots__ rows made by make_row_class.
+
+Usage:
+    python benchmarks/bench_item_model_compact_rows.py [row_count]
+"""
+
+# Import built-in modules
+import gc
+import sys
+import time
+import timeit
+import tracemalloc
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model import make_row_class
+from dayu_widgets.utils import get_obj_value
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True},
+    {"label": "Status", "key": "status"},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+    {"label": "Size", "key": "size"},
+    {"label": "Artist", "key": "artist"},
+]
+STATUS_LIST = ["wait", "render", "done", "failed"]
+ARTIST_LIST = ["ann", "bob", "cat"]
+KEY_LIST = ["name", "status", "frames", "size", "artist"]
+
+
+def make_value_list(row_count):
+    """The cell values, shared by both kinds of rows, so only the row objects are measured."""
+    return [
+        ("shot_{}".format(i), STATUS_LIST[i % 4], i % 240, i * 0.5, ARTIST_LIST[i % 3]) for i in range(row_count)
+    ]
+
+
+def measure(build):
+    """Run build and get its result, the traced memory it keeps and the time."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    duration = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size, duration
+
+
+def access(model, row_count, number):
+    """The data() calls of a view painting the visible cells, spread over the whole model."""
+    step = max(1, row_count // 1000)
+    index_list = [model.index(row, column) for row in range(0, row_count, step) for column in range(5)]
+    role = int(QtCore.Qt.DisplayRole)
+    cost = min(timeit.repeat(lambda: [model.data(index, role) for index in index_list], number=number, repeat=3))
+    return cost / number / len(index_list) * 1e9
+
+
+def main(row_count=500000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    row_class = make_row_class(HEADER_LIST)
+
+    value_list = make_value_list(row_count)
+    dict_list, dict_size, dict_time = measure(lambda: [dict(zip(KEY_LIST, values)) for values in value_list])
+    compact_list, compact_size, convert_time = measure(lambda: row_class.from_dict_list(dict_list))
+    print("{} rows, {} fields".format(row_count, len(row_class.__slots__)))
+    print(
+        "memory      dict rows {:7.1f} MB ({:5.0f} B/row)   compact rows {:7.1f} MB ({:5.0f} B/row)   "
+        "{:.1f}x smaller".format(
+            dict_size / 1e6,
+            dict_size / row_count,
+            compact_size / 1e6,
+            compact_size / row_count,
+            dict_size / float(compact_size),
+        )
+    )
+    print("build       dict rows {:7.2f} s    from_dict_list {:7.2f} s".format(dict_time, convert_time))
+
+    dict_model = MTableModel()
+    dict_model.set_header_list(HEADER_LIST)
+    dict_model.set_data_list(dict_list)
+    compact_model = MTableModel()
+    compact_model.set_header_list(HEADER_LIST)
+    compact_model.set_row_class(row_class)
+    compact_model.set_data_list(compact_list)
+    print(
+        "data()      dict rows {:7.0f} ns/cell   compact rows {:7.0f} ns/cell".format(
+            access(dict_model, row_count, 20), access(compact_model, row_count, 20)
+        )
+    )
+
+    # EditRole 没有 formatter，就是取值本身
+    getter = compact_model.row_class_role_list[1][int(QtCore.Qt.EditRole)]
+    dict_getter = dict_model.get_cell_getter(1, QtCore.Qt.EditRole)
+    sample_dict_list = dict_list[:100000]
+    sample_compact_list = compact_list[:100000]
+    print(
+        "get value   get_obj_value {:5.0f} ns   dict getter {:5.0f} ns   compact getter {:5.0f} ns".format(
+            min(timeit.repeat(lambda: [get_obj_value(row, "status") for row in sample_dict_list], number=1, repeat=3))
+            * 1e4,
+            min(timeit.repeat(lambda: [dict_getter(row) for row in sample_dict_list], number=1, repeat=3)) * 1e4,
+            min(timeit.repeat(lambda: [getter(row) for row in sample_compact_list], number=1, repeat=3)) * 1e4,
+        )
+    )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
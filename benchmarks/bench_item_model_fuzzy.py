@@ -0,0 +1,71 @@
+"""
+Fuzzy search benchmark of MSortFilterModel over a big MTableModel of shot names.
+It types a fuzzy pattern key by key and reports the time of each keystroke, and the part spent scoring the rows.
+
+Usage:
+    python benchmarks/bench_item_model_fuzzy.py [row_count] [pattern] [top_k]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Artist", "key": "artist"},
+]
+TASK_LIST = ["comp", "lgt", "anim", "fx", "lay"]
+
+
+def main(row_count=200000, pattern="sh10cmp", top_k=500):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "sh{:04d}_{}_v{:03d}".format(i // 50, TASK_LIST[i % 5], i % 10), "artist": "ann"}
+            for i in range(row_count)
+        ]
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.set_fuzzy_search(True, top_k)
+    proxy_model.rowCount()
+    # 文字缓存不计入
+    proxy_model._get_root_text_list()
+    print("{} rows, top {}".format(row_count, top_k))
+
+    score_time = [0.0]
+    fuzzy_filter_mask = proxy_model._fuzzy_filter_mask
+
+    def _timed_fuzzy_filter_mask():
+        start = time.perf_counter()
+        result = fuzzy_filter_mask()
+        score_time[0] += time.perf_counter() - start
+        return result
+
+    proxy_model._fuzzy_filter_mask = _timed_fuzzy_filter_mask
+    for size in range(1, len(pattern) + 1):
+        score_time[0] = 0.0
+        start = time.perf_counter()
+        proxy_model.set_search_pattern(pattern[:size])
+        cost = time.perf_counter() - start
+        print(
+            "{:10s} total {:7.0f} ms   scoring {:6.0f} ms   {:4d} rows, best {}".format(
+                pattern[:size], cost * 1e3, score_time[0] * 1e3, proxy_model.rowCount(), proxy_model.index(0, 0).data()
+            )
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
@@ -0,0 +1,124 @@
+"""
+Micro benchmark of MTableModel data() and flags() dispatch.
+Compare the compiled header_list dispatch with the old per call header_list lookup.
+
+Usage:
+    python benchmarks/bench_item_model_header.py [row_count]
+"""
+
+# Import built-in modules
+import sys
+import timeit
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import DEFAULT_ROLE_LIST
+from dayu_widgets.item_model import SETTING_MAP
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.utils import apply_formatter
+from dayu_widgets.utils import get_obj_value
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True, "searchable": True, "icon": "user_fill.svg"},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x), "alignment": "right"},
+    {"label": "Status", "key": "status", "color": lambda x, y: "#ff4d4f" if x == "failed" else "#52c41a"},
+    {"label": "Size", "key": "size", "bg_color": "#262626", "tooltip": lambda x, y: "{:.1f} MB".format(x)},
+]
+
+# Qt passes the roles as int to data()
+ROLE_LIST = [
+    int(role)
+    for role in (
+        QtCore.Qt.DisplayRole,
+        QtCore.Qt.DecorationRole,
+        QtCore.Qt.ForegroundRole,
+        QtCore.Qt.BackgroundRole,
+        QtCore.Qt.ToolTipRole,
+        QtCore.Qt.TextAlignmentRole,
+        QtCore.Qt.CheckStateRole,
+    )
+]
+
+
+def legacy_data(model, index, role):
+    """The data() dispatch before compiling header_list, kept here as the baseline."""
+    data_obj = index.internalPointer()
+    attr_dict = model.header_list[index.column()]
+    attr = attr_dict.get("key")
+    if role in SETTING_MAP.keys():
+        formatter_from_config = attr_dict.get(SETTING_MAP[role].get("config"))
+        if not formatter_from_config and role not in DEFAULT_ROLE_LIST:
+            return None
+        value = apply_formatter(formatter_from_config, get_obj_value(data_obj, attr), data_obj)
+        return apply_formatter(SETTING_MAP[role].get("formatter", None), value)
+    if role == QtCore.Qt.CheckStateRole and attr_dict.get("checkable", False):
+        state = get_obj_value(data_obj, attr + "_checked")
+        return QtCore.Qt.Unchecked if state is None else state
+    return None
+
+
+def legacy_flags(model, index):
+    result = QtCore.QAbstractItemModel.flags(model, index)
+    for config, flag in (
+        ("checkable", QtCore.Qt.ItemIsUserCheckable),
+        ("selectable", QtCore.Qt.ItemIsEditable),
+        ("editable", QtCore.Qt.ItemIsEditable),
+        ("draggable", QtCore.Qt.ItemIsDragEnabled),
+        ("droppable", QtCore.Qt.ItemIsDropEnabled),
+    ):
+        if model.header_list[index.column()].get(config, False):
+            result |= flag
+    return QtCore.Qt.ItemFlags(result)
+
+
+def main(row_count=2000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "shot_{:04d}".format(i), "frames": i * 10, "status": "failed" if i % 7 else "done", "size": i * 0.5}
+            for i in range(row_count)
+        ]
+    )
+    index_list = [model.index(row, column) for row in range(row_count) for column in range(len(HEADER_LIST))]
+
+    def run_compiled_data():
+        for index in index_list:
+            for role in ROLE_LIST:
+                model.data(index, role)
+
+    def run_legacy_data():
+        for index in index_list:
+            for role in ROLE_LIST:
+                legacy_data(model, index, role)
+
+    def run_compiled_flags():
+        for index in index_list:
+            model.flags(index)
+
+    def run_legacy_flags():
+        for index in index_list:
+            legacy_flags(model, index)
+
+    call_count = len(index_list) * len(ROLE_LIST)
+    for name, legacy, compiled, count in (
+        ("data()", run_legacy_data, run_compiled_data, call_count),
+        ("flags()", run_legacy_flags, run_compiled_flags, len(index_list)),
+    ):
+        legacy_time = min(timeit.repeat(legacy, number=1, repeat=3))
+        compiled_time = min(timeit.repeat(compiled, number=1, repeat=3))
+        print(
+            "{:<8} {:>8} calls  legacy {:7.1f} ms  compiled {:7.1f} ms  speedup x{:.1f}".format(
+                name, count, legacy_time * 1000, compiled_time * 1000, legacy_time / compiled_time
+            )
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
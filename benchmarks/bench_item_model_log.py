@@ -0,0 +1,92 @@
+"""
+Streaming benchmark of MTableModel log rows in MTableView.
+Rows are appended one by one at a fixed rate, with and without set_max_rows,
+and it reports the rows shown per second and the event loop stalls.
+
+Usage:
+    python benchmarks/bench_item_model_log.py [rows_per_second] [seconds]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [
+    {"label": "Time", "key": "time", "width": 120},
+    {"label": "Level", "key": "level", "color": lambda x, y: "#ff4d4f" if x == "error" else None},
+    {"label": "Host", "key": "host"},
+    {"label": "Message", "key": "message", "width": 300},
+]
+LEVEL_LIST = ["debug", "info", "warning", "error"]
+
+
+def stream(app, max_rows, rows_per_second, seconds):
+    """Append the rows for the given seconds, return the shown rows per second and the event loop gaps."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    if max_rows:
+        model.set_max_rows(max_rows)
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    view = MTableView()
+    view.setSortingEnabled(False)
+    view.setModel(proxy_model)
+    view.set_header_list(HEADER_LIST)
+    view.set_auto_scroll(True)
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+
+    shown_list = [0]
+    model.rowsInserted.connect(lambda parent, first, last: shown_list.__setitem__(0, shown_list[0] + last - first + 1))
+    gap_list = []
+    start = last = time.perf_counter()
+    sent = 0
+    while last - start < seconds:
+        now = time.perf_counter()
+        gap_list.append(now - last)
+        last = now
+        # 按时间补齐应该发送的行，模拟一个持续写日志的数据源
+        for row in range(sent, int((now - start) * rows_per_second)):
+            model.append(
+                {
+                    "time": row,
+                    "level": LEVEL_LIST[row % 4],
+                    "host": "farm{:03d}".format(row % 97),
+                    "message": "frame {} rendered".format(row),
+                }
+            )
+        sent = max(sent, int((now - start) * rows_per_second))
+        app.processEvents(QtCore.QEventLoop.AllEvents, 5)
+    model.flush_rows()
+    duration = time.perf_counter() - start
+    view.close()
+    gap_list.sort()
+    return shown_list[0] / duration, sent / duration, gap_list[int(len(gap_list) * 0.95)], gap_list[-1]
+
+
+def main(rows_per_second=10000, seconds=3):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    for name, max_rows in (("append", None), ("max_rows", 20000)):
+        shown, sent, gap_95, gap_max = stream(app, max_rows, rows_per_second, seconds)
+        print(
+            "{:10s} sent {:7.0f} rows/s  shown {:7.0f} rows/s   loop gap p95 {:6.1f} ms  max {:6.1f} ms".format(
+                name, sent, shown, gap_95 * 1e3, gap_max * 1e3
+            )
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
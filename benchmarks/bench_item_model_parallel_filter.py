@@ -0,0 +1,86 @@
+"""
+Parallel filter benchmark of MSortFilterModel over a big MTableModel.
+The same patterns are matched in filterAcceptsRow, then in a ThreadPoolExecutor and a ProcessPoolExecutor
+with set_filter_executor. It reports how long set_search_pattern blocks the main thread,
+and the total time until the proxy is filtered.
+
+Usage:
+    python benchmarks/bench_item_model_parallel_filter.py [row_count] [chunk_size]
+"""
+
+# Import built-in modules
+import concurrent.futures
+import os
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status", "searchable": True},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+    {"label": "Artist", "key": "artist", "searchable": True},
+]
+STATUS_LIST = ["wait", "render", "done", "failed"]
+ARTIST_LIST = ["ann", "bob", "cat"]
+PATTERN_LIST = ["shot_12", "re.*er", "ann", "shot_9"]
+
+
+def run(app, model, executor, chunk_size):
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.rowCount()
+    proxy_model.set_filter_executor(executor, chunk_size)
+    applied_list = []
+    proxy_model.sig_filter_applied.connect(lambda: applied_list.append(time.perf_counter()))
+    result_list = []
+    for pattern in PATTERN_LIST:
+        del applied_list[:]
+        start = time.perf_counter()
+        proxy_model.set_search_pattern(pattern)
+        blocked = time.perf_counter() - start
+        while executor is not None and not applied_list:
+            app.processEvents()
+            time.sleep(0.001)
+        total = (applied_list[0] if applied_list else time.perf_counter()) - start
+        result_list.append((pattern, blocked, total, proxy_model.rowCount()))
+    return result_list
+
+
+def main(row_count=200000, chunk_size=20000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "shot_{}".format(i), "status": STATUS_LIST[i % 4], "frames": i % 240, "artist": ARTIST_LIST[i % 3]}
+            for i in range(row_count)
+        ]
+    )
+    print("{} rows, {} cpus".format(row_count, os.cpu_count()))
+    thread_executor = concurrent.futures.ThreadPoolExecutor()
+    process_executor = concurrent.futures.ProcessPoolExecutor()
+    for name, executor in (("serial", None), ("thread", thread_executor), ("process", process_executor)):
+        result_list = run(app, model, executor, chunk_size)
+        print(
+            "{:8s} ".format(name)
+            + "  ".join(
+                "{!r}: blocked {:.0f}ms total {:.0f}ms/{}".format(pattern, blocked * 1e3, total * 1e3, count)
+                for pattern, blocked, total, count in result_list
+            )
+        )
+    thread_executor.shutdown()
+    process_executor.shutdown()
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,61 @@
+"""
+Query benchmark of MSortFilterModel over a big MTableModel.
+It applies each query with set_query and reports the time until the proxy has filtered the rows,
+the first query also reads the raw value columns of the model.
+
+Usage:
+    python benchmarks/bench_item_model_query.py [row_count]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status"},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+    {"label": "Artist", "key": "artist"},
+]
+STATUS_LIST = ["wait", "render", "done", "failed"]
+ARTIST_LIST = ["ann", "bob", "cat"]
+QUERY_LIST = [
+    "frames > 200 and status:failed and artist in (ann, bob)",
+    "frames:10..20 or status = done",
+    "not status:wait -artist:cat",
+    "shot_12 frames < 100",
+]
+
+
+def main(row_count=500000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "shot_{}".format(i), "status": STATUS_LIST[i % 4], "frames": i % 240, "artist": ARTIST_LIST[i % 3]}
+            for i in range(row_count)
+        ]
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    print("{} rows".format(row_count))
+    for query in QUERY_LIST:
+        start = time.perf_counter()
+        proxy_model.set_query(query)
+        count = proxy_model.rowCount()
+        print("{:60s} {:6.0f} ms {:8d} rows".format(query, (time.perf_counter() - start) * 1e3, count))
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
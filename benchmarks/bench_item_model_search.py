@@ -0,0 +1,63 @@
+"""
+Search benchmark of MSortFilterModel over a big MTableModel.
+It types a search pattern key by key, like the search box of MItemViewSet, and reports the time of each keystroke.
+
+Usage:
+    python benchmarks/bench_item_model_search.py [row_count] [pattern]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status", "searchable": True},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+    {"label": "Artist", "key": "artist", "searchable": True},
+]
+STATUS_LIST = ["wait", "render", "done", "failed"]
+ARTIST_LIST = ["ann", "bob", "cat"]
+
+
+def main(row_count=500000, pattern="shot_12"):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "shot_{}".format(i), "status": STATUS_LIST[i % 4], "frames": i % 240, "artist": ARTIST_LIST[i % 3]}
+            for i in range(row_count)
+        ]
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    print("{} rows".format(row_count))
+
+    # 输入再删除，第二轮的每个前缀都已经有缓存的文字
+    text_list = [pattern[:size] for size in range(1, len(pattern) + 1)]
+    text_list += text_list[-2::-1] + [""]
+    for name in ("first", "again"):
+        result_list = []
+        for text in text_list:
+            start = time.perf_counter()
+            proxy_model.set_search_pattern(text)
+            result_list.append((time.perf_counter() - start, text, proxy_model.rowCount()))
+        print(
+            "{:6s} " .format(name)
+            + "  ".join("{!r}:{:.0f}ms/{}".format(text, cost * 1e3, count) for cost, text, count in result_list)
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) if arg.isdigit() else arg for arg in sys.argv[1:]])
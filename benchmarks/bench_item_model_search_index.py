@@ -0,0 +1,91 @@
+"""
+Search index benchmark of MSortFilterModel over a big MTableModel of asset names.
+It reports the build time of the trigram index, the time of find_source_rows compared with a scan of the
+cached texts, and the time of set_search_pattern with and without the index.
+
+Usage:
+    python benchmarks/bench_item_model_search_index.py [row_count]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Type", "key": "type", "searchable": True},
+    {"label": "Size", "key": "size"},
+]
+TYPE_LIST = ["character", "prop", "environment", "vehicle", "fx"]
+PATTERN_LIST = ["char_00012", "prop_0042", "envi_0019999", "vehic", "fx_00001"]
+
+
+def make_proxy_model(model, indexed):
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.rowCount()
+    if indexed:
+        proxy_model.set_search_index(True)
+    return proxy_model
+
+
+def main(row_count=1000000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {
+                "name": "{}_{:07d}".format(TYPE_LIST[i % 5][:4], i // 5),
+                "type": TYPE_LIST[i % 5],
+                "size": i % 1000,
+            }
+            for i in range(row_count)
+        ]
+    )
+    print("{} rows".format(row_count))
+    proxy_model = make_proxy_model(model, True)
+    start = time.perf_counter()
+    while proxy_model.search_index is None:
+        app.processEvents()
+        time.sleep(0.001)
+    print("index built in {:.2f} s, main thread texts included".format(time.perf_counter() - start))
+
+    text_list = proxy_model._get_root_text_list()
+    for pattern in PATTERN_LIST:
+        start = time.perf_counter()
+        row_list = proxy_model.find_source_rows(pattern)
+        index_time = time.perf_counter() - start
+        start = time.perf_counter()
+        scan_list = [row for row, row_text in enumerate(text_list) if pattern in row_text[0]]
+        scan_time = time.perf_counter() - start
+        assert row_list == scan_list
+        print(
+            "{!r:12s} index {:7.2f} ms   scan {:7.2f} ms   {} rows".format(
+                pattern, index_time * 1e3, scan_time * 1e3, len(row_list)
+            )
+        )
+
+    plain_model = make_proxy_model(model, False)
+    for name, each_model in (("scan", plain_model), ("index", proxy_model)):
+        result_list = []
+        for pattern in PATTERN_LIST:
+            start = time.perf_counter()
+            each_model.set_search_pattern(pattern)
+            result_list.append("{!r}:{:.0f}ms".format(pattern, (time.perf_counter() - start) * 1e3))
+            each_model.set_search_pattern("")
+        print("set_search_pattern {:6s} {}".format(name, "  ".join(result_list)))
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
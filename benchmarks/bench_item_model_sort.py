@@ -0,0 +1,73 @@
+"""
+Sort benchmark of MSortFilterModel over a big MColumnTableModel.
+It compares the sort of QSortFilterProxyModel, which calls lessThan for each comparison, on a smaller model,
+with set_sort_source_in_place, where the order is computed from the cached natural sort keys
+and the source rows are reordered in place. The second sort of a column reuses the cached keys.
+The times include the first rowCount of the proxy, which filters the rows again after the layout change.
+
+Usage:
+    python benchmarks/bench_item_model_sort.py [row_count] [proxy_row_count]
+"""
+
+# Import built-in modules
+import random
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+]
+
+
+def make_proxy_model(row_count):
+    random.seed(0)
+    model = MColumnTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_column_data(
+        {
+            "name": ["shot_{}_v{}".format(random.randrange(100000), i % 30) for i in range(row_count)],
+            "frames": [random.randrange(1000000) for _ in range(row_count)],
+        }
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    proxy_model.rowCount()
+    return proxy_model
+
+
+def time_sort(proxy_model, column, order):
+    start = time.perf_counter()
+    proxy_model.sort(column, order)
+    proxy_model.rowCount()
+    return time.perf_counter() - start
+
+
+def main(row_count=1000000, proxy_row_count=20000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    for name, count, source_sort in (("proxy", proxy_row_count, False), ("source", row_count, True)):
+        proxy_model = make_proxy_model(count)
+        proxy_model.set_sort_source_in_place(source_sort, threaded=False)
+        result_list = []
+        for column in (1, 0):
+            first_time = time_sort(proxy_model, column, QtCore.Qt.AscendingOrder)
+            again_time = time_sort(proxy_model, column, QtCore.Qt.DescendingOrder)
+            result_list.append(
+                "{} first {:6.2f} s  again {:6.2f} s".format(HEADER_LIST[column]["label"], first_time, again_time)
+            )
+        print("{:6s} {:8d} rows   {}".format(name, count, "   ".join(result_list)))
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
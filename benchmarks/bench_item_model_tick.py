@@ -0,0 +1,96 @@
+"""
+Live update benchmark of MTableModel behind a sorted MSortFilterModel.
+Each task message changes the progress and the frames of a task.
+Compare one setData per changed field with the ticking mode, where the updates are posted and flushed once per frame,
+with the proxy unsorted and sorted by the progress.
+
+Usage:
+    python benchmarks/bench_item_model_tick.py [task_count] [message_count]
+"""
+
+# Import built-in modules
+import random
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "Progress", "key": "progress", "display": lambda x, y: "{}%".format(x)},
+    {"label": "Frames", "key": "frames"},
+    {"label": "ID", "key": "id"},
+]
+
+
+def make_view(app, task_count, sort_column):
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [{"id": i, "name": "task{}".format(i), "progress": 0, "frames": 0} for i in range(task_count)]
+    )
+    model.set_key("id")
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    if sort_column is not None:
+        proxy_model.sort(sort_column, QtCore.Qt.DescendingOrder)
+    view = MTableView()
+    view.setSortingEnabled(False)
+    view.setModel(proxy_model)
+    view.set_header_list(HEADER_LIST)
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+    return model, view
+
+
+def run(app, task_count, message_list, sort_column, ticking):
+    """Send the messages in 60 frames, the events are processed and the view is painted after each frame."""
+    model, view = make_view(app, task_count, sort_column)
+    if ticking:
+        model.set_tick_rate(60)
+    frame_size = max(1, len(message_list) // 60)
+    start = time.perf_counter()
+    for first in range(0, len(message_list), frame_size):
+        for key, value in message_list[first : first + frame_size]:
+            if ticking:
+                model.post_update(key, "progress", value)
+                model.post_update(key, "frames", value * 10)
+            else:
+                model.setData(model.index_for_key(key, column=1), value)
+                model.setData(model.index_for_key(key, column=2), value * 10)
+        if ticking:
+            model.flush_updates()
+        app.processEvents()
+    duration = time.perf_counter() - start
+    view.close()
+    return duration, model.get_tick_info()
+
+
+def main(task_count=5000, message_count=15000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    random.seed(0)
+    message_list = [(random.randrange(task_count), random.randrange(100)) for _ in range(message_count)]
+    print("{} tasks, {} messages".format(task_count, message_count))
+    for name, sort_column in (("unsorted", None), ("sorted", 1)):
+        set_data_time, _ = run(app, task_count, message_list, sort_column, False)
+        tick_time, tick_info = run(app, task_count, message_list, sort_column, True)
+        print(
+            "{:9s} setData {:6.2f} s   post_update {:6.2f} s   merged {} of {} updates".format(
+                name, set_data_time, tick_time, tick_info["merged"], tick_info["posted"]
+            )
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
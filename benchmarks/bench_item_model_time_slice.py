@@ -0,0 +1,89 @@
+"""
+Time sliced filtering benchmark of MSortFilterModel over a big MColumnTableModel.
+It searches the same patterns at once and with set_filter_time_slice, and reports the total time until
+sig_filter_applied and the longest time the event loop was blocked, measured by a repeating 0 ms timer.
+The proxy rows are read after each layout change and filtering, like a view does.
+The first search also computes the row texts.
+
+Usage:
+    python benchmarks/bench_item_model_time_slice.py [row_count] [msec]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x), "searchable": True},
+]
+PATTERN_LIST = ["shot_1", "shot_12", "shot_2", ""]
+
+
+def make_proxy_model(row_count):
+    model = MColumnTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_column_data(
+        {"name": ["shot_{}".format(i) for i in range(row_count)], "frames": [i % 240 for i in range(row_count)]}
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.rowCount()
+    return proxy_model
+
+
+def time_search(app, proxy_model, pattern):
+    tick_list = []
+    timer = QtCore.QTimer()
+    timer.setInterval(0)
+    timer.timeout.connect(lambda: tick_list.append(time.perf_counter()))
+    applied_list = []
+
+    def _applied():
+        # 和 view 一样, 在结果显示后马上读取 proxy 的行
+        proxy_model.rowCount()
+        applied_list.append(time.perf_counter())
+
+    proxy_model.sig_filter_applied.connect(_applied)
+    proxy_model.layoutChanged.connect(proxy_model.rowCount)
+    timer.start()
+    start = time.perf_counter()
+    # 和输入框一样, 从事件循环中开始搜索
+    QtCore.QTimer.singleShot(0, lambda: proxy_model.set_search_pattern(pattern))
+    while not applied_list:
+        app.processEvents()
+    end = time.perf_counter()
+    timer.stop()
+    proxy_model.sig_filter_applied.disconnect(_applied)
+    proxy_model.layoutChanged.disconnect(proxy_model.rowCount)
+    tick_list = [start] + tick_list + [end]
+    return end - start, max(second - first for first, second in zip(tick_list, tick_list[1:]))
+
+
+def main(row_count=200000, msec=8):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    for name, slice_msec in (("at once", 0), ("sliced", msec)):
+        proxy_model = make_proxy_model(row_count)
+        proxy_model.set_filter_time_slice(slice_msec)
+        for pattern in PATTERN_LIST:
+            total, blocked = time_search(app, proxy_model, pattern)
+            print(
+                "{:8s} {:10s} total {:7.0f} ms  longest block {:7.0f} ms {:8d} rows".format(
+                    name, repr(pattern), total * 1e3, blocked * 1e3, proxy_model.rowCount()
+                )
+            )
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
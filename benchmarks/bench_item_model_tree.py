@@ -0,0 +1,99 @@
+"""
+Benchmark of MTableModel parent()/index() in tree mode, on a wide and deep synthetic tree.
+Compare the row index of the model with the old linear scan of the grandparent children.
+
+Usage:
+    python benchmarks/bench_item_model_tree.py [width_of_level_1] [width_of_level_2] [width_of_level_3]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.utils import get_obj_value
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}, {"label": "Frames", "key": "frames"}]
+
+
+def make_tree(width_list):
+    """Build a tree, the nth level nodes have width_list[n] children each."""
+
+    def _make_level(level, prefix):
+        result = []
+        for i in range(width_list[level]):
+            name = "{}/n{}".format(prefix, i)
+            data_dict = {"name": name, "frames": i}
+            if level + 1 < len(width_list):
+                data_dict["children"] = _make_level(level + 1, name)
+            result.append(data_dict)
+        return result
+
+    return _make_level(0, "")
+
+
+def legacy_parent(model, index):
+    """The parent() before the row index, kept here as the baseline."""
+    parent_item = model.parent_map.get(id(index.internalPointer()))
+    grand_item = model.parent_map.get(id(parent_item))
+    if grand_item is None:
+        return QtCore.QModelIndex()
+    parent_list = get_obj_value(grand_item, "children")
+    return model.createIndex(parent_list.index(parent_item), 0, parent_item)
+
+
+def collect_index_list(model, parent_index, depth):
+    """Walk the tree like a fully expanded view does."""
+    result = []
+    for row in range(model.rowCount(parent_index)):
+        index = model.index(row, 0, parent_index)
+        result.append(index)
+        if depth > 1:
+            result.extend(collect_index_list(model, index, depth - 1))
+    return result
+
+
+def main(width_list=(10, 2000, 5)):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(make_tree(width_list))
+
+    start = time.perf_counter()
+    index_list = collect_index_list(model, QtCore.QModelIndex(), len(width_list))
+    index_time = time.perf_counter() - start
+    # 最深层的节点，它们的 parent 是有很多兄弟节点的中间层
+    leaf_list = [index for index in index_list if not model.hasChildren(index)]
+    sample_list = leaf_list[:: max(1, len(leaf_list) // 20000)]
+    print(
+        "tree widths {}, {} nodes, index() {:.1f} us per call".format(
+            list(width_list), len(index_list), index_time * 1e6 / len(index_list)
+        )
+    )
+
+    for name, func in (("legacy", lambda index: legacy_parent(model, index)), ("indexed", model.parent)):
+        # 第一次调用会为每个父节点建立行号索引，单独计时
+        start = time.perf_counter()
+        for index in sample_list:
+            func(index)
+        first_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for index in sample_list:
+            func(index)
+        second_time = time.perf_counter() - start
+        print(
+            "{:<8} parent() x{}: first pass {:8.1f} ms, second pass {:8.1f} ms".format(
+                name, len(sample_list), first_time * 1000, second_time * 1000
+            )
+        )
+    return app
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or (10, 2000, 5))
@@ -0,0 +1,140 @@
+"""
+Memory benchmark of MTableModel tree mode.
+Build a 500k nodes tree, show it in MItemViewMultiSet, regroup it, then discard it.
+Compare the model side parent map with the old way writing "_parent" into every row.
+
+Usage:
+    python benchmarks/bench_item_model_tree_memory.py [width_of_level_1] [width_of_level_2] [width_of_level_3]
+"""
+
+# Import built-in modules
+import gc
+import sys
+import time
+import tracemalloc
+import types
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_view_multi_set import MItemViewMultiSet
+from dayu_widgets.utils import get_obj_value
+from dayu_widgets.utils import set_obj_value
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "Status", "key": "status"},
+    {"label": "Frames", "key": "frames"},
+]
+STATUS_LIST = ["wait", "render", "done", "failed"]
+
+
+def make_tree(width_list):
+    def _make_level(level, prefix):
+        result = []
+        for i in range(width_list[level]):
+            name = "{}/n{}".format(prefix, i)
+            data_dict = {"name": name, "status": STATUS_LIST[i % 4], "frames": i}
+            if level + 1 < len(width_list):
+                data_dict["children"] = _make_level(level + 1, name)
+            result.append(data_dict)
+        return result
+
+    return _make_level(0, "")
+
+
+def legacy_index(self, row, column, parent_index=None):
+    """The index() before the parent map, it writes the parent into the user row."""
+    parent_item = parent_index.internalPointer() if parent_index and parent_index.isValid() else self.root_item
+    children_list = get_obj_value(parent_item, "children")
+    if children_list and len(children_list) > row:
+        child_item = children_list[row]
+        set_obj_value(child_item, "_parent", parent_item)
+        return self.createIndex(row, column, child_item)
+    return QtCore.QModelIndex()
+
+
+def legacy_flatten(self, data_list):
+    """The _flatten before the parent map, it copies every row to strip "_parent"."""
+    out = []
+    for x in data_list:
+        new_x = x.copy()
+        new_x.pop("_parent", None)
+        children = new_x.pop("children", [])
+        out.append(new_x)
+        if children:
+            out.extend(self._flatten(children))
+    return out
+
+
+def walk(model, parent_index=None):
+    """Create the index of every node, like a fully expanded tree view does."""
+    parent_index = QtCore.QModelIndex() if parent_index is None else parent_index
+    count = 0
+    for row in range(model.rowCount(parent_index)):
+        index = model.index(row, 0, parent_index)
+        count += 1
+        if model.hasChildren(index):
+            count += walk(model, index)
+    return count
+
+
+def run(width_list, legacy):
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    start = time.perf_counter()
+
+    item_view_set = MItemViewMultiSet(tree_view=True).groupable()
+    model = item_view_set.source_model
+    if legacy:
+        model.index = types.MethodType(legacy_index, model)
+        item_view_set._flatten = types.MethodType(legacy_flatten, item_view_set)
+    item_view_set.set_header_list(HEADER_LIST)
+    tree = make_tree(width_list)
+    item_view_set.setup_data(tree)
+    node_count = walk(model)
+    # 按 status 分组，再遍历一次。不走 combo 的信号，避免把 view 的 expandAll 算进来
+    item_view_set.group_combo.blockSignals(True)
+    item_view_set.group_combo.setCurrentIndex(2)
+    item_view_set._apply_grouping()
+    walk(model)
+    mutated = "_parent" in tree[0]["children"][0]
+
+    peak = tracemalloc.get_traced_memory()[1]
+    item_view_set.setup_data([])
+    item_view_set.deleteLater()
+    del item_view_set, model, tree
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    left = tracemalloc.get_traced_memory()[0]
+    cycle_count = gc.collect()
+    after_gc = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.enable()
+    print(
+        "{:<10} {} nodes  peak {:7.1f} MB  left before gc {:7.1f} MB  gc found {:>8} objects  "
+        "left after gc {:5.1f} MB  rows mutated: {}  {:.1f} s".format(
+            "legacy" if legacy else "parent map",
+            node_count,
+            peak / 1e6,
+            left / 1e6,
+            cycle_count,
+            after_gc / 1e6,
+            mutated,
+            time.perf_counter() - start,
+        )
+    )
+
+
+def main(width_list=(50, 100, 100)):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    run(width_list, legacy=True)
+    run(width_list, legacy=False)
+    return app
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or (50, 100, 100))
@@ -0,0 +1,99 @@
+"""
+Scrolling benchmark of MVirtualTableModel in MTableView over a generated data source of 50M rows.
+It scrolls page by page and jumps around, and reports the paint time and the time until the rows are loaded.
+
+Usage:
+    python benchmarks/bench_item_model_virtual.py [row_count]
+"""
+
+# Import built-in modules
+import sys
+import time
+
+# Import third-party modules
+from qtpy import QtCore
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.item_model_virtual import MVirtualTableModel
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [
+    {"label": "Time", "key": "time", "width": 120},
+    {"label": "Level", "key": "level", "color": lambda x, y: "#ff4d4f" if x == "error" else None},
+    {"label": "Host", "key": "host"},
+    {"label": "Message", "key": "message", "width": 300},
+]
+LEVEL_LIST = ["debug", "info", "warning", "error"]
+
+
+class GeneratedDataSource(object):
+    """Make the rows from their row number, like an indexed database table."""
+
+    def __init__(self, row_count):
+        self.row_count = row_count
+
+    def count(self, filter=None):
+        return self.row_count
+
+    def fetch(self, offset, limit, sort=None, filter=None):
+        return [
+            {
+                "time": row,
+                "level": LEVEL_LIST[row % 4],
+                "host": "farm{:03d}".format(row % 997),
+                "message": "frame {} rendered".format(row),
+            }
+            for row in range(offset, min(offset + limit, self.row_count))
+        ]
+
+
+def scroll(app, view, row):
+    """Scroll to the row, and return the paint time and the time until the first visible row is loaded."""
+    start = time.perf_counter()
+    view.verticalScrollBar().setValue(row)
+    view.viewport().repaint()
+    paint_time = time.perf_counter() - start
+    while view.indexAt(QtCore.QPoint(5, 5)).data() == view.model().loading_text:
+        app.processEvents(QtCore.QEventLoop.AllEvents, 5)
+    return paint_time, time.perf_counter() - start
+
+
+def main(row_count=50000000):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication(sys.argv)
+    start = time.perf_counter()
+    model = MVirtualTableModel(GeneratedDataSource(row_count))
+    model.set_header_list(HEADER_LIST)
+    view = MTableView()
+    view.setSortingEnabled(False)
+    view.setModel(model)
+    view.set_header_list(HEADER_LIST)
+    view.resize(800, 600)
+    view.show()
+    app.processEvents()
+    print("{} rows, setup {:.2f} s".format(model.rowCount(), time.perf_counter() - start))
+
+    page = max(1, view.viewport().height() // view.verticalHeader().defaultSectionSize())
+    for name, row_list in (
+        ("page down", [page * step for step in range(500)]),
+        ("jump", [row_count * step // 50 for step in range(50)]),
+    ):
+        result_list = [scroll(app, view, row) for row in row_list]
+        paint_list = sorted(paint for paint, _ in result_list)
+        load_list = sorted(load for _, load in result_list)
+        print(
+            "{:10s} paint median {:6.2f} ms  max {:6.2f} ms   loaded median {:6.2f} ms  max {:6.2f} ms".format(
+                name,
+                paint_list[len(paint_list) // 2] * 1e3,
+                paint_list[-1] * 1e3,
+                load_list[len(load_list) // 2] * 1e3,
+                load_list[-1] * 1e3,
+            )
+        )
+    print("cached blocks {}, {:.1f} MB".format(len(model.block_cache), model.cache_bytes / 1e6))
+    return app
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -38,8 +38,10 @@ from dayu_widgets.combo_box import MComboBox
 from dayu_widgets.divider import MDivider
 from dayu_widgets.field_mixin import MFieldMixin
 from dayu_widgets.flow_layout import MFlowLayout
+from dayu_widgets.item_model import MColumnTableModel
 from dayu_widgets.item_model import MSortFilterModel
 from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model_virtual import MVirtualTableModel
 from dayu_widgets.item_view import MBigView
 from dayu_widgets.item_view import MListView
 from dayu_widgets.item_view import MTableView
@@ -99,8 +101,10 @@ __all__ = [
     "MDivider",
     "MFieldMixin",
     "MFlowLayout",
+    "MColumnTableModel",
     "MSortFilterModel",
     "MTableModel",
+    "MVirtualTableModel",
     "MBigView",
     "MListView",
     "MTableView",
@@ -1,4 +1,5 @@
 # Import built-in modules
+import contextlib
 import functools
 
 # Import third-party modules
@@ -24,6 +25,8 @@ class MHeaderView(QtWidgets.QHeaderView):
             "orientation",
             "horizontal" if orientation == QtCore.Qt.Horizontal else "vertical",
         )
+        # 按模糊搜索的分数排序期间隐藏排序箭头, 保存原来是否显示, None 表示没有隐藏
+        self.sort_indicator_backup = None
 
     # def enterEvent(self, *args, **kwargs):
     #     # 调整表头宽度的 cursor 就被覆盖了
@@ -73,22 +76,37 @@ class MHeaderView(QtWidgets.QHeaderView):
     def _slot_set_select(self, column, state):
         current_model = self.model()
         source_model = utils.real_model(current_model)
-        source_model.beginResetModel()
-        attr = "{}_checked".format(source_model.header_list[column].get("key"))
-        for row in range(current_model.rowCount()):
-            real_index = utils.real_index(current_model.index(row, column))
-            data_obj = real_index.internalPointer()
-            if state is None:
-                old_state = utils.get_obj_value(data_obj, attr)
-                utils.set_obj_value(
-                    data_obj,
-                    attr,
-                    QtCore.Qt.Unchecked if old_state == QtCore.Qt.Checked else QtCore.Qt.Checked,
-                )
-            else:
-                utils.set_obj_value(data_obj, attr, state)
-        source_model.endResetModel()
-        source_model.dataChanged.emit(None, None)
+        checked_value = getattr(QtCore.Qt.Checked, "value", QtCore.Qt.Checked)
+        # 所有行改完后合并成一个 dataChanged，不再重置整个 model; 没有 batch 的 model 逐行修改
+        with source_model.batch() if hasattr(source_model, "batch") else contextlib.nullcontext():
+            for row in range(current_model.rowCount()):
+                real_index = utils.real_index(current_model.index(row, column))
+                new_state = state
+                if state is None:
+                    old_state = real_index.data(QtCore.Qt.CheckStateRole)
+                    checked = getattr(old_state, "value", old_state) == checked_value
+                    new_state = QtCore.Qt.Unchecked if checked else QtCore.Qt.Checked
+                source_model.setData(real_index, new_state, QtCore.Qt.CheckStateRole)
+
+    def setModel(self, model):
+        old_model = self.model()
+        if hasattr(old_model, "sig_fuzzy_ranking_changed"):
+            old_model.sig_fuzzy_ranking_changed.disconnect(self._slot_fuzzy_ranking_changed)
+        self._slot_fuzzy_ranking_changed(False)
+        super(MHeaderView, self).setModel(model)
+        if hasattr(model, "sig_fuzzy_ranking_changed"):
+            model.sig_fuzzy_ranking_changed.connect(self._slot_fuzzy_ranking_changed)
+            self._slot_fuzzy_ranking_changed(model.fuzzy_ranking)
+
+    @QtCore.Slot(bool)
+    def _slot_fuzzy_ranking_changed(self, ranking):
+        """The rows are sorted by the fuzzy search score instead of the sorted column, hide the sort indicator."""
+        if ranking and self.sort_indicator_backup is None:
+            self.sort_indicator_backup = self.isSortIndicatorShown()
+            self.setSortIndicatorShown(False)
+        elif not ranking and self.sort_indicator_backup is not None:
+            self.setSortIndicatorShown(self.sort_indicator_backup)
+            self.sort_indicator_backup = None
 
     @QtCore.Slot(QtCore.QModelIndex, int)
     def _slot_set_section_visible(self, index, flag):
@@ -1,11 +1,31 @@
 # Import built-in modules
+import array
+import bisect
+import collections
+import collections.abc
+import contextlib
+import heapq
+import inspect
+import itertools
+import keyword
+import operator
 import re
+import threading
+import time
 
 # Import third-party modules
 from qtpy import QtCore
 from qtpy import QtGui
 
 # Import local modules
+from dayu_widgets.item_model_search import TrigramIndex
+from dayu_widgets.item_model_search import _QueryParser
+from dayu_widgets.item_model_search import _compile_query
+from dayu_widgets.item_model_search import _match_query_rows
+from dayu_widgets.item_model_search import _match_row_text
+from dayu_widgets.item_model_search import _match_row_text_chunk
+from dayu_widgets.item_model_search import fuzzy_match_score
+from dayu_widgets.item_model_search import natural_sort_key
 from dayu_widgets.utils import apply_formatter
 from dayu_widgets.utils import display_formatter
 from dayu_widgets.utils import font_formatter
@@ -45,71 +65,1368 @@ SETTING_MAP = {
 }
 
 
+# 这几个 role 即使 header 中没有配置，也要返回数据
+DEFAULT_ROLE_LIST = (QtCore.Qt.DisplayRole, QtCore.Qt.EditRole, QtCore.Qt.ToolTipRole)
+# check state 的整数值, 兼容 PySide2 的 int 枚举和 PySide6 的 Python 枚举
+UNCHECKED, PARTIALLY_CHECKED, CHECKED = 0, 1, 2
+DISPLAY_ROLE = int(getattr(QtCore.Qt.DisplayRole, "value", QtCore.Qt.DisplayRole))
+# 含有这些字符的搜索内容按正则匹配, 否则按普通子串匹配
+REGEX_SPECIAL_REG = re.compile(r"[.^$*+?{}\[\]\\|()\n]")
+# MSortFilterModel 的筛选结果 mask 中每一行的值, 行有改动后记为 MASK_UNKNOWN 重新匹配
+MASK_REJECTED, MASK_ACCEPTED, MASK_UNKNOWN = 0, 1, 2
+# 分片筛选时显示部分结果的最短间隔秒数, 剩余的匹配时间也要比它长
+FILTER_PARTIAL_DELAY = 0.1
+# MSortFilterModel 的排序 key 列表中需要重新计算的行
+_NO_SORT_KEY = object()
+
+
+def _get_check_value(state):
+    """Convert a check state enum, int or None into int."""
+    return 0 if state is None else int(getattr(state, "value", state))
+
+
+def _get_role_value(role):
+    """Convert an item data role enum or int into int, so the roles can be sorted."""
+    return int(getattr(role, "value", role))
+
+
+def _make_value_getter(key, row_class=None):
+    """
+    Build the function to read the key from a dict row or an object row.
+    When row_class is given, the function only works for the rows of row_class, it reads the slot directly.
+    """
+    get_attr = operator.attrgetter(key) if isinstance(key, str) else None
+    if row_class is not None and key in row_class.__slots__:
+        return get_attr
+
+    def _get_value(data_obj):
+        if isinstance(data_obj, dict):
+            return data_obj.get(key)
+        try:
+            return get_attr(data_obj)
+        except (AttributeError, TypeError):
+            return None
+
+    return _get_value
+
+
+def _compile_cell_getter(attr_dict, role, row_class=None):
+    """
+    Compile the header config of one role into a function: data_obj -> role value.
+    It does the same thing as applying the config formatter and then the SETTING_MAP formatter.
+    :param attr_dict: one column config of header_list
+    :param role: Qt item data role in SETTING_MAP
+    :param row_class: the class made by make_row_class, the function only works for its rows.
+                      None for dict or any object rows
+    :return: the function, or None if the role is not configured for this column
+    """
+    setting = SETTING_MAP[role]
+    formatter_from_config = attr_dict.get(setting.get("config"))
+    if not formatter_from_config and role not in DEFAULT_ROLE_LIST:
+        return None
+    formatter_from_model = setting.get("formatter", None)
+    get_value = _make_value_getter(attr_dict.get("key"), row_class)
+
+    if formatter_from_config is None:
+        get_config_value = get_value
+    elif isinstance(formatter_from_config, dict):
+
+        def get_config_value(data_obj):
+            return formatter_from_config.get(get_value(data_obj), None)
+
+    elif callable(formatter_from_config):
+
+        def get_config_value(data_obj):
+            return formatter_from_config(get_value(data_obj), data_obj)
+
+    else:
+        # 直接值型配置，结果与数据无关，只需要计算一次
+        result = apply_formatter(formatter_from_model, formatter_from_config)
+        return lambda data_obj: result
+
+    if formatter_from_model is None:
+        return get_config_value
+    if isinstance(formatter_from_model, dict):
+        return lambda data_obj: formatter_from_model.get(get_config_value(data_obj), None)
+    if callable(formatter_from_model):
+        return lambda data_obj: formatter_from_model(get_config_value(data_obj))
+    return lambda data_obj: formatter_from_model
+
+
+def _compile_column(attr_dict, row_class=None):
+    """
+    Compile one column config of header_list.
+    :return: tuple of (role -> function data_obj -> role value dict, item flags)
+    """
+    role_dict = {}
+    for role in SETTING_MAP:
+        cell_getter = _compile_cell_getter(attr_dict, role, row_class)
+        if cell_getter is not None:
+            role_dict[int(role)] = cell_getter
+    if attr_dict.get("checkable", False):
+        get_state = _make_value_getter("{}_checked".format(attr_dict.get("key")), row_class)
+        # 访问 Qt 枚举的开销很大，先取出来
+        unchecked = QtCore.Qt.Unchecked
+
+        def get_check_state(data_obj):
+            state = get_state(data_obj)
+            return unchecked if state is None else state
+
+        role_dict[int(QtCore.Qt.CheckStateRole)] = get_check_state
+
+    flags = QtCore.Qt.ItemIsSelectable | QtCore.Qt.ItemIsEnabled
+    if attr_dict.get("checkable", False):
+        flags |= QtCore.Qt.ItemIsUserCheckable
+    if attr_dict.get("selectable", False) or attr_dict.get("editable", False):
+        flags |= QtCore.Qt.ItemIsEditable
+    if attr_dict.get("draggable", False):
+        flags |= QtCore.Qt.ItemIsDragEnabled
+    if attr_dict.get("droppable", False):
+        flags |= QtCore.Qt.ItemIsDropEnabled
+    return role_dict, QtCore.Qt.ItemFlags(flags)
+
+
+def _coalesce_rows(rows_or_ranges, row_count):
+    """
+    Merge the given rows into sorted, non-overlapping, inclusive (first, last) ranges.
+    :param rows_or_ranges: iterable of int row, range, or inclusive (first, last) tuple
+    :param row_count: the row count of the parent, to check the rows
+    :return: list of (first, last)
+    """
+    row_set = set()
+    for item in rows_or_ranges:
+        if isinstance(item, tuple):
+            item = range(item[0], item[1] + 1)
+        if isinstance(item, range):
+            row_set.update(item)
+        else:
+            row_set.add(int(item))
+    range_list = []
+    for row in sorted(row_set):
+        if not 0 <= row < row_count:
+            raise IndexError("row {} out of range, the row count is {}".format(row, row_count))
+        if range_list and range_list[-1][1] + 1 == row:
+            range_list[-1][1] = row
+        else:
+            range_list.append([row, row])
+    return [tuple(item) for item in range_list]
+
+
+def _plan_moves(range_list, destination):
+    """
+    Split a move of several ranges inside the same parent into single range moves.
+    The moved rows keep their order and end up just before the row which was at destination.
+    :return: list of (first, last, destination) in the row numbers at the time of each move,
+             the moves which leave the rows in place are skipped
+    """
+    before_list = []
+    after_list = []
+    for first, last in range_list:
+        if last < destination:
+            before_list.append((first, last))
+        elif first >= destination:
+            after_list.append((first, last))
+        else:
+            before_list.append((first, destination - 1))
+            after_list.append((destination, last))
+
+    move_list = []
+    # 在 destination 之前的块，从后往前逐个挪到 destination 之前，前面的行号不受影响
+    dest = destination
+    for first, last in reversed(before_list):
+        if last + 1 != dest:
+            move_list.append((first, last, dest))
+        dest -= last - first + 1
+    # 在 destination 之后的块，从前往后逐个接在已移动的块后面，后面的行号不受影响
+    dest = destination
+    for first, last in after_list:
+        if first != dest:
+            move_list.append((first, last, dest))
+        dest += last - first + 1
+    return move_list
+
+
+def _move_block(values, first, last, destination):
+    """Move values[first:last + 1] before values[destination], works for list and array."""
+    block = values[first : last + 1]
+    del values[first : last + 1]
+    if destination > last:
+        destination -= last - first + 1
+    values[destination:destination] = block
+
+
+def _longest_increasing_subsequence(values):
+    """Return the set of values in one of the longest strictly increasing subsequences."""
+    tail_list = []
+    tail_position_list = []
+    previous_list = [None] * len(values)
+    for position, value in enumerate(values):
+        i = bisect.bisect_left(tail_list, value)
+        if i == len(tail_list):
+            tail_list.append(value)
+            tail_position_list.append(position)
+        else:
+            tail_list[i] = value
+            tail_position_list[i] = position
+        previous_list[position] = tail_position_list[i - 1] if i else None
+    result = set()
+    position = tail_position_list[-1] if tail_position_list else None
+    while position is not None:
+        result.add(values[position])
+        position = previous_list[position]
+    return result
+
+
+def _get_row_fields(data_obj):
+    if isinstance(data_obj, dict):
+        return data_obj.items()
+    if hasattr(data_obj, "to_dict"):
+        return data_obj.to_dict().items()
+    return vars(data_obj).items()
+
+
+class _CompactRow(object):
+    """
+    The base of the row classes made by make_row_class.
+    The fields are __slots__, so a row has no __dict__ and takes a few words per field.
+    It can be read and written like a dict or like an object.
+    """
+
+    __slots__ = ()
+    _is_group = False
+
+    def __init__(self, *args, **kwargs):
+        """Take the fields as positional or keyword arguments in the __slots__ order, the missing ones are None."""
+        key_list = self.__slots__
+        if len(args) > len(key_list):
+            raise TypeError("{} takes at most {} arguments".format(self.__class__.__name__, len(key_list)))
+        for key, value in zip(key_list, args):
+            setattr(self, key, value)
+        for key in key_list[len(args) :]:
+            setattr(self, key, kwargs.pop(key, None))
+        if kwargs:
+            raise TypeError("{} got unexpected or repeated fields {}".format(self.__class__.__name__, list(kwargs)))
+
+    def get(self, attr, default=None):
+        return getattr(self, attr, default)
+
+    def keys(self):
+        return list(self.__slots__)
+
+    def to_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __getitem__(self, attr):
+        if attr not in self.__slots__:
+            raise KeyError(attr)
+        return getattr(self, attr)
+
+    def __setitem__(self, attr, value):
+        if attr not in self.__slots__:
+            raise KeyError(attr)
+        setattr(self, attr, value)
+
+    def __contains__(self, attr):
+        return attr in self.__slots__
+
+    def __repr__(self):
+        return "{}({})".format(
+            self.__class__.__name__, ", ".join("{}={!r}".format(key, getattr(self, key)) for key in self.__slots__)
+        )
+
+    @classmethod
+    def from_dict(cls, data_dict):
+        """Make a row from a dict, the missing fields are None and the extra keys are ignored."""
+        row = cls(*map(data_dict.get, cls.__slots__))
+        if "children" in cls.__slots__ and isinstance(row.children, list):
+            row.children = cls.from_dict_list(row.children)
+        return row
+
+    @classmethod
+    def from_dict_list(cls, data_list):
+        """Convert a list of dict rows, and their children if the class has the children field."""
+        if "children" in cls.__slots__:
+            return [cls.from_dict(data_dict) for data_dict in data_list]
+        key_list = cls.__slots__
+        return [cls(*map(data_dict.get, key_list)) for data_dict in data_list]
+
+
+def make_row_class(header_list, name="Row", extra_key_list=None):
+    """
+    Make a compact row class for MTableModel from the header_list keys, a row takes about a quarter of a dict.
+    The fields are the keys of header_list, the "<key>_checked" of the checkable columns and extra_key_list.
+    Use MTableModel.set_row_class to let the model read the fields directly.
+    :param header_list: the column configs, or just a list of keys
+    :param name: the class name
+    :param extra_key_list: more fields, eg. ["children"] for the tree mode or the fields only used by formatters
+    :return: the row class, it takes the fields as positional or keyword arguments, the missing ones are None.
+             Use from_dict/from_dict_list to convert the dict rows
+    """
+    key_list = []
+    for attr_dict in header_list:
+        if not isinstance(attr_dict, dict):
+            key_list.append(attr_dict)
+            continue
+        key_list.append(attr_dict.get("key"))
+        if attr_dict.get("checkable", False):
+            key_list.append("{}_checked".format(attr_dict.get("key")))
+    key_list.extend(extra_key_list or [])
+    # 去重并保持顺序
+    key_list = list(collections.OrderedDict.fromkeys(key_list))
+    for key in key_list:
+        if not isinstance(key, str) or not key.isidentifier() or keyword.iskeyword(key) or key.startswith("__"):
+            raise ValueError("{!r} can not be a field of the row class".format(key))
+    return type(name, (_CompactRow,), {"__slots__": tuple(key_list)})
+
+
+class _ChunkLoaderSignals(QtCore.QObject):
+    sig_chunk_loaded = QtCore.Signal(object, object)
+    sig_failed = QtCore.Signal(object, str)
+    sig_finished = QtCore.Signal(object)
+
+    def __init__(self, cancel_event):
+        super(_ChunkLoaderSignals, self).__init__()
+        self.cancel_event = cancel_event
+        # 在主线程中放开运行期间持有的 loader
+        self.sig_finished.connect(self._slot_finished)
+
+    @QtCore.Slot()
+    def slot_cancel(self):
+        self.cancel_event.set()
+
+    @QtCore.Slot(object)
+    def _slot_finished(self, chunk_loader):
+        ChunkLoader.running_set.discard(chunk_loader)
+
+
+class ChunkLoader(QtCore.QRunnable):
+    """
+    Run a loader function in QThreadPool, and send its results back to the main thread by chunks.
+    The loader takes no argument, it returns an iterable, a generator, a coroutine of an iterable
+    or an async iterable.
+    signals.sig_chunk_loaded(loader, chunk) is emitted for each chunk, signals.sig_failed(loader, message)
+    if the loader raises, and signals.sig_finished(loader) is always emitted at last, even if it is canceled.
+    The loader is canceled when its parent is destroyed, and kept alive until it finishes.
+    """
+
+    _thread_pool = None
+    # 运行中的 loader, parent 删除后也要保留到 run 结束
+    running_set = set()
+
+    def __init__(self, loader, chunk_size=200, parent=None, context=None):
+        super(ChunkLoader, self).__init__()
+        # 由 Python 持有，避免线程池在 Python 对象之前删掉它
+        self.setAutoDelete(False)
+        self.loader = loader
+        self.chunk_size = max(1, int(chunk_size))
+        self.context = context
+        self.cancel_event = threading.Event()
+        # 信号对象由 loader 持有, 不随 parent 删除; 它在主线程中创建, 在工作线程中发射时会以 queued 的方式回到主线程
+        self.signals = _ChunkLoaderSignals(self.cancel_event)
+        if parent is not None:
+            parent.destroyed.connect(self.signals.slot_cancel)
+
+    @classmethod
+    def get_thread_pool(cls):
+        """The loaders mostly wait for IO, so they run in their own pool of at least 4 threads."""
+        if cls._thread_pool is None:
+            cls._thread_pool = QtCore.QThreadPool()
+            cls._thread_pool.setMaxThreadCount(max(4, QtCore.QThread.idealThreadCount()))
+        return cls._thread_pool
+
+    @property
+    def canceled(self):
+        return self.cancel_event.is_set()
+
+    def start(self):
+        self.running_set.add(self)
+        self.get_thread_pool().start(self)
+
+    def cancel(self):
+        """Stop sending chunks, the loader itself can not be interrupted."""
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            # 只有 loader 自己的错误算作加载失败, 发送 chunk 的内部错误照常抛出
+            try:
+                result = self.loader()
+                if inspect.iscoroutine(result) or hasattr(result, "__aiter__"):
+                    # Import built-in modules
+                    import asyncio
+
+                    if inspect.iscoroutine(result):
+                        result = asyncio.run(result)
+            except Exception as error:
+                self._fail(error)
+                return
+            if hasattr(result, "__aiter__"):
+                asyncio.run(self._send_async_chunks(result))
+            else:
+                self._send_chunks(result)
+        finally:
+            self.signals.sig_finished.emit(self)
+
+    def _fail(self, error):
+        if not self.canceled:
+            self.signals.sig_failed.emit(self, "{}: {}".format(type(error).__name__, error))
+
+    def _send_chunks(self, iterable):
+        try:
+            iterator = iter(iterable)
+        except Exception as error:
+            self._fail(error)
+            return
+        chunk = []
+        while not self.canceled:
+            try:
+                data_obj = next(iterator)
+            except StopIteration:
+                break
+            except Exception as error:
+                self._fail(error)
+                return
+            chunk.append(data_obj)
+            if len(chunk) >= self.chunk_size:
+                self.signals.sig_chunk_loaded.emit(self, chunk)
+                chunk = []
+        if chunk and not self.canceled:
+            self.signals.sig_chunk_loaded.emit(self, chunk)
+
+    async def _send_async_chunks(self, async_iterable):
+        try:
+            async_iterator = async_iterable.__aiter__()
+        except Exception as error:
+            self._fail(error)
+            return
+        chunk = []
+        while not self.canceled:
+            try:
+                data_obj = await async_iterator.__anext__()
+            except StopAsyncIteration:
+                break
+            except Exception as error:
+                self._fail(error)
+                return
+            chunk.append(data_obj)
+            if len(chunk) >= self.chunk_size:
+                self.signals.sig_chunk_loaded.emit(self, chunk)
+                chunk = []
+        if chunk and not self.canceled:
+            self.signals.sig_chunk_loaded.emit(self, chunk)
+
+
+class _LoadingRow(object):
+    """The placeholder row shown under a tree node while its children are loading."""
+
+    _is_group = True
+    children = None
+
+    def __init__(self, text):
+        self.text = text
+
+
 class MTableModel(QtCore.QAbstractItemModel):
+    sig_fetch_progress = QtCore.Signal(int)
+    sig_fetch_finished = QtCore.Signal()
+    sig_fetch_failed = QtCore.Signal(object, str)
+
     def __init__(self, parent=None):
         super(MTableModel, self).__init__(parent)
         self.origin_count = 0
         self.root_item = {"name": "root", "children": []}
         self.data_generator = None
         self.header_list = []
+        self.row_class = None
+        self.column_role_list = []
+        # 只用于 row_class 的行，直接读取 slot
+        self.row_class_role_list = []
+        self.column_flag_list = []
+        self.fetch_chunk_size = 200
+        self.auto_fetch = False
         self.timer = QtCore.QTimer(self)
         self.timer.timeout.connect(self.fetchMore)
+        # id(child_item) -> parent_item, 由 model 自己记录父子关系，不再往用户数据中写入 _parent
+        self.parent_map = {}
+        # id(parent_item) -> {id(child_item): row}, 用于常数时间内找到节点在兄弟节点中的行号
+        self.row_cache = {}
+        # id(parent_item) -> {path_key value: child_item}, 用于按路径逐层查找节点
+        self.path_cache = {}
+        self.path_key = None
+        # set_key 声明的主键: key value -> row data object
+        self.data_key = None
+        self.key_map = {}
+        # checkable column -> {id(item): [checked children count, partially checked children count]}
+        self.check_count_map = {}
+        # id(item) -> ChunkLoader, 正在后台加载 children 的节点
+        self.lazy_loader_map = {}
+        # 已经启动的 ChunkLoader, 保持引用直到它结束
+        self.running_loader_set = set()
+        self.loading_text = self.tr("Loading...")
+        # batch() 中记录的改动: id(parent_item) -> (parent_item, {row: [column set, role set or None]})
+        self.batch_depth = 0
+        self.batch_cell_map = {}
+        # set_max_rows 开启的日志模式: append/extend 的行先放在这里，每帧插入一次
+        self.max_rows = None
+        self.pending_row_list = []
+        self.dropped_row_count = 0
+        self.append_timer = QtCore.QTimer(self)
+        self.append_timer.setSingleShot(True)
+        self.append_timer.timeout.connect(self.flush_rows)
+        # set_tick_rate 开启的 ticking 模式: key -> {field: value}, 可以在任意线程中写入
+        self.tick_rate = 0
+        self.update_lock = threading.Lock()
+        self.pending_update_map = {}
+        self.tick_info = {"posted": 0, "merged": 0, "dropped": 0, "applied": 0, "flushes": 0}
+        self.tick_timer = QtCore.QTimer(self)
+        self.tick_timer.timeout.connect(self.flush_updates)
+        self.set_data_cache(0)
+        self.dataChanged.connect(self._slot_invalidate_changed_rows)
+        self.modelReset.connect(self._slot_clear_batch)
+        self.modelReset.connect(self.invalidate_rows)
+        self.modelAboutToBeReset.connect(self._slot_cancel_all_fetch)
+        self.modelAboutToBeReset.connect(self._slot_drop_pending_rows)
+        self.modelReset.connect(self._slot_clear_tree_cache)
+        self.modelReset.connect(self._slot_rebuild_key_map)
 
     def set_header_list(self, header_list):
+        """
+        Set the column configs, each column config is compiled once here into role getters and item flags.
+        Call it again after changing the header_list dicts.
+        """
         self.header_list = header_list
+        compiled_list = [_compile_column(attr_dict) for attr_dict in header_list]
+        self.row_class_role_list = (
+            [_compile_column(attr_dict, self.row_class)[0] for attr_dict in header_list] if self.row_class else []
+        )
+        self.column_role_list = [role_dict for role_dict, _ in compiled_list]
+        self.column_flag_list = [flags for _, flags in compiled_list]
+        self.check_count_map.clear()
+        self.invalidate_rows()
+
+    def set_row_class(self, row_class):
+        """
+        Declare the rows are made by row_class from make_row_class,
+        then data() reads the slots of its rows directly instead of checking the row type on each access.
+        The other rows, eg. the group rows, still work as before.
+        :param row_class: the class made by make_row_class, None for dict or any object rows
+        :return: None
+        """
+        self.row_class = row_class
+        self.set_header_list(self.header_list)
+
+    def get_cell_getter(self, column, role=QtCore.Qt.DisplayRole):
+        """
+        Get the compiled function of the given column and role.
+        It takes a row data object and returns the same value as data().
+        :return: function, or None if the role is not configured for this column
+        """
+        return self.column_role_list[column].get(role)
+
+    def set_data_cache(self, max_rows=2000):
+        """
+        Cache the data() results of the recently used rows. It is disabled by default.
+        The cached rows are dropped by setData/dataChanged, set_data_list, append/remove and invalidate_rows.
+        :param max_rows: how many rows to keep in the cache, 0 to disable the cache
+        :return: None
+        """
+        self.data_cache_max_rows = max_rows or 0
+        self.data_cache = collections.OrderedDict() if self.data_cache_max_rows else None
+        self.data_cache_hits = 0
+        self.data_cache_misses = 0
+
+    def get_data_cache_info(self):
+        """Get the hit/miss counters of the data cache."""
+        return {
+            "hits": self.data_cache_hits,
+            "misses": self.data_cache_misses,
+            "rows": len(self.data_cache) if self.data_cache is not None else 0,
+            "max_rows": self.data_cache_max_rows,
+        }
+
+    def invalidate_rows(self, data_obj_list=None):
+        """
+        Drop the cached data of the given row objects.
+        Call it after changing the row objects outside the model.
+        :param data_obj_list: list of row data objects, None to drop all the rows
+        :return: None
+        """
+        if self.data_cache is None:
+            return
+        if data_obj_list is None:
+            self.data_cache.clear()
+            return
+        for data_obj in data_obj_list:
+            self.data_cache.pop(self._get_row_key(data_obj), None)
+
+    def _get_row_key(self, data_obj):
+        return id(data_obj)
+
+    @QtCore.Slot()
+    def _slot_clear_tree_cache(self):
+        self.parent_map.clear()
+        self.row_cache.clear()
+        self.path_cache.clear()
+        self.check_count_map.clear()
+
+    def _forget_items(self, data_list):
+        """Drop the parent links of the removed items and all their descendants."""
+        for data_obj in data_list:
+            if self.parent_map.pop(id(data_obj), None) is None:
+                # 没有创建过 index 的节点，它的子节点也不会有记录
+                continue
+            self.row_cache.pop(id(data_obj), None)
+            self.path_cache.pop(id(data_obj), None)
+            self._forget_key(data_obj)
+            self._forget_check_count(data_obj)
+            self._cancel_loader(data_obj)
+            children_list = get_obj_value(data_obj, "children")
+            if isinstance(children_list, list):
+                self._forget_items(children_list)
+
+    def _forget_check_count(self, data_obj):
+        for count_dict in self.check_count_map.values():
+            count_dict.pop(id(data_obj), None)
+
+    def _refresh_check_state(self, parent_item):
+        """Count the children of parent_item again after its rows changed, and update the ancestors."""
+        for column, count_dict in list(self.check_count_map.items()):
+            if count_dict.pop(id(parent_item), None) is not None:
+                key = "{}_checked".format(self.header_list[column].get("key"))
+                self._update_ancestor_check_state(parent_item, key, column, ())
+
+    def set_key(self, key):
+        """
+        Index all the rows by the given primary key attribute, for index_for_key and row_for_key.
+        The index is kept up to date on insert, remove, reset, setData and update_data_list.
+        Call it again after changing the keys outside the model.
+        :param key: the attribute name, the values should be unique in the whole tree. None to drop the index
+        :return: None
+        """
+        self.data_key = key
+        self._slot_rebuild_key_map()
+
+    @QtCore.Slot()
+    def _slot_rebuild_key_map(self):
+        self.key_map.clear()
+        if self.data_key is not None:
+            self._index_keys(self.root_item, self.get_data_list())
+
+    def _index_keys(self, parent_item, data_list):
+        """Add data_list and all their loaded descendants into the key index."""
+        item_list = [(parent_item, data_list)]
+        while item_list:
+            parent_item, data_list = item_list.pop()
+            for data_obj in data_list:
+                self.parent_map[id(data_obj)] = parent_item
+                value = get_obj_value(data_obj, self.data_key)
+                if value is not None:
+                    self.key_map[value] = data_obj
+                children_list = get_obj_value(data_obj, "children")
+                if isinstance(children_list, list) and children_list:
+                    item_list.append((data_obj, children_list))
+
+    def _forget_key(self, data_obj):
+        if self.data_key is None:
+            return
+        value = get_obj_value(data_obj, self.data_key)
+        if value is not None and self.key_map.get(value) is data_obj:
+            del self.key_map[value]
+
+    def _update_key(self, data_obj, old_value):
+        """Move data_obj in the key index after its key changed from old_value."""
+        if self.key_map.get(old_value) is data_obj:
+            del self.key_map[old_value]
+        value = get_obj_value(data_obj, self.data_key)
+        if value is not None:
+            self.key_map[value] = data_obj
+
+    def index_for_key(self, value, column=0):
+        """
+        Get the source model index of the row whose primary key is value, see set_key.
+        It takes constant time, the row is found from the parent links and the row cache.
+        :param value: the primary key value
+        :param column: the column of the returned index
+        :return: QModelIndex, invalid if not found
+        """
+        data_obj = self.key_map.get(value)
+        if data_obj is None or get_obj_value(data_obj, self.data_key) != value:
+            return QtCore.QModelIndex()
+        index = self._get_item_index(data_obj)
+        if index is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(index.row(), column, data_obj) if column else index
+
+    def row_for_key(self, value):
+        """
+        Get the row of the row object whose primary key is value, in the children of its parent.
+        :return: int, or None if not found
+        """
+        index = self.index_for_key(value)
+        return index.row() if index.isValid() else None
+
+    def set_path_key(self, key):
+        """
+        Set the attribute used as the node names by index_for_path, the key of the first column by default.
+        The values are compared as strings.
+        """
+        self.path_key = key
+        self.path_cache.clear()
+
+    def index_for_path(self, path, sep="/", column=0):
+        """
+        Get the source model index of the tree node at the given path, eg. "seq010/sh0100/comp".
+        It takes O(depth) time, the children of each parent are indexed by name on the first lookup.
+        :param path: the node names from the top level, joined by sep
+        :param sep: the separator of the path
+        :param column: the column of the returned index
+        :return: QModelIndex, invalid if not found or the path goes into not loaded children
+        """
+        key = self.path_key
+        if key is None:
+            key = self.header_list[0].get("key") if self.header_list else "name"
+        parent_item = self.root_item
+        data_obj = None
+        for name in path.split(sep):
+            if not name:
+                continue
+            children_list = get_obj_value(parent_item, "children")
+            if not isinstance(children_list, list):
+                return QtCore.QModelIndex()
+            name_dict = self.path_cache.get(id(parent_item))
+            data_obj = None if name_dict is None else name_dict.get(name)
+            if (
+                data_obj is None
+                or self.parent_map.get(id(data_obj)) is not parent_item
+                or str(get_obj_value(data_obj, key)) != name
+            ):
+                # 第一次查找，或者 children 变化了，重建这一层
+                name_dict = self.path_cache[id(parent_item)] = {}
+                for sub_item in children_list:
+                    self.parent_map[id(sub_item)] = parent_item
+                    name_dict.setdefault(str(get_obj_value(sub_item, key)), sub_item)
+                data_obj = name_dict.get(name)
+                if data_obj is None:
+                    return QtCore.QModelIndex()
+            parent_item = data_obj
+        if data_obj is None:
+            return QtCore.QModelIndex()
+        row = self.get_child_row(self.parent_map[id(data_obj)], data_obj)
+        if row is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column, data_obj)
+
+    def get_parent_item(self, data_obj):
+        """
+        Get the parent row object of the given row object.
+        :return: the parent row object, None for the top level rows
+        """
+        parent_item = self.parent_map.get(id(data_obj))
+        return None if parent_item is self.root_item else parent_item
+
+    def get_child_row(self, parent_item, child_item):
+        """
+        Get the row of child_item in the children of parent_item.
+        The rows of all the children are indexed on the first call, so the next lookups are constant time.
+        :return: the row, or None if child_item is not a child of parent_item
+        """
+        children_list = get_obj_value(parent_item, "children") or []
+        row_dict = self.row_cache.get(id(parent_item))
+        row = None if row_dict is None else row_dict.get(id(child_item))
+        if row is None or row >= len(children_list) or children_list[row] is not child_item:
+            # 第一次查找，或者 children 在 model 之外被修改过，重建索引
+            row_dict = {id(sub_item): sub_row for sub_row, sub_item in enumerate(children_list)}
+            self.row_cache[id(parent_item)] = row_dict
+            row = row_dict.get(id(child_item))
+        return row
+
+    @QtCore.Slot(QtCore.QModelIndex, QtCore.QModelIndex)
+    def _slot_invalidate_changed_rows(self, top_left, bottom_right, *args):
+        if self.data_cache is None:
+            return
+        if top_left is None or bottom_right is None or not (top_left.isValid() and bottom_right.isValid()):
+            self.invalidate_rows()
+            return
+        parent_index = top_left.parent()
+        self.invalidate_rows(
+            [
+                self.get_data_obj(self.index(row, 0, parent_index))
+                for row in range(top_left.row(), bottom_right.row() + 1)
+            ]
+        )
+
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Collect the cells changed in the with block, and emit them on exit
+        as the fewest rectangular dataChanged of each parent, with the changed roles.
+        So the proxies and views refresh once for the whole batch instead of once for each cell.
+        The batches can be nested, the signals are emitted when the outermost one exits.
+        The pending cells are emitted before any row is inserted, removed or moved.
+        :return: the model itself
+        """
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if not self.batch_depth:
+                self._flush_batch()
+
+    def emit_data_changed(self, top_left, bottom_right, role_list=None):
+        """
+        Emit dataChanged for the cells from top_left to bottom_right, or record them when in a batch().
+        Use it instead of dataChanged.emit after changing the row objects outside the model.
+        :param top_left: the source model index of the top left cell
+        :param bottom_right: the source model index of the bottom right cell, with the same parent
+        :param role_list: the changed roles, None for all the roles
+        :return: None
+        """
+        if not self.batch_depth:
+            self._send_data_changed(top_left, bottom_right, role_list)
+            return
+        # 缓存不能等到 batch 结束再清理
+        self._slot_invalidate_changed_rows(top_left, bottom_right)
+        self._record_changed_cells(
+            self._get_item(top_left.parent()),
+            range(top_left.row(), bottom_right.row() + 1),
+            range(top_left.column(), bottom_right.column() + 1),
+            role_list,
+        )
+
+    def _record_changed_cells(self, parent_item, row_iterable, column_iterable, role_list=None):
+        row_dict = self.batch_cell_map.setdefault(id(parent_item), (parent_item, {}))[1]
+        for row in row_iterable:
+            cell = row_dict.get(row)
+            if cell is None:
+                cell = row_dict[row] = [set(), set()]
+            cell[0].update(column_iterable)
+            if not role_list:
+                cell[1] = None
+            elif cell[1] is not None:
+                cell[1].update(role_list)
+
+    def _flush_batch(self):
+        """Emit the recorded cells, the adjacent rows with the same columns and roles are merged."""
+        if not self.batch_cell_map:
+            return
+        cell_map_list = list(self.batch_cell_map.values())
+        self.batch_cell_map.clear()
+        for parent_item, row_dict in cell_map_list:
+            parent_index = self._get_item_index(parent_item)
+            if parent_index is None:
+                # parent 已经被删除
+                continue
+            row_count = self.rowCount(parent_index)
+            rect_list = []
+            last_rect_dict = {}
+            last_row = -2
+            last_cell = None
+            for row in sorted(row_dict):
+                if row >= row_count:
+                    break
+                cell = row_dict[row]
+                if row == last_row + 1 and cell == last_cell:
+                    # 和上一行完全相同，直接延长上一行的矩形
+                    for rect in last_rect_dict.values():
+                        rect[1] = row
+                    last_row = row
+                    continue
+                column_set, role_set = cell
+                role_tuple = None if role_set is None else tuple(sorted(role_set, key=_get_role_value))
+                rect_dict = {}
+                # 每一行中连续的列合并成一段
+                for _, group in itertools.groupby(enumerate(sorted(column_set)), key=lambda pair: pair[1] - pair[0]):
+                    column_list = [column for _, column in group]
+                    rect_key = (column_list[0], column_list[-1], role_tuple)
+                    rect = last_rect_dict.get(rect_key)
+                    if rect is not None and rect[1] + 1 == row:
+                        rect[1] = row
+                    else:
+                        rect = [row, row, column_list[0], column_list[-1], role_tuple]
+                        rect_list.append(rect)
+                    rect_dict[rect_key] = rect
+                last_rect_dict = rect_dict
+                last_row = row
+                last_cell = cell
+            for first_row, last_row, first_column, last_column, role_tuple in rect_list:
+                self._send_data_changed(
+                    self.index(first_row, first_column, parent_index),
+                    self.index(last_row, last_column, parent_index),
+                    list(role_tuple) if role_tuple else None,
+                )
+
+    def _send_data_changed(self, top_left, bottom_right, role_list):
+        if role_list:
+            self.dataChanged.emit(top_left, bottom_right, role_list)
+        else:
+            # 采用 self.dataChanged.emit方式在houdini16里面会报错
+            # TypeError: dataChanged(QModelIndex,QModelIndex,QVector<int>) only accepts 3 arguments, 3 given!
+            # 所以不带 role 时只传两个参数
+            self.dataChanged.emit(top_left, bottom_right)
+
+    @QtCore.Slot()
+    def _slot_clear_batch(self):
+        self.batch_cell_map.clear()
+
+    def _get_item_index(self, item):
+        """
+        Get the source model index of the first column of item.
+        :return: QModelIndex, invalid for the root item, None if item is not in the model anymore
+        """
+        if item is self.root_item:
+            return QtCore.QModelIndex()
+        parent_item = self.parent_map.get(id(item))
+        row = None if parent_item is None else self.get_child_row(parent_item, item)
+        if row is None:
+            return None
+        return self.createIndex(row, 0, item)
+
+    def set_fetch_chunk_size(self, size):
+        """Set how many rows are pulled from a data generator on each fetchMore."""
+        self.fetch_chunk_size = max(1, int(size))
+
+    def set_auto_fetch(self, flag, interval=0):
+        """
+        By default a data generator is only pulled when the view asks for more rows,
+        that is when the user scrolls near the bottom.
+        Enable auto fetch to keep filling the model in background with a timer.
+        """
+        self.auto_fetch = flag
+        self.timer.setInterval(interval)
+        if flag and self.data_generator is not None:
+            self.timer.start()
+        else:
+            self.timer.stop()
+
+    def set_max_rows(self, max_rows, interval=16):
+        """
+        Turn the model into a capped append-only table, eg. for the streaming log or event rows.
+        append/extend only queue the rows, they are inserted once per interval with a single rowsInserted,
+        and the oldest rows over max_rows are dropped with a single rowsRemoved.
+        :param max_rows: the most rows to keep, None to insert the rows on each append again
+        :param interval: how many milliseconds the appended rows are gathered, 16 for one frame at 60 fps
+        :return: None
+        """
+        self.flush_rows()
+        self.max_rows = max_rows
+        self.append_timer.setInterval(interval)
+        if max_rows is not None and self.rowCount() > max_rows:
+            self.remove_rows([(0, self.rowCount() - max_rows - 1)])
+
+    def flush_rows(self):
+        """Insert the queued rows now, and drop the oldest rows over max_rows."""
+        self.append_timer.stop()
+        pending_row_list = self.pending_row_list
+        if not pending_row_list:
+            return
+        self.pending_row_list = []
+        if self.max_rows is None:
+            self.insert_rows(self.rowCount(), pending_row_list)
+            return
+        if len(pending_row_list) > self.max_rows:
+            # 一帧内来的行比 max_rows 还多，前面的行不必插入
+            self.dropped_row_count += len(pending_row_list) - self.max_rows
+            pending_row_list = pending_row_list[len(pending_row_list) - self.max_rows :]
+        overflow = self.rowCount() + len(pending_row_list) - self.max_rows
+        if overflow > 0:
+            self.dropped_row_count += overflow
+            self.remove_rows([(0, overflow - 1)])
+        self.insert_rows(self.rowCount(), pending_row_list)
+
+    def set_tick_rate(self, rate=60):
+        """
+        Turn on the ticking mode for the live cell updates, eg. the progress of thousands of render tasks.
+        The producers call post_update from any thread, the updates are applied in the main thread
+        rate times per second, as the merged dataChanged of one batch.
+        :param rate: how many flushes per second, eg. 30 or 60, 0 to turn it off
+        :return: None
+        """
+        self.tick_rate = rate
+        if rate:
+            self.tick_timer.start(max(1, int(1000 / rate)))
+        else:
+            self.tick_timer.stop()
+            self.flush_updates()
+
+    def post_update(self, key, field, value):
+        """
+        Post a new value of one field of the row found by the set_key key, it can be called from any thread.
+        Only the last value of the same field is applied on the next flush, the earlier ones are merged.
+        :param key: the value of the key set by set_key
+        :param field: the key of the row to change, it does not have to be in header_list
+        :param value: the new value
+        :return: None
+        """
+        if not self.tick_rate:
+            raise RuntimeError("Call set_tick_rate before post_update")
+        with self.update_lock:
+            field_dict = self.pending_update_map.get(key)
+            if field_dict is None:
+                field_dict = self.pending_update_map[key] = {}
+            elif field in field_dict:
+                self.tick_info["merged"] += 1
+            field_dict[field] = value
+            self.tick_info["posted"] += 1
+
+    def flush_updates(self):
+        """Apply the posted updates now, the rows which are not found by the key any more are dropped."""
+        # tick_info 也会被 post_update 在其他线程中修改，只在锁内读写
+        with self.update_lock:
+            pending_update_map = self.pending_update_map
+            if not pending_update_map:
+                return
+            self.pending_update_map = {}
+            self.tick_info["flushes"] += 1
+        applied_count = dropped_count = 0
+        changed_parent_dict = {}
+        # 同一个 parent 下相邻且列相同的行由 batch 合并成一个 dataChanged
+        with self.batch():
+            for key, field_dict in pending_update_map.items():
+                index = self.index_for_key(key)
+                if not index.isValid():
+                    dropped_count += len(field_dict)
+                    continue
+                applied_count += len(field_dict)
+                data_obj = self.get_data_obj(index)
+                column_list = self._update_row(data_obj, field_dict)
+                if column_list:
+                    parent_item = self._get_item(index.parent())
+                    changed_parent_dict[id(parent_item)] = parent_item
+                    self.invalidate_rows([data_obj])
+                    self._record_changed_cells(parent_item, (index.row(),), column_list)
+            for parent_item in changed_parent_dict.values():
+                self._refresh_check_state(parent_item)
+        with self.update_lock:
+            self.tick_info["applied"] += applied_count
+            self.tick_info["dropped"] += dropped_count
+
+    def get_tick_info(self):
+        """
+        Get the counters of the ticking mode: posted updates, merged ones replaced by a later value of the same field,
+        dropped ones whose row is not found, applied ones, and the flushes.
+        """
+        with self.update_lock:
+            return dict(self.tick_info, pending=sum(map(len, self.pending_update_map.values())))
+
+    @QtCore.Slot()
+    def _slot_drop_pending_rows(self):
+        self.append_timer.stop()
+        self.pending_row_list = []
 
     def set_data_list(self, data_list):
-        if hasattr(data_list, "next"):
+        self.timer.stop()
+        if hasattr(data_list, "__next__"):
             self.beginResetModel()
             self.root_item["children"] = []
-            self.endResetModel()
             self.data_generator = data_list
             self.origin_count = 0
-            self.timer.start()
+            self.endResetModel()
+            if self.auto_fetch:
+                self.timer.start()
         else:
             self.beginResetModel()
             self.root_item["children"] = data_list if data_list is not None else []
-            self.endResetModel()
             self.data_generator = None
+            self.endResetModel()
 
     def clear(self):
+        self.timer.stop()
         self.beginResetModel()
         self.root_item["children"] = []
+        self.data_generator = None
         self.endResetModel()
 
     def get_data_list(self):
         return self.root_item["children"]
 
     def append(self, data_dict):
-        self.root_item["children"].append(data_dict)
-        self.fetchMore()
+        self.extend([data_dict])
+
+    def extend(self, data_list):
+        """
+        Append the rows at the end with a single rowsInserted.
+        With set_max_rows, the rows are queued and inserted by the next flush_rows, call it in the main thread.
+        """
+        if self.max_rows is None:
+            self.insert_rows(self.rowCount(), data_list)
+            return
+        self.pending_row_list.extend(data_list)
+        if not self.append_timer.isActive():
+            self.append_timer.start()
+
+    def _get_item(self, index):
+        if index is not None and index.isValid():
+            return index.internalPointer()
+        return self.root_item
+
+    def _get_children_list(self, parent_item):
+        children_list = get_obj_value(parent_item, "children")
+        if children_list is None:
+            children_list = []
+            set_obj_value(parent_item, "children", children_list)
+        return children_list
+
+    def insert_rows(self, row, data_list, parent_index=None):
+        """
+        Insert the rows before the given row with a single rowsInserted.
+        :param row: int, the rows are appended when it is larger than the row count
+        :param data_list: list of row data objects
+        :param parent_index: the source model index of the parent, None for the top level
+        :return: None
+        """
+        data_list = list(data_list)
+        if not data_list:
+            return
+        parent_index = parent_index or QtCore.QModelIndex()
+        parent_item = self._get_item(parent_index)
+        children_list = self._get_children_list(parent_item)
+        row = max(0, min(row, len(children_list)))
+        # 新对象可能复用了已释放对象的 id，先清掉缓存
+        self.invalidate_rows(data_list)
+        self._flush_batch()
+        self.beginInsertRows(parent_index, row, row + len(data_list) - 1)
+        append = row == len(children_list)
+        children_list[row:row] = data_list
+        if self.data_key is not None:
+            self._index_keys(parent_item, data_list)
+        row_dict = self.row_cache.get(id(parent_item))
+        if row_dict is not None:
+            if append:
+                row_dict.update((id(data_obj), sub_row) for sub_row, data_obj in enumerate(data_list, row))
+            else:
+                # 后面的行号都变了
+                del self.row_cache[id(parent_item)]
+        self.endInsertRows()
+        self._refresh_check_state(parent_item)
+
+    def remove_rows(self, rows_or_ranges, parent_index=None):
+        """
+        Remove the given rows, the contiguous rows are removed together with a single rowsRemoved.
+        :param rows_or_ranges: iterable of int row, range, or inclusive (first, last) tuple
+        :param parent_index: the source model index of the parent, None for the top level
+        :return: None
+        """
+        parent_index = parent_index or QtCore.QModelIndex()
+        parent_item = self._get_item(parent_index)
+        children_list = self._get_children_list(parent_item)
+        self._flush_batch()
+        # 从后往前删，前面的行号不受影响
+        for first, last in reversed(_coalesce_rows(rows_or_ranges, len(children_list))):
+            self.beginRemoveRows(parent_index, first, last)
+            removed_list = children_list[first : last + 1]
+            del children_list[first : last + 1]
+            self.row_cache.pop(id(parent_item), None)
+            self._forget_items(removed_list)
+            self.endRemoveRows()
+            self.invalidate_rows(removed_list)
+        self._refresh_check_state(parent_item)
+
+    def move_rows(self, rows_or_ranges, destination, parent_index=None, destination_parent_index=None):
+        """
+        Move the given rows before the row destination, the moved rows keep their order.
+        The contiguous rows are moved together with a single rowsMoved, persistent indexes follow the rows.
+        :param rows_or_ranges: iterable of int row, range, or inclusive (first, last) tuple
+        :param destination: int, the row to insert before, in the row numbers before the move
+        :param parent_index: the source model index of the parent, None for the top level
+        :param destination_parent_index: the source model index of the new parent, None for the same parent
+        :return: bool, False if some rows can not be moved, eg. into their own children
+        """
+        parent_index = parent_index or QtCore.QModelIndex()
+        if destination_parent_index is None:
+            destination_parent_index = parent_index
+        range_list = _coalesce_rows(rows_or_ranges, self.rowCount(parent_index))
+        if not 0 <= destination <= self.rowCount(destination_parent_index):
+            raise IndexError("destination {} out of range".format(destination))
+        parent_item = self._get_item(parent_index)
+        destination_item = self._get_item(destination_parent_index)
+        if parent_item is destination_item:
+            move_list = _plan_moves(range_list, destination)
+        else:
+            # 移到别的 parent 下，源行号不受影响，从后往前逐块插到同一个位置即可保持顺序
+            move_list = [(first, last, destination) for first, last in reversed(range_list)]
+        result = True
+        self._flush_batch()
+        for first, last, dest in move_list:
+            if not self.beginMoveRows(parent_index, first, last, destination_parent_index, dest):
+                result = False
+                continue
+            self._move_rows_data(parent_item, first, last, destination_item, dest)
+            self.endMoveRows()
+        if parent_item is not destination_item:
+            self._refresh_check_state(parent_item)
+            self._refresh_check_state(destination_item)
+        return result
+
+    def _move_rows_data(self, parent_item, first, last, destination_item, destination):
+        children_list = self._get_children_list(parent_item)
+        if parent_item is destination_item:
+            _move_block(children_list, first, last, destination)
+        else:
+            block = children_list[first : last + 1]
+            del children_list[first : last + 1]
+            self._get_children_list(destination_item)[destination:destination] = block
+            for data_obj in block:
+                self.parent_map[id(data_obj)] = destination_item
+            self.row_cache.pop(id(destination_item), None)
+        self.row_cache.pop(id(parent_item), None)
+
+    def reorder_rows(self, row_list, parent_index=None):
+        """
+        Put the children rows of the parent in a new order with a single layoutChanged.
+        The persistent indexes follow the rows, it is used to sort the model in place.
+        :param row_list: the old row numbers in their new order, it contains every row once
+        :param parent_index: the source model index of the parent, None for the top level
+        :return: None
+        """
+        parent_index = parent_index or QtCore.QModelIndex()
+        row_count = self.rowCount(parent_index)
+        new_row_list = [-1] * row_count
+        for new_row, old_row in enumerate(row_list):
+            new_row_list[old_row] = new_row
+        if len(row_list) != row_count or -1 in new_row_list:
+            raise ValueError("row_list is not an order of the {} rows".format(row_count))
+        self._flush_batch()
+        self.layoutAboutToBeChanged.emit()
+        self._reorder_rows_data(self._get_item(parent_index), row_list)
+        old_index_list = [index for index in self.persistentIndexList() if index.parent() == parent_index]
+        self.changePersistentIndexList(
+            old_index_list,
+            [self.index(new_row_list[index.row()], index.column(), parent_index) for index in old_index_list],
+        )
+        self.layoutChanged.emit()
+
+    def _reorder_rows_data(self, parent_item, row_list):
+        children_list = self._get_children_list(parent_item)
+        children_list[:] = [children_list[row] for row in row_list]
+        self.row_cache.pop(id(parent_item), None)
+
+    def get_data_obj(self, index):
+        """Get the row data object of the given source model index."""
+        return index.internalPointer()
 
     def remove(self, data_dict):
-        row = self.root_item["children"].index(data_dict)
-        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
-        self.root_item["children"].remove(data_dict)
-        self.endRemoveRows()
+        row = self.get_child_row(self.root_item, data_dict)
+        if row is None:
+            row = self.root_item["children"].index(data_dict)
+        self.remove_rows([row])
+
+    def _get_row_list(self, parent_index):
+        return self._get_children_list(self._get_item(parent_index))
+
+    def update_data_list(self, data_list, key="id", parent_index=None):
+        """
+        Update the rows to the given data list by the primary key, instead of resetting the model.
+        The removed, new and moved rows are announced with coalesced remove/insert/move signals,
+        and dataChanged is only emitted for the cells whose values changed,
+        so the views keep their selection, expanded state and scroll position.
+        The existing row objects are kept and updated in place, the fields missing in the new rows are kept,
+        eg. the check states. The children lists are updated recursively in the same way.
+        :param data_list: list of new row data objects, the keys should be unique
+        :param key: the primary key attribute
+        :param parent_index: the source model index of the parent, None for the top level
+        :return: None
+        """
+        if self.data_generator is not None:
+            # 还在从 generator 加载数据，没法比较
+            self.set_data_list(data_list)
+            return
+        data_list = list(data_list)
+        parent_index = parent_index or QtCore.QModelIndex()
+        new_key_list = [get_obj_value(data_obj, key) for data_obj in data_list]
+        new_row_dict = {data_key: row for row, data_key in enumerate(new_key_list)}
+        if len(new_row_dict) != len(new_key_list):
+            raise ValueError("The {} of the new data list are not unique".format(key))
+
+        # 删除新数据中没有的行，以及重复的行
+        old_key_list = []
+        old_key_set = set()
+        removed_row_list = []
+        for row, data_obj in enumerate(self._get_row_list(parent_index)):
+            data_key = get_obj_value(data_obj, key)
+            if data_key in new_row_dict and data_key not in old_key_set:
+                old_key_list.append(data_key)
+                old_key_set.add(data_key)
+            else:
+                removed_row_list.append(row)
+        if removed_row_list:
+            self.remove_rows(removed_row_list, parent_index)
+
+        # 只移动不在最长递增子序列里的行，移动次数最少
+        stable_set = _longest_increasing_subsequence([new_row_dict[data_key] for data_key in old_key_list])
+        if len(stable_set) != len(old_key_list):
+            current_list = list(old_key_list)
+            ordered_list = sorted(old_key_list, key=new_row_dict.get)
+            for i, data_key in enumerate(ordered_list):
+                if new_row_dict[data_key] in stable_set:
+                    continue
+                from_row = current_list.index(data_key)
+                to_row = current_list.index(ordered_list[i - 1]) + 1 if i else 0
+                self.move_rows([from_row], to_row, parent_index)
+                current_list.insert(to_row - 1 if from_row < to_row else to_row, current_list.pop(from_row))
+
+        # 插入新行，连续的新行一次插入
+        for is_new, row_iter in itertools.groupby(
+            range(len(new_key_list)), key=lambda row: new_key_list[row] not in old_key_set
+        ):
+            if is_new:
+                row_list = list(row_iter)
+                self.insert_rows(row_list[0], [data_list[row] for row in row_list], parent_index)
+
+        # 原地更新保留下来的行，相邻且列相同的行由 batch 合并成一个 dataChanged
+        changed = False
+        parent_item = self._get_item(parent_index)
+        row_list = self._get_row_list(parent_index)
+        with self.batch():
+            for row, data_key in enumerate(new_key_list):
+                if data_key not in old_key_set:
+                    continue
+                column_list = self._update_row(row_list[row], data_list[row])
+                if column_list:
+                    changed = True
+                    self.invalidate_rows([row_list[row]])
+                    self._record_changed_cells(parent_item, (row,), column_list)
+                children_list = get_obj_value(data_list[row], "children")
+                if isinstance(children_list, list):
+                    self.update_data_list(children_list, key, self.index(row, 0, parent_index))
+            if changed:
+                self._refresh_check_state(parent_item)
+
+    def _update_row(self, data_obj, new_data_obj):
+        """
+        Copy the fields of new_data_obj into data_obj.
+        :return: the sorted columns to refresh,
+                 all the columns when a field out of header_list changed, since the formatters may read it
+        """
+        changed_set = set()
+        for attr, value in _get_row_fields(new_data_obj):
+            old_value = get_obj_value(data_obj, attr)
+            if attr != "children" and old_value != value:
+                set_obj_value(data_obj, attr, value)
+                changed_set.add(attr)
+                if attr == self.data_key:
+                    self._update_key(data_obj, old_value)
+        if not changed_set:
+            return []
+        column_list = []
+        column_key_set = set()
+        for column, attr_dict in enumerate(self.header_list):
+            attr = attr_dict.get("key")
+            column_key_set.update((attr, "{}_checked".format(attr)))
+            if attr in changed_set or "{}_checked".format(attr) in changed_set:
+                column_list.append(column)
+        if changed_set - column_key_set:
+            return list(range(len(self.header_list)))
+        return column_list
 
     def flags(self, index):
-        result = QtCore.QAbstractItemModel.flags(self, index)
         if not index.isValid():
             return QtCore.Qt.ItemIsEnabled
-        
-        data_obj = index.internalPointer()
-        if data_obj.get("_is_group", False):
-            return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
 
-        if self.header_list[index.column()].get("checkable", False):
-            result |= QtCore.Qt.ItemIsUserCheckable
-        if self.header_list[index.column()].get("selectable", False):
-            result |= QtCore.Qt.ItemIsEditable
-        if self.header_list[index.column()].get("editable", False):
-            result |= QtCore.Qt.ItemIsEditable
-        if self.header_list[index.column()].get("draggable", False):
-            result |= QtCore.Qt.ItemIsDragEnabled
-        if self.header_list[index.column()].get("droppable", False):
-            result |= QtCore.Qt.ItemIsDropEnabled
-        return QtCore.Qt.ItemFlags(result)
+        data_obj = self.get_data_obj(index)
+        if get_obj_value(data_obj, "_is_group", False):
+            return QtCore.Qt.ItemIsEnabled | QtCore.Qt.ItemIsSelectable
+        return self.column_flag_list[index.column()]
 
     def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
         if orientation == QtCore.Qt.Vertical:
@@ -127,10 +1444,10 @@ class MTableModel(QtCore.QAbstractItemModel):
             parent_item = self.root_item
 
         children_list = get_obj_value(parent_item, "children")
-        if children_list and len(children_list) > row:
+        if children_list and not callable(children_list) and len(children_list) > row:
             child_item = children_list[row]
             if child_item:
-                set_obj_value(child_item, "_parent", parent_item)
+                self.parent_map[id(child_item)] = parent_item
                 return self.createIndex(row, column, child_item)
         return QtCore.QModelIndex()
 
@@ -139,16 +1456,18 @@ class MTableModel(QtCore.QAbstractItemModel):
             return QtCore.QModelIndex()
 
         child_item = index.internalPointer()
-        parent_item = get_obj_value(child_item, "_parent")
+        parent_item = self.parent_map.get(id(child_item))
 
         if parent_item is None:
             return QtCore.QModelIndex()
 
-        grand_item = get_obj_value(parent_item, "_parent")
+        grand_item = self.parent_map.get(id(parent_item))
         if grand_item is None:
             return QtCore.QModelIndex()
-        parent_list = get_obj_value(grand_item, "children")
-        return self.createIndex(parent_list.index(parent_item), 0, parent_item)
+        row = self.get_child_row(grand_item, parent_item)
+        if row is None:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, 0, parent_item)
 
     def rowCount(self, parent_index=None):
         if parent_index and parent_index.isValid():
@@ -156,10 +1475,10 @@ class MTableModel(QtCore.QAbstractItemModel):
         else:
             parent_item = self.root_item
         children_obj = get_obj_value(parent_item, "children")
-        if hasattr(children_obj, "next") or (children_obj is None):
+        if children_obj is None or callable(children_obj):
+            # 延迟加载的 children 在 fetchMore 之前没有行
             return 0
-        else:
-            return len(children_obj)
+        return len(children_obj)
 
     def hasChildren(self, parent_index=None):
         if parent_index and parent_index.isValid():
@@ -169,160 +1488,1839 @@ class MTableModel(QtCore.QAbstractItemModel):
         children_obj = get_obj_value(parent_data, "children")
         if children_obj is None:
             return False
-        if hasattr(children_obj, "next"):
+        if callable(children_obj):
             return True
-        else:
-            return len(children_obj)
+        return len(children_obj) > 0
 
     def columnCount(self, parent_index=None):
         return len(self.header_list)
 
     def canFetchMore(self, index):
-        try:
-            if self.data_generator:
-                data = self.data_generator.next()
-                self.root_item["children"].append(data)
-                return True
-            return False
-        except StopIteration:
-            if self.timer.isActive():
-                self.timer.stop()
-            return False
+        if index is not None and index.isValid():
+            return callable(get_obj_value(index.internalPointer(), "children"))
+        return self.data_generator is not None
 
     def fetchMore(self, index=None):
-        self.beginResetModel()
-        self.endResetModel()
+        """
+        Pull the next chunk of rows from the data generator and insert them at the end.
+        For a tree node whose children is a loader function, run it in background, see fetch_children.
+        """
+        if index is not None and index.isValid():
+            self.fetch_children(index)
+            return
+        if self.data_generator is None:
+            return
+        chunk = list(itertools.islice(self.data_generator, self.fetch_chunk_size))
+        if chunk:
+            self.extend(chunk)
+            self.sig_fetch_progress.emit(self.rowCount())
+        if len(chunk) < self.fetch_chunk_size:
+            self.data_generator = None
+            self.timer.stop()
+            self.sig_fetch_finished.emit()
+
+    def fetch_children(self, parent_index):
+        """
+        Load the children of a lazy tree node.
+        The "children" of a node can be a function without argument instead of a list, it returns an iterable,
+        a generator, a coroutine or an async iterable of the children rows.
+        It is called in a worker thread when the node is expanded, a loading row is shown under the node,
+        and the results are inserted by chunks of fetch_chunk_size.
+        After it is finished, the "children" of the node is replaced by the loaded list.
+        :param parent_index: the source model index of the node
+        :return: None
+        """
+        parent_item = parent_index.internalPointer()
+        loader = get_obj_value(parent_item, "children")
+        if not callable(loader):
+            return
+        self._flush_batch()
+        self.beginInsertRows(parent_index, 0, 0)
+        set_obj_value(parent_item, "children", [_LoadingRow(self.loading_text)])
+        self.endInsertRows()
+        self._start_loader(loader, self.fetch_chunk_size, parent_item)
+
+    def set_data_loader(self, loader, chunk_size=None):
+        """
+        Clear the model, then load the rows with loader in a worker thread.
+        The rows are appended by chunks, sig_fetch_progress is emitted for each chunk and sig_fetch_finished at last.
+        Setting new data, or clear the model, cancels the running loader.
+        :param loader: function without argument, it returns an iterable, a generator,
+                       a coroutine or an async iterable of the rows
+        :param chunk_size: how many rows are inserted at once, default to fetch_chunk_size
+        :return: None
+        """
+        self.clear()
+        self._start_loader(loader, chunk_size or self.fetch_chunk_size, self.root_item)
+
+    def _start_loader(self, loader, chunk_size, parent_item):
+        chunk_loader = ChunkLoader(loader, chunk_size, parent=self, context=parent_item)
+        chunk_loader.signals.sig_chunk_loaded.connect(self._slot_children_loaded)
+        chunk_loader.signals.sig_failed.connect(self._slot_children_failed)
+        chunk_loader.signals.sig_finished.connect(self._slot_loader_finished)
+        self.lazy_loader_map[id(parent_item)] = chunk_loader
+        self.running_loader_set.add(chunk_loader)
+        chunk_loader.start()
+
+    def cancel_fetch(self, parent_index):
+        """
+        Cancel the loading children of a lazy tree node, eg. when the node is collapsed.
+        The loaded rows are removed, and the loader is set back, so it will be loaded again on next expand.
+        """
+        if not parent_index.isValid():
+            return
+        parent_item = parent_index.internalPointer()
+        chunk_loader = self.lazy_loader_map.get(id(parent_item))
+        if chunk_loader is None:
+            return
+        children_list = get_obj_value(parent_item, "children")
+        self.remove_rows([(0, len(children_list) - 1)], parent_index)
+        self._cancel_loader(parent_item)
+
+    def _cancel_loader(self, parent_item):
+        chunk_loader = self.lazy_loader_map.pop(id(parent_item), None)
+        if chunk_loader is not None:
+            chunk_loader.cancel()
+            if parent_item is not self.root_item:
+                set_obj_value(parent_item, "children", chunk_loader.loader)
+
+    @QtCore.Slot()
+    def _slot_cancel_all_fetch(self):
+        for chunk_loader in list(self.lazy_loader_map.values()):
+            self._cancel_loader(chunk_loader.context)
+
+    def _get_loading_index(self, chunk_loader):
+        """
+        Get the index of the node loaded by chunk_loader, an invalid index for the root.
+        :return: None if it is canceled or the node is not in the model any more
+        """
+        parent_item = chunk_loader.context
+        if self.lazy_loader_map.get(id(parent_item)) is not chunk_loader:
+            return None
+        if parent_item is self.root_item:
+            return QtCore.QModelIndex()
+        grand_item = self.parent_map.get(id(parent_item))
+        row = None if grand_item is None else self.get_child_row(grand_item, parent_item)
+        if row is None:
+            return None
+        return self.createIndex(row, 0, parent_item)
+
+    @QtCore.Slot(object, object)
+    def _slot_children_loaded(self, chunk_loader, chunk):
+        parent_index = self._get_loading_index(chunk_loader)
+        if parent_index is None:
+            return
+        if parent_index.isValid():
+            # 插在 loading 行之前
+            self.insert_rows(self.rowCount(parent_index) - 1, chunk, parent_index)
+        else:
+            self.extend(chunk)
+            self.sig_fetch_progress.emit(self.rowCount())
+
+    @QtCore.Slot(object, str)
+    def _slot_children_failed(self, chunk_loader, message):
+        parent_index = self._get_loading_index(chunk_loader)
+        if parent_index is None:
+            return
+        if parent_index.isValid():
+            self.cancel_fetch(parent_index)
+            self.sig_fetch_failed.emit(chunk_loader.context, message)
+        else:
+            # 已经加载的行保留
+            self.lazy_loader_map.pop(id(self.root_item))
+            self.sig_fetch_failed.emit(None, message)
+
+    @QtCore.Slot(object)
+    def _slot_loader_finished(self, chunk_loader):
+        parent_index = self._get_loading_index(chunk_loader)
+        if parent_index is not None:
+            self.lazy_loader_map.pop(id(chunk_loader.context))
+            if parent_index.isValid():
+                self.remove_rows([self.rowCount(parent_index) - 1], parent_index)
+            else:
+                self.sig_fetch_finished.emit()
+        self.running_loader_set.discard(chunk_loader)
+        chunk_loader.signals.deleteLater()
 
     def data(self, index, role=QtCore.Qt.DisplayRole):
         if not index.isValid():
             return None
+        if self.data_cache is not None:
+            return self._get_cached_data(index, role)
+        return self._get_data(self.get_data_obj(index), index.column(), role)
 
-        data_obj = index.internalPointer()
-        if data_obj.get("_is_group", False):
-            if index.column() != 0:
-                if role == QtCore.Qt.DisplayRole:
-                    return ""
-                return None
-            if role == QtCore.Qt.CheckStateRole:
-                return None
+    def _get_cached_data(self, index, role):
+        data_obj = self.get_data_obj(index)
+        row_key = self._get_row_key(data_obj)
+        row_cache = self.data_cache.get(row_key)
+        if row_cache is None:
+            row_cache = self.data_cache[row_key] = {}
+            if len(self.data_cache) > self.data_cache_max_rows:
+                self.data_cache.popitem(last=False)
+        else:
+            self.data_cache.move_to_end(row_key)
+        cell_key = (index.column(), role)
+        if cell_key in row_cache:
+            self.data_cache_hits += 1
+            return row_cache[cell_key]
+        self.data_cache_misses += 1
+        result = row_cache[cell_key] = self._get_data(data_obj, cell_key[0], role)
+        return result
 
-        attr_dict = self.header_list[index.column()]  # 获取该列字段的配置
-        attr = attr_dict.get("key")
-        if role in SETTING_MAP.keys():
-            role_key = SETTING_MAP[role].get("config")  # role 配置的关键字
-            formatter_from_config = attr_dict.get(role_key)  # header中该role的配置
-            if not formatter_from_config and role not in [
-                QtCore.Qt.DisplayRole,
-                QtCore.Qt.EditRole,
-                QtCore.Qt.ToolTipRole,
-            ]:
-                # 如果header中没有配置该role，而且也不是 DisplayRole/EditRole，直接返回None
+    def _get_data(self, data_obj, column, role):
+        if data_obj.__class__ is self.row_class:
+            cell_getter = self.row_class_role_list[column].get(role)
+            return None if cell_getter is None else cell_getter(data_obj)
+        if data_obj.get("_is_group") if isinstance(data_obj, dict) else getattr(data_obj, "_is_group", False):
+            if isinstance(data_obj, _LoadingRow):
+                return data_obj.text if column == 0 and role == QtCore.Qt.DisplayRole else None
+            if column != 0:
+                return "" if role == QtCore.Qt.DisplayRole else None
+            if role == QtCore.Qt.CheckStateRole:
                 return None
-            else:
-                value = apply_formatter(
-                    formatter_from_config,
-                    get_obj_value(data_obj, attr),
-                    data_obj
-                )
-            formatter_from_model = SETTING_MAP[role].get("formatter", None)  # role 配置的转换函数
-            result = apply_formatter(formatter_from_model, value)
-            return result
 
-        if role == QtCore.Qt.CheckStateRole and attr_dict.get("checkable", False):
-            state = get_obj_value(data_obj, attr + "_checked")
-            return QtCore.Qt.Unchecked if state is None else state
-        return None
+        cell_getter = self.column_role_list[column].get(role)
+        if cell_getter is None:
+            # header 中没有配置该 role
+            return None
+        return cell_getter(data_obj)
 
     def setData(self, index, value, role=QtCore.Qt.EditRole):
         if index.isValid() and role in [QtCore.Qt.CheckStateRole, QtCore.Qt.EditRole]:
             attr_dict = self.header_list[index.column()]
             key = attr_dict.get("key")
-            data_obj = index.internalPointer()
+            data_obj = self.get_data_obj(index)
             if role == QtCore.Qt.CheckStateRole and attr_dict.get("checkable", False):
-                key += "_checked"
-                # 更新自己
-                set_obj_value(data_obj, key, value)
-                self.dataChanged.emit(index, index)
-
-                # 更新它的children
-                for row, sub_obj in enumerate(get_obj_value(data_obj, "children", [])):
-                    set_obj_value(sub_obj, key, value)
-                    sub_index = self.index(row, index.column(), index)
-                    self.dataChanged.emit(sub_index, sub_index)
-
-                # 更新它的parent
-                parent_index = index.parent()
-                if parent_index.isValid():
-                    parent_obj = parent_index.internalPointer()
-                    new_parent_value = value
-                    old_parent_value = get_obj_value(parent_obj, key)
-                    parent = get_obj_value(data_obj, "_parent")
-                    parent_children = get_obj_value(parent, "children", [])
-                    for sibling_obj in parent_children:
-                        if value != get_obj_value(sibling_obj, key):
-                            new_parent_value = 1
-                            break
-                    if new_parent_value != old_parent_value:
-                        set_obj_value(parent_obj, key, new_parent_value)
-                        self.dataChanged.emit(parent_index, parent_index)
+                self.set_check_state(index, value)
             else:
+                old_value = get_obj_value(data_obj, key)
                 set_obj_value(data_obj, key, value)
-                # 采用 self.dataChanged.emit方式在houdini16里面会报错
-                # TypeError: dataChanged(QModelIndex,QModelIndex,QVector<int>) only accepts 3 arguments, 3 given!
-                # 所以临时使用旧式信号的发射方式
-                self.dataChanged.emit(index, index)
-                # self.dataChanged.emit(index, index)
+                if key == self.data_key:
+                    self._update_key(data_obj, old_value)
+                self.emit_data_changed(index, index)
             return True
         else:
             return False
 
+    def set_check_state(self, index, state):
+        """
+        Set the check state of a checkable cell, and propagate it to all the descendants and ancestors.
+        Each item keeps the counts of its checked and partially checked children,
+        so the ancestors are updated in O(depth), and the descendants emit one dataChanged for each parent.
+        :param index: the source model index of a checkable column
+        :param state: QtCore.Qt.CheckState, Checked and Unchecked are propagated to all the descendants
+        :return: None
+        """
+        column = index.column()
+        key = "{}_checked".format(self.header_list[column].get("key"))
+        data_obj = self.get_data_obj(index)
+        state = _get_check_value(state)
+        old_state = _get_check_value(get_obj_value(data_obj, key))
+        with self.batch():
+            set_obj_value(data_obj, key, QtCore.Qt.CheckState(state))
+            self.emit_data_changed(index, index, [QtCore.Qt.CheckStateRole])
+            if state != PARTIALLY_CHECKED:
+                self._set_descendant_check_state(data_obj, key, column, state)
+            if state != old_state:
+                self._update_ancestor_check_state(
+                    self.parent_map.get(id(data_obj)), key, column, ((old_state, -1), (state, 1))
+                )
+
+    def _set_descendant_check_state(self, data_obj, key, column, state):
+        check_state = QtCore.Qt.CheckState(state)
+        count_dict = self.check_count_map.setdefault(column, {})
+        item_list = [data_obj]
+        while item_list:
+            next_item_list = []
+            for item in item_list:
+                children_list = get_obj_value(item, "children")
+                if not isinstance(children_list, list) or not children_list:
+                    continue
+                for sub_item in children_list:
+                    set_obj_value(sub_item, key, check_state)
+                    self.parent_map[id(sub_item)] = item
+                count_dict[id(item)] = [len(children_list) if state == CHECKED else 0, 0]
+                # 同一个 parent 下的所有 children 只发一次
+                self.emit_data_changed(
+                    self.createIndex(0, column, children_list[0]),
+                    self.createIndex(len(children_list) - 1, column, children_list[-1]),
+                    [QtCore.Qt.CheckStateRole],
+                )
+                next_item_list.extend(children_list)
+            item_list = next_item_list
+
+    def _update_ancestor_check_state(self, parent_item, key, column, delta_list):
+        """
+        Update the check state of parent_item and its ancestors, stop at the first one which does not change.
+        :param delta_list: the (child state, count delta) pairs to apply on the counts of parent_item
+        """
+        count_dict = self.check_count_map.setdefault(column, {})
+        while parent_item is not None and parent_item is not self.root_item:
+            children_list = get_obj_value(parent_item, "children")
+            if not isinstance(children_list, list) or not children_list:
+                break
+            count = count_dict.get(id(parent_item))
+            if count is None:
+                # 第一次用到，统计时已经包含了 child 的新状态
+                count = count_dict[id(parent_item)] = [0, 0]
+                for sub_item in children_list:
+                    sub_state = _get_check_value(get_obj_value(sub_item, key))
+                    if sub_state == CHECKED:
+                        count[0] += 1
+                    elif sub_state == PARTIALLY_CHECKED:
+                        count[1] += 1
+            else:
+                for sub_state, delta in delta_list:
+                    if sub_state == CHECKED:
+                        count[0] += delta
+                    elif sub_state == PARTIALLY_CHECKED:
+                        count[1] += delta
+
+            if count[0] == len(children_list):
+                state = CHECKED
+            elif count[0] or count[1]:
+                state = PARTIALLY_CHECKED
+            else:
+                state = UNCHECKED
+            old_state = _get_check_value(get_obj_value(parent_item, key))
+            if old_state == state:
+                break
+            set_obj_value(parent_item, key, QtCore.Qt.CheckState(state))
+            grand_item = self.parent_map.get(id(parent_item))
+            row = None if grand_item is None else self.get_child_row(grand_item, parent_item)
+            if row is not None:
+                parent_index = self.createIndex(row, column, parent_item)
+                self.emit_data_changed(parent_index, parent_index, [QtCore.Qt.CheckStateRole])
+            delta_list = ((old_state, -1), (state, 1))
+            parent_item = grand_item
+
+
+def _make_column(values):
+    """Pack the values into a typed array when they are all int or all float, else keep a list."""
+    value_types = set(map(type, values))
+    if value_types == {int}:
+        try:
+            return array.array("q", values)
+        except OverflowError:
+            return list(values)
+    if value_types == {float}:
+        return array.array("d", values)
+    return list(values)
+
+
+# array 的 typecode 对应的值类型, 必须类型完全一致: bool 是 int 的子类, 存进 int 列会变成 1
+_ARRAY_VALUE_TYPE = {"q": int, "d": float}
+
+
+def _to_array(typecode, values):
+    """Pack the values into an array of the given typecode, return None if any value does not fit its type."""
+    value_type = _ARRAY_VALUE_TYPE[typecode]
+    if any(type(value) is not value_type for value in values):
+        return None
+    try:
+        return array.array(typecode, values)
+    except OverflowError:
+        return None
+
+
+# numpy 在第一次用到时才导入, False 表示还没有导入
+_numpy = False
+
+
+def _get_numpy():
+    """Import numpy on the first sort of a typed column, it is slow to import. Return None if it is not installed."""
+    global _numpy
+    if _numpy is False:
+        try:
+            # Import third-party modules
+            import numpy as _numpy
+        except ImportError:
+            _numpy = None
+    return _numpy
+
+
+def _sort_row_list(values, reverse=False):
+    """Return the row numbers ordered by the given column values."""
+    numpy = _get_numpy() if isinstance(values, array.array) and len(values) else None
+    if numpy is not None:
+        row_list = numpy.argsort(numpy.frombuffer(values, dtype=values.typecode), kind="stable")
+        return (row_list[::-1] if reverse else row_list).tolist()
+    try:
+        return sorted(range(len(values)), key=lambda row: (values[row] is None, values[row]), reverse=reverse)
+    except TypeError:
+        # 混合类型无法直接比较，退回按字符串排序
+        return sorted(range(len(values)), key=lambda row: str(values[row]), reverse=reverse)
+
+
+class _ColumnRow(object):
+    """
+    A light-weight row object of MColumnTableModel.
+    It reads and writes the model columns directly, and supports both attribute and dict style access,
+    so it can be used in header formatters as a normal row data object.
+    """
+
+    __slots__ = ("_model", "_row")
+    _is_group = False
+
+    def __init__(self, model, row):
+        object.__setattr__(self, "_model", model)
+        object.__setattr__(self, "_row", row)
+
+    def __getattr__(self, attr):
+        column = self._model.column_dict.get(attr)
+        if column is None:
+            raise AttributeError(attr)
+        return column[self._row]
+
+    def __setattr__(self, attr, value):
+        self._model.set_value(self._row, attr, value)
+
+    def __getitem__(self, attr):
+        try:
+            return self.__getattr__(attr)
+        except AttributeError:
+            raise KeyError(attr) from None
+
+    def __eq__(self, other):
+        return isinstance(other, _ColumnRow) and self._model is other._model and self._row == other._row
+
+    def __hash__(self):
+        return hash((id(self._model), self._row))
+
+    def get(self, attr, default=None):
+        return getattr(self, attr, default)
+
+    def keys(self):
+        return self._model.column_dict.keys()
+
+    def to_dict(self):
+        return {key: column[self._row] for key, column in self._model.column_dict.items()}
+
+
+class _ColumnRowList(collections.abc.Sequence):
+    """Read-only sequence of MColumnTableModel rows, returned by get_data_list."""
+
+    def __init__(self, model):
+        self._model = model
+
+    def __len__(self):
+        return self._model.row_count
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [_ColumnRow(self._model, i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(row)
+        return _ColumnRow(self._model, row)
+
+
+class MColumnTableModel(MTableModel):
+    """
+    A flat table model which stores one column per header key instead of one dict per row.
+    Integer and float columns are packed into stdlib arrays, other columns are plain lists.
+    Sorting uses numpy when it is installed.
+    The row object given to formatters and returned by get_data_obj is a light row view over the columns.
+    Besides the header keys, every key of the dict rows is kept as a column, so the formatters can read the
+    other fields of the row too. For object rows only the header keys are kept.
+    """
+
+    def __init__(self, parent=None):
+        super(MColumnTableModel, self).__init__(parent)
+        self.column_dict = {}
+        self.row_count = 0
+        # set_key 声明的主键: key value -> row, 行号变化后置为 None, 下次查找时重建
+        self.key_row_dict = None
+
+    def _get_column_keys(self, data_list):
+        # 用 dict 保持顺序并去重, 只用到它的 key
+        key_dict = {}
+        for attr_dict in self.header_list:
+            key = attr_dict.get("key")
+            key_dict[key] = None
+            if attr_dict.get("checkable", False):
+                key_dict[key + "_checked"] = None
+        for data_obj in data_list:
+            if isinstance(data_obj, dict):
+                key_dict.update(data_obj)
+        return list(key_dict)
+
+    def _reset_columns(self, column_dict, row_count):
+        self.beginResetModel()
+        self.column_dict = column_dict
+        self.row_count = row_count
+        self.key_row_dict = None
+        self.endResetModel()
+
+    def set_column_data(self, column_dict):
+        """
+        Set the data with a dict of key -> column values, all the columns must have the same length.
+        This avoids building any row dict, eg. when the data comes from a column oriented query.
+        """
+        length_set = set(map(len, column_dict.values()))
+        if len(length_set) > 1:
+            raise ValueError("All the columns should have the same length, but get {}".format(sorted(length_set)))
+        self.timer.stop()
+        self.data_generator = None
+        self._reset_columns(
+            {key: _make_column(values) for key, values in column_dict.items()},
+            length_set.pop() if length_set else 0,
+        )
+
+    def set_data_list(self, data_list):
+        self.timer.stop()
+        if hasattr(data_list, "__next__"):
+            self._reset_columns({}, 0)
+            self.data_generator = data_list
+            if self.auto_fetch:
+                self.timer.start()
+        else:
+            data_list = data_list or []
+            self.data_generator = None
+            self._reset_columns(
+                {
+                    key: _make_column([get_obj_value(data_obj, key) for data_obj in data_list])
+                    for key in self._get_column_keys(data_list)
+                },
+                len(data_list),
+            )
+
+    def clear(self):
+        self.timer.stop()
+        self.data_generator = None
+        self._reset_columns({}, 0)
+
+    def get_data_list(self):
+        return _ColumnRowList(self)
+
+    def _get_row_list(self, parent_index):
+        return self.get_data_list()
+
+    def get_column(self, key):
+        """Get the whole column of the given key, it is an array or a list."""
+        return self.column_dict.get(key)
+
+    def get_value(self, row, key):
+        column = self.column_dict.get(key)
+        return None if column is None else column[row]
+
+    def set_value(self, row, key, value):
+        column = self.column_dict.get(key)
+        if column is None:
+            column = self.column_dict[key] = [None] * self.row_count
+        elif isinstance(column, array.array) and type(value) is not _ARRAY_VALUE_TYPE[column.typecode]:
+            # 类型不符合 array 的类型，退化成 list
+            column = self.column_dict[key] = list(column)
+        try:
+            column[row] = value
+        except (TypeError, OverflowError):
+            # 类型不符合 array 的类型，退化成 list
+            column = self.column_dict[key] = list(column)
+            column[row] = value
+        if key == self.data_key:
+            self.key_row_dict = None
+
+    @QtCore.Slot()
+    def _slot_rebuild_key_map(self):
+        self.key_row_dict = None
+
+    def _update_key(self, data_obj, old_value):
+        # set_value 中已经处理
+        pass
+
+    def index_for_key(self, value, column=0):
+        if self.data_key is None:
+            return QtCore.QModelIndex()
+        if self.key_row_dict is None:
+            self.key_row_dict = {
+                key_value: row for row, key_value in enumerate(self.column_dict.get(self.data_key) or [])
+            }
+        row = self.key_row_dict.get(value)
+        return QtCore.QModelIndex() if row is None else self.createIndex(row, column)
+
+    def get_data_obj(self, index):
+        return _ColumnRow(self, index.row())
+
+    def _get_row_key(self, data_obj):
+        return data_obj._row
+
+    def insert_rows(self, row, data_list, parent_index=None):
+        data_list = list(data_list)
+        if not data_list or (parent_index is not None and parent_index.isValid()):
+            return
+        row_count = self.row_count
+        row = max(0, min(row, row_count))
+        self._flush_batch()
+        self.beginInsertRows(QtCore.QModelIndex(), row, row + len(data_list) - 1)
+        if not self.column_dict:
+            # 第一批数据，由它决定每一列的存储类型
+            for key in self._get_column_keys(data_list):
+                values = [get_obj_value(data_obj, key) for data_obj in data_list]
+                self.column_dict[key] = _make_column([None] * row + values + [None] * (row_count - row))
+        else:
+            for key in self._get_column_keys(data_list):
+                if key not in self.column_dict:
+                    # 新的行带来的新字段，之前的行都是 None
+                    self.column_dict[key] = [None] * row_count
+            for key, column in list(self.column_dict.items()):
+                values = [get_obj_value(data_obj, key) for data_obj in data_list]
+                if isinstance(column, array.array):
+                    array_values = _to_array(column.typecode, values)
+                    if array_values is None:
+                        # 类型不符合 array 的类型，退化成 list
+                        column = self.column_dict[key] = list(column)
+                    else:
+                        values = array_values
+                column[row:row] = values
+        self.row_count += len(data_list)
+        if row < row_count:
+            # 缓存以行号为键，插入后行号整体偏移
+            self.invalidate_rows()
+            self.key_row_dict = None
+        elif self.key_row_dict is not None and self.data_key is not None:
+            self.key_row_dict.update(
+                (get_obj_value(data_obj, self.data_key), sub_row) for sub_row, data_obj in enumerate(data_list, row)
+            )
+        self.endInsertRows()
+
+    def remove(self, data_obj):
+        if not isinstance(data_obj, _ColumnRow) or data_obj._model is not self:
+            raise ValueError("{} is not a row of this model".format(data_obj))
+        self.remove_rows([data_obj._row])
+
+    def remove_rows(self, rows_or_ranges, parent_index=None):
+        if parent_index is not None and parent_index.isValid():
+            return
+        self._flush_batch()
+        for first, last in reversed(_coalesce_rows(rows_or_ranges, self.row_count)):
+            self.beginRemoveRows(QtCore.QModelIndex(), first, last)
+            for column in self.column_dict.values():
+                del column[first : last + 1]
+            self.row_count -= last - first + 1
+            # 缓存以行号为键，删除后行号整体偏移
+            self.invalidate_rows()
+            self.key_row_dict = None
+            self.endRemoveRows()
+
+    def _move_rows_data(self, parent_item, first, last, destination_item, destination):
+        for column in self.column_dict.values():
+            _move_block(column, first, last, destination)
+        self.invalidate_rows()
+        self.key_row_dict = None
+
+    def index(self, row, column, parent_index=None):
+        if (parent_index and parent_index.isValid()) or not 0 <= row < self.row_count:
+            return QtCore.QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index):
+        return QtCore.QModelIndex()
+
+    def rowCount(self, parent_index=None):
+        if parent_index and parent_index.isValid():
+            return 0
+        return self.row_count
+
+    def hasChildren(self, parent_index=None):
+        if parent_index and parent_index.isValid():
+            return False
+        return self.row_count > 0
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        """Sort the columns in place, used when a view is connected to this model without proxy."""
+        if not 0 <= column < len(self.header_list):
+            return
+        values = self.column_dict.get(self.header_list[column].get("key"))
+        if values is None or not self.row_count:
+            return
+        self.reorder_rows(_sort_row_list(values, reverse=order == QtCore.Qt.DescendingOrder))
+
+    def _reorder_rows_data(self, parent_item, row_list):
+        for key, old_column in self.column_dict.items():
+            new_values = [old_column[row] for row in row_list]
+            if isinstance(old_column, array.array):
+                self.column_dict[key] = array.array(old_column.typecode, new_values)
+            else:
+                self.column_dict[key] = new_values
+        # 缓存以行号为键
+        self.invalidate_rows()
+        self.key_row_dict = None
+
+
+def _sort_key_order(key_list, reverse=False):
+    """
+    Return the rows ordered by the keys of natural_sort_key, it only uses its arguments so it can run in a thread.
+    The numbers come before the texts, the rows of None are always at the end, the equal keys keep their order.
+    """
+    type_set = set(map(type, key_list))
+    if type_set == {str} or not (str in type_set or type(None) in type_set):
+        # 只有文字或者只有数字时, 直接排序
+        return sorted(range(len(key_list)), key=key_list.__getitem__, reverse=reverse)
+    number_row_list = []
+    text_row_list = []
+    none_row_list = []
+    for row, key in enumerate(key_list):
+        if key is None:
+            none_row_list.append(row)
+        elif key.__class__ is str:
+            text_row_list.append(row)
+        else:
+            number_row_list.append(row)
+    number_row_list.sort(key=key_list.__getitem__, reverse=reverse)
+    text_row_list.sort(key=key_list.__getitem__, reverse=reverse)
+    if reverse:
+        return text_row_list + number_row_list + none_row_list
+    return number_row_list + text_row_list + none_row_list
+
+
+class _FilterSlice(object):
+    """The state of a time sliced filtering of MSortFilterModel: the rows to match and the mask matched so far."""
+
+    def __init__(self, key, row_list, row_count):
+        self.key = key
+        self.row_list = row_list
+        self.mask = bytearray(row_count)
+        self.position = 0
+        # 已经用于匹配的秒数, 以及上次显示部分结果的时间
+        self.match_time = 0.0
+        self.apply_time = time.perf_counter()
+
 
 class MSortFilterModel(QtCore.QSortFilterProxyModel):
+    sig_filter_applied = QtCore.Signal()
+    sig_filter_progress = QtCore.Signal(int)
+    sig_fuzzy_ranking_changed = QtCore.Signal(bool)
+
     def __init__(self, parent=None):
         super(MSortFilterModel, self).__init__(parent)
         if hasattr(self, "setRecursiveFilteringEnabled"):
             self.setRecursiveFilteringEnabled(True)
         self.header_list = []
+        self.search_column_list = []
+        self.filter_column_list = []
         self.search_reg = None
+        # 不含正则特殊字符的搜索内容，直接用小写子串匹配
+        self.search_literal = None
         # self.search_reg.setCaseSensitivity(QtCore.Qt.CaseInsensitive)
         # self.search_reg.setPatternSyntax(QtCore.QRegExp.Wildcard)
+        # 需要匹配的列: 搜索列和有 reg 的筛选列, 每行缓存这些列的小写显示文字
+        self.text_column_list = []
+        self.search_position_list = []
+        self.filter_position_list = []
+        # id(source parent item) -> (parent item, [row text tuple, None 表示需要重新计算])
+        self.search_text_map = {}
+        # 根节点每一行的匹配结果 bytearray, 以及对应的 (search literal, search pattern, filter patterns)
+        self.filter_mask = None
+        self.filter_mask_key = None
+        # 最近的搜索结果 key -> mask, 删除输入时直接使用
+        self.search_cache = collections.OrderedDict()
+        self.search_cache_size = 8
+        # 并行筛选: 在 executor 中算好根节点每一行是否匹配
+        self.filter_executor = None
+        self.filter_chunk_size = 20000
+        self.filter_loader = None
+        # 计算期间 source 的根节点有改动, 算完后丢弃结果重新计算
+        self.filter_mask_stale = False
+        self.running_loader_set = set()
+        # 分片筛选: 每次事件循环只匹配 filter_slice_msec 毫秒, 0 表示一次匹配完
+        self.filter_slice_msec = 0
+        self.filter_slice = None
+        # 上一次分片筛选显示结果的秒数, 剩余的匹配时间比它长很多时才显示部分结果
+        self.filter_apply_cost = 0.0
+        self.filter_slice_timer = QtCore.QTimer(self)
+        self.filter_slice_timer.setSingleShot(True)
+        self.filter_slice_timer.setInterval(0)
+        self.filter_slice_timer.timeout.connect(self._slot_filter_slice)
+        # 根节点行的搜索列文字的 TrigramIndex, 在后台线程中生成, 生成期间为 None
+        self.search_index_enabled = False
+        self.search_index = None
+        self.index_loader = None
+        # 生成期间根节点的改动 (TrigramIndex 的方法名, 参数), 生成后依次应用到新的 index 上
+        self.index_change_list = None
+        self.index_timer = QtCore.QTimer(self)
+        self.index_timer.setSingleShot(True)
+        self.index_timer.timeout.connect(self._start_search_index)
+        # 模糊搜索: 按分数筛选前 fuzzy_top_k 行并按分数排序, fuzzy_score_list 是根节点每一行的 (分数, 长度)
+        self.fuzzy_enabled = False
+        self.fuzzy_top_k = 500
+        self.fuzzy_pattern = None
+        self.fuzzy_score_list = None
+        self.fuzzy_ranking = False
+        # 按分数排序期间 sortColumn 和 sortOrder 返回的仍然是用户的排序, 结束后恢复
+        self.fuzzy_sort_backup = (-1, QtCore.Qt.AscendingOrder)
+        # 模糊搜索期间用户点击了表头, 清空或换成普通搜索之前不再按分数排序
+        self.fuzzy_ranking_paused = False
+        # filterAcceptsRow 中搜索的 row text 位置, 模糊搜索时是所有搜索列连起来的文字
+        self.match_position_list = []
+        # source 没有子节点时关闭递归筛选, Qt 不用再为每一个不匹配的行查询子节点, None 表示需要重新检查
+        self.source_flat = None
+        # 重置后的 source 可能有子节点, 在 view 读取行之前重新检查
+        self.modelReset.connect(self._slot_reset_recursive_filtering)
+        # id(source parent item) -> (parent item, {column: [natural_sort_key]}, 有 _NO_SORT_KEY 需要重新计算的列)
+        self.sort_key_map = {}
+        # set_sort_source_in_place 开启后, 算好顺序直接重排 source 的行, 不再由 QSortFilterProxyModel 逐次调用 lessThan
+        self.sort_source_in_place = False
+        self.source_sort_threaded = True
+        self.source_sort_loader = None
+        # 计算期间 source 的根节点有改动, 算完后重新计算
+        self.source_sort_stale = False
+        # source 正在按这个顺序重排, 缓存跟着重排而不是清空
+        self.source_row_order = None
+        # set_query 编译好的查询: 单行的 predicate((source row, source parent)), 以及根节点每一行的结果 mask
+        self.query = ""
+        self.query_node = None
+        self.query_predicate = None
+        self.query_mask = None
 
     def set_header_list(self, header_list):
         self.header_list = header_list
         for head in self.header_list:
             head.update({"reg": None})
+        self._compile_filter()
+        self._update_query()
 
-    def filterAcceptsRow(self, source_row, source_parent):
-        # 如果search 栏有内容 先匹配 search 栏的内容
-        if self.search_reg:
-            for index, data_dict in enumerate(self.header_list):
-                if data_dict.get("searchable", False):
-                    model_index = self.sourceModel().index(source_row, index, source_parent)
-                    value = self.sourceModel().data(model_index)
-                    if value is not None and self.search_reg.search(str(value)) is not None:
-                        # 搜索匹配上了
-                        break
-            else:
-                # 全部搜索完毕，没有一个匹配，直接返回 False
-                return False
+    def _compile_filter(self):
+        old_search_column_list = self.search_column_list
+        self.search_column_list = [
+            column for column, data_dict in enumerate(self.header_list) if data_dict.get("searchable", False)
+        ]
+        self.filter_column_list = [
+            (column, data_dict.get("reg"))
+            for column, data_dict in enumerate(self.header_list)
+            if data_dict.get("reg", None)
+        ]
+        text_column_list = sorted(set(self.search_column_list).union(column for column, _ in self.filter_column_list))
+        if text_column_list != self.text_column_list:
+            self.text_column_list = text_column_list
+            self.search_text_map.clear()
+        if self.search_column_list != old_search_column_list:
+            # 搜索的列变了, 之前的结果都不能再用
+            self.search_cache.clear()
+            self.filter_mask = None
+            self.filter_mask_key = None
+            self._rebuild_search_index()
+        # row text tuple 的第 0 项是所有搜索列用换行连起来的文字，后面依次是 text_column_list 的文字
+        self.search_position_list = [text_column_list.index(column) + 1 for column in self.search_column_list]
+        self.match_position_list = [0] if self.fuzzy_pattern else self.search_position_list
+        self.filter_position_list = [
+            (text_column_list.index(column) + 1, reg_exp) for column, reg_exp in self.filter_column_list
+        ]
+
+    def setSourceModel(self, source_model):
+        old_model = self.sourceModel()
+        if old_model is not None:
+            for signal, slot in self._get_source_connection_list(old_model):
+                try:
+                    signal.disconnect(slot)
+                except (RuntimeError, TypeError):
+                    pass
+        self._cancel_filter_mask()
+        self._slot_clear_search_text()
+        if source_model is not None:
+            # 先于 proxy 自己的连接，proxy 重新筛选时缓存已经是最新的
+            for signal, slot in self._get_source_connection_list(source_model):
+                signal.connect(slot)
+        self._update_query(source_model)
+        super(MSortFilterModel, self).setSourceModel(source_model)
+
+    def _get_source_connection_list(self, source_model):
+        return [
+            (source_model.dataChanged, self._slot_source_data_changed),
+            (source_model.rowsInserted, self._slot_source_rows_inserted),
+            (source_model.rowsRemoved, self._slot_source_rows_removed),
+            (source_model.rowsMoved, self._slot_clear_search_text),
+            (source_model.layoutChanged, self._slot_source_layout_changed),
+            (source_model.modelReset, self._slot_clear_search_text),
+        ]
+
+    def _get_text_entry(self, source_parent, cache_map=None):
+        """Get the cache entry of the children of source_parent in search_text_map, or in the given cache_map."""
+        parent_item = source_parent.internalPointer() if source_parent.isValid() else None
+        entry = (self.search_text_map if cache_map is None else cache_map).get(id(parent_item))
+        if entry is not None and entry[0] is parent_item:
+            return entry
+        return None
+
+    def _get_mask_list(self):
+        """Get the applied mask, the cached masks and the query mask, each one once."""
+        mask_dict = {id(mask): mask for mask in self.search_cache.values()}
+        for mask in (self.filter_mask, self.query_mask):
+            if mask is not None:
+                mask_dict[id(mask)] = mask
+        return list(mask_dict.values())
+
+    @QtCore.Slot()
+    def _slot_clear_search_text(self, *args):
+        self.search_text_map.clear()
+        self.search_cache.clear()
+        self.filter_mask = None
+        self.filter_mask_key = None
+        self.filter_mask_stale = True
+        self.fuzzy_score_list = None
+        self.source_flat = None
+        self.sort_key_map.clear()
+        self.query_mask = None
+        self.source_sort_stale = True
+        self._rebuild_search_index()
+
+    @QtCore.Slot()
+    def _slot_source_layout_changed(self, *args):
+        row_list = self.source_row_order
+        if row_list is None:
+            self._slot_clear_search_text()
+            return
+        # 由 set_sort_source_in_place 重排的根节点行, 所有按行号保存的缓存跟着重排
+        # itemgetter 只有一个参数时不返回 tuple
+        get_rows = operator.itemgetter(*row_list) if len(row_list) > 1 else tuple
+        entry = self.search_text_map.get(id(None))
+        if entry is not None and len(entry[1]) == len(row_list):
+            entry[1][:] = get_rows(entry[1])
+        entry = self.sort_key_map.get(id(None))
+        if entry is not None:
+            for key_list in entry[1].values():
+                if len(key_list) == len(row_list):
+                    key_list[:] = get_rows(key_list)
+        for mask in self._get_mask_list():
+            if len(mask) == len(row_list):
+                mask[:] = bytes(get_rows(mask))
+        if self.fuzzy_score_list is not None:
+            self.fuzzy_score_list[:] = get_rows(self.fuzzy_score_list)
+        self.filter_mask_stale = True
+        self._rebuild_search_index()
+
+    @QtCore.Slot(QtCore.QModelIndex, int, int)
+    def _slot_source_rows_inserted(self, source_parent, first, last):
+        if self.source_flat and (source_parent.isValid() or not self._is_flat_source(first, last)):
+            self.source_flat = False
+            self._update_recursive_filtering()
+        entry = self._get_text_entry(source_parent)
+        if entry is not None:
+            entry[1][first:first] = [None] * (last - first + 1)
+        entry = self._get_text_entry(source_parent, self.sort_key_map)
+        if entry is not None:
+            for key_list in entry[1].values():
+                key_list[first:first] = [_NO_SORT_KEY] * (last - first + 1)
+            entry[2].update(entry[1])
+        if not source_parent.isValid():
+            self.source_sort_stale = True
+            for mask in self._get_mask_list():
+                mask[first:first] = bytes([MASK_UNKNOWN]) * (last - first + 1)
+            if self.fuzzy_score_list is not None:
+                self.fuzzy_score_list[first:first] = [None] * (last - first + 1)
+            self.filter_mask_stale = True
+            if self.search_index is not None or self.index_change_list is not None:
+                self._update_search_index(
+                    "insert_rows", first, [self._get_row_text(row, source_parent)[0] for row in range(first, last + 1)]
+                )
+
+    @QtCore.Slot(QtCore.QModelIndex, int, int)
+    def _slot_source_rows_removed(self, source_parent, first, last):
+        entry = self._get_text_entry(source_parent)
+        if entry is not None:
+            del entry[1][first : last + 1]
+        entry = self._get_text_entry(source_parent, self.sort_key_map)
+        if entry is not None:
+            for key_list in entry[1].values():
+                del key_list[first : last + 1]
+        if not source_parent.isValid():
+            self.source_sort_stale = True
+            for mask in self._get_mask_list():
+                del mask[first : last + 1]
+            if self.fuzzy_score_list is not None:
+                del self.fuzzy_score_list[first : last + 1]
+            self.filter_mask_stale = True
+            self._update_search_index("remove_rows", first, last)
+
+    def _slot_source_data_changed(self, top_left, bottom_right, *args):
+        if top_left is None or bottom_right is None or not (top_left.isValid() and bottom_right.isValid()):
+            self._slot_clear_search_text()
+            return
+        source_parent = top_left.parent()
+        self._clear_sort_keys(source_parent, top_left, bottom_right)
+        if self.query_mask is not None and not source_parent.isValid():
+            # 查询可以使用任意列或属性, 所有改动的行都需要重新匹配
+            last = min(bottom_right.row() + 1, len(self.query_mask))
+            self.query_mask[top_left.row() : last] = bytes([MASK_UNKNOWN]) * max(0, last - top_left.row())
+        if not any(top_left.column() <= column <= bottom_right.column() for column in self.text_column_list):
+            return
+        entry = self._get_text_entry(source_parent)
+        if entry is not None:
+            text_list = entry[1]
+            for row in range(top_left.row(), min(bottom_right.row() + 1, len(text_list))):
+                text_list[row] = None
+        if not source_parent.isValid():
+            for mask in self._get_mask_list():
+                last = min(bottom_right.row() + 1, len(mask))
+                mask[top_left.row() : last] = bytes([MASK_UNKNOWN]) * max(0, last - top_left.row())
+            if self.fuzzy_score_list is not None:
+                for row in range(top_left.row(), min(bottom_right.row() + 1, len(self.fuzzy_score_list))):
+                    self.fuzzy_score_list[row] = None
+            self.filter_mask_stale = True
+            if (self.search_index is not None or self.index_change_list is not None) and any(
+                top_left.column() <= column <= bottom_right.column() for column in self.search_column_list
+            ):
+                for row in range(top_left.row(), min(bottom_right.row() + 1, self.sourceModel().rowCount())):
+                    self._update_search_index("set_text", row, self._get_row_text(row, source_parent)[0])
 
-        # 再去匹配 filter 组合
-        for index, data_dict in enumerate(self.header_list):
-            model_index = self.sourceModel().index(source_row, index, source_parent)
-            value = self.sourceModel().data(model_index)
-            reg_exp = data_dict.get("reg", None)
-            if reg_exp and value is not None and not reg_exp.search(str(value)):
-                # 不符合筛选，直接返回 False
+    def _clear_sort_keys(self, source_parent, top_left, bottom_right):
+        """Mark the sort keys of the changed cells to be computed again."""
+        entry = self._get_text_entry(source_parent, self.sort_key_map)
+        if entry is not None:
+            for column, key_list in entry[1].items():
+                if top_left.column() <= column <= bottom_right.column():
+                    last = min(bottom_right.row() + 1, len(key_list))
+                    key_list[top_left.row() : last] = [_NO_SORT_KEY] * max(0, last - top_left.row())
+                    entry[2].add(column)
+        chunk_loader = self.source_sort_loader
+        if (
+            chunk_loader is not None
+            and not source_parent.isValid()
+            and top_left.column() <= chunk_loader.context[0] <= bottom_right.column()
+        ):
+            self.source_sort_stale = True
+
+    def _get_row_text(self, source_row, source_parent):
+        """Get the cached lowercase display texts of the row, they are computed on the first use after a change."""
+        # 每行都会调用，不经过 _get_text_entry，少一次函数调用
+        parent_item = source_parent.internalPointer() if source_parent.isValid() else None
+        entry = self.search_text_map.get(id(parent_item))
+        if entry is None or entry[0] is not parent_item or source_row >= len(entry[1]):
+            entry = (parent_item, [None] * self.sourceModel().rowCount(source_parent))
+            self.search_text_map[id(parent_item)] = entry
+        text_list = entry[1]
+        row_text = text_list[source_row]
+        if row_text is None:
+            row_text = text_list[source_row] = self._make_row_text(source_row, source_parent)
+        return row_text
+
+    def _make_row_text(self, source_row, source_parent):
+        source_model = self.sourceModel()
+        if isinstance(source_model, MTableModel):
+            # 直接使用 source model 编译好的 DisplayRole 函数，避免为每一列创建 index
+            data_obj = source_model.get_data_obj(source_model.index(source_row, 0, source_parent))
+            value_list = [source_model._get_data(data_obj, column, DISPLAY_ROLE) for column in self.text_column_list]
+        else:
+            value_list = [
+                source_model.data(source_model.index(source_row, column, source_parent))
+                for column in self.text_column_list
+            ]
+        text_list = [None if value is None else str(value).lower() for value in value_list]
+        search_text = "\n".join(
+            text_list[position - 1] for position in self.search_position_list if text_list[position - 1] is not None
+        )
+        return (search_text,) + tuple(text_list)
+
+    def lessThan(self, source_left, source_right):
+        if self.fuzzy_ranking and self.fuzzy_score_list is not None and not source_left.parent().isValid():
+            # 按模糊搜索的分数排序, 分数相同时保持原来的顺序
+            left = self.fuzzy_score_list[source_left.row()] or (0, 0)
+            right = self.fuzzy_score_list[source_right.row()] or (0, 0)
+            if left == right:
+                return source_left.row() > source_right.row()
+            return left < right
+        key_list = self._get_sort_key_list(source_left.column(), source_left.parent())
+        left = key_list[source_left.row()]
+        right = key_list[source_right.row()]
+        if left is None or right is None:
+            # None 不论升序还是降序都排在最后
+            if left is right:
                 return False
+            return (left is None) == (super(MSortFilterModel, self).sortOrder() == QtCore.Qt.DescendingOrder)
+        if (left.__class__ is str) != (right.__class__ is str):
+            # 数字排在文字前面
+            return right.__class__ is str
+        return left < right
+
+    def _get_sort_attr(self, column):
+        source_model = self.sourceModel()
+        if isinstance(source_model, MTableModel) and 0 <= column < len(source_model.header_list):
+            return source_model.header_list[column].get("key")
+        return None
+
+    def _get_sort_value(self, source_row, column, source_parent):
+        """Get the raw value of a cell, it is read from the row object for MTableModel, from sortRole for the others."""
+        attr = self._get_sort_attr(column)
+        if attr is None:
+            source_model = self.sourceModel()
+            return source_model.data(source_model.index(source_row, column, source_parent), self.sortRole())
+        return self._get_attr_value(source_row, attr, source_parent)
+
+    def _get_sort_value_list(self, column, source_parent):
+        """Get the raw values of a column of all the children of source_parent."""
+        attr = self._get_sort_attr(column)
+        if attr is None:
+            row_count = self.sourceModel().rowCount(source_parent)
+            return [self._get_sort_value(row, column, source_parent) for row in range(row_count)]
+        return self._get_attr_value_list(attr, source_parent)
+
+    def _get_attr_value(self, source_row, attr, source_parent):
+        """Get the raw value of an attribute of a row of the MTableModel source."""
+        source_model = self.sourceModel()
+        if isinstance(source_model, MColumnTableModel):
+            return source_model.get_value(source_row, attr)
+        return get_obj_value(source_model.get_data_obj(source_model.index(source_row, 0, source_parent)), attr)
+
+    def _get_attr_value_list(self, attr, source_parent):
+        """Get the raw values of an attribute of all the children of source_parent in the MTableModel source."""
+        source_model = self.sourceModel()
+        row_count = source_model.rowCount(source_parent)
+        if not row_count:
+            return []
+        if isinstance(source_model, MColumnTableModel):
+            values = source_model.get_column(attr)
+            return [None] * row_count if values is None else list(values)
+        return list(map(_make_value_getter(attr), source_model._get_row_list(source_parent)))
+
+    def _get_sort_key_list(self, column, source_parent):
+        """
+        Get the cached natural_sort_key of a column of all the children of source_parent,
+        they are computed on the first use, and only the changed cells are computed again.
+        """
+        parent_item = source_parent.internalPointer() if source_parent.isValid() else None
+        entry = self.sort_key_map.get(id(parent_item))
+        if entry is None or entry[0] is not parent_item:
+            entry = self.sort_key_map[id(parent_item)] = (parent_item, {}, set())
+        key_list = entry[1].get(column)
+        if key_list is None:
+            key_list = entry[1][column] = list(map(natural_sort_key, self._get_sort_value_list(column, source_parent)))
+        elif column in entry[2]:
+            entry[2].discard(column)
+            for row, key in enumerate(key_list):
+                if key is _NO_SORT_KEY:
+                    key_list[row] = natural_sort_key(self._get_sort_value(row, column, source_parent))
+        return key_list
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.query_predicate is not None and not self._query_accepts_row(source_row, source_parent):
+            return False
+        if not self.search_reg and not self.filter_column_list:
+            return True
+        filter_mask = self.filter_mask
+        if filter_mask is not None and source_row < len(filter_mask) and not source_parent.isValid():
+            accepted = filter_mask[source_row]
+            if accepted != MASK_UNKNOWN:
+                return accepted == MASK_ACCEPTED
+        return _match_row_text(
+            self._get_row_text(source_row, source_parent),
+            self.search_literal,
+            self.search_reg,
+            self.match_position_list,
+            self.filter_position_list,
+        )
+
+    def set_filter_executor(self, executor, chunk_size=20000):
+        """
+        Match the top level rows in a concurrent.futures executor when the search or the filter patterns change,
+        instead of in the main thread. The cached row texts are snapshotted and matched by chunks,
+        then the proxy is filtered once with the results, sig_filter_applied is emitted after that.
+        The results of an old pattern are dropped. The children rows are still matched in filterAcceptsRow.
+        :param executor: a ThreadPoolExecutor, or a ProcessPoolExecutor to use all the cores. None to disable it.
+        :param chunk_size: how many rows are matched in one task
+        :return: None
+        """
+        self._cancel_filter_mask()
+        self.filter_executor = executor
+        self.filter_chunk_size = max(1, int(chunk_size))
+
+    def set_filter_time_slice(self, msec=8):
+        """
+        Match the top level rows in slices of msec milliseconds, one slice per event loop turn,
+        when the search or the filter patterns change, so the window keeps responding while a big model is searched.
+        sig_filter_progress reports the percent of the matched rows, the rows matched so far are shown
+        when the search takes long, a new pattern drops the running search.
+        The proxy is filtered with the results in one layout change if it is not sorted.
+        The executor of set_filter_executor is used instead if there is one.
+        :param msec: int, 0 to match all the rows at once
+        :return: None
+        """
+        self._cancel_filter_mask()
+        self.filter_slice_msec = max(0, int(msec))
+
+    def _cancel_filter_mask(self):
+        if self.filter_loader is not None:
+            self.filter_loader.cancel()
+            self.filter_loader = None
+        if self.filter_slice is not None:
+            self.filter_slice = None
+            self.filter_slice_timer.stop()
+            self.sig_filter_progress.emit(100)
+
+    def _get_filter_key(self):
+        return (
+            self.search_literal,
+            None if self.search_literal is not None or not self.search_reg else self.search_reg.pattern,
+            tuple((column, reg_exp.pattern) for column, reg_exp in self.filter_column_list),
+            self.fuzzy_pattern,
+        )
+
+    def _get_match_args(self):
+        return self.search_literal, self.search_reg, list(self.match_position_list), list(self.filter_position_list)
+
+    def _is_flat_source(self, first=0, last=None):
+        """Check if the top level source rows from first to last have no children, only for MTableModel."""
+        source_model = self.sourceModel()
+        if isinstance(source_model, MColumnTableModel):
+            return True
+        if not isinstance(source_model, MTableModel):
+            return False
+        data_list = source_model.get_data_list()
+        end = len(data_list) if last is None else last + 1
+        return not any(get_obj_value(data_obj, "children") for data_obj in itertools.islice(data_list, first, end))
+
+    def _update_recursive_filtering(self):
+        if not hasattr(self, "setRecursiveFilteringEnabled"):
+            return
+        if self.source_flat is None:
+            self.source_flat = self._is_flat_source()
+        if self.isRecursiveFilteringEnabled() == self.source_flat:
+            self.setRecursiveFilteringEnabled(not self.source_flat)
+
+    @QtCore.Slot()
+    def _slot_reset_recursive_filtering(self):
+        """
+        Check the reset source again, eg. a tree is set to a flat source, before the views read the rows.
+        The proxy has no mapping right after its reset, so switching the recursive filtering filters no row here.
+        """
+        self.source_flat = None
+        if not hasattr(self, "isRecursiveFilteringEnabled") or self.isRecursiveFilteringEnabled():
+            # 一直递归筛选时结果总是正确的, 下次筛选时再检查
+            return
+        if self.sourceModel() is not None:
+            self._update_recursive_filtering()
+
+    def _refilter(self):
+        """
+        Filter the proxy again after the patterns changed.
+        The top level rows are matched into a mask first, it is reused from search_cache,
+        or refined from the current mask when the new pattern narrows it, eg. typing "sh01" after "sh0",
+        only the rows accepted by "sh0" are matched again.
+        With set_filter_time_slice, the rows to match are matched in time slices instead, see _slot_filter_slice.
+        """
+        self._cancel_filter_mask()
+        if self.sourceModel() is not None:
+            if self.filter_slice_msec and self.filter_mask is None:
+                # 切换递归筛选时 Qt 会立即筛选所有的行, 分片筛选时先显示所有的行, 不在这里一次匹配完
+                self.filter_mask = bytearray([MASK_ACCEPTED]) * self.sourceModel().rowCount(QtCore.QModelIndex())
+            self._update_recursive_filtering()
+        if self.sourceModel() is None or not (self.search_reg or self.filter_column_list):
+            self.filter_mask = None
+            self.filter_mask_key = None
+            self._invalidate_rows_filter(bool(self.filter_slice_msec))
+            self._stop_fuzzy_ranking()
+            self.sig_filter_applied.emit()
+            return
+        key = self._get_filter_key()
+        if self.fuzzy_pattern:
+            # 分数和排序依赖所有行, 不使用缓存
+            self._apply_filter_mask(key, self._fuzzy_filter_mask(), cache=False)
+            return
+        self._stop_fuzzy_ranking()
+        mask = self.search_cache.get(key)
+        if mask is None and self.filter_slice_msec and self.filter_executor is None:
+            self._start_filter_slice(key)
+            return
+        if mask is None:
+            mask = self._index_filter_mask()
+        if mask is None:
+            mask = self._refine_filter_mask(key)
+        if mask is None:
+            if self.filter_executor is not None:
+                self._start_filter_mask(key)
+                return
+            mask = bytearray(_match_row_text_chunk(self._get_root_text_list(), *self._get_match_args()))
+        self._apply_filter_mask(key, mask, relayout=bool(self.filter_slice_msec))
+
+    def _get_refine_row_list(self, key):
+        """Get the rows accepted by the current mask, if the new key narrows its key, or return None."""
+        old_mask, old_key = self.filter_mask, self.filter_mask_key
+        # 分片筛选的部分结果没有 key, 不能用来缩小范围
+        if old_mask is None or old_key is None or old_key[2:] != key[2:] or key[0] is None:
+            return None
+        # 之前没有搜索内容, 或者新的内容包含了之前的内容
+        if old_key[:2] != (None, None) and (old_key[0] is None or old_key[0] not in key[0]):
+            return None
+        if self.sourceModel().rowCount(QtCore.QModelIndex()) != len(old_mask):
+            return None
+        # 之前不匹配的行一定不匹配, 其余的行 (包括 MASK_UNKNOWN) 重新匹配
+        return list(itertools.compress(range(len(old_mask)), old_mask))
+
+    def _refine_filter_mask(self, key):
+        """Match only the rows accepted by the current mask, if the new key narrows its key, or return None."""
+        row_list = self._get_refine_row_list(key)
+        if row_list is None:
+            return None
+        text_list = self._get_root_text_list()
+        args = self._get_match_args()
+        mask = bytearray(len(text_list))
+        for row in row_list:
+            mask[row] = _match_row_text(text_list[row], *args)
+        return mask
+
+    def _index_filter_mask(self):
+        """Match only the rows found by the search index, or return None if the index can not help."""
+        if self.search_literal is None:
+            return None
+        row_list = self.find_source_rows(self.search_literal)
+        if row_list is None:
+            return None
+        source_parent = QtCore.QModelIndex()
+        args = self._get_match_args()
+        mask = bytearray(len(self.search_index))
+        for row in row_list:
+            mask[row] = _match_row_text(self._get_row_text(row, source_parent), *args)
+        return mask
+
+    def _fuzzy_filter_mask(self):
+        """Accept the fuzzy_top_k rows with the best scores, and keep their scores for the ranking."""
+        text_list = self._get_root_text_list()
+        pattern = self.fuzzy_pattern
+        # 先用正则在 C 中找出所有包含这些字符的行
+        match_list = list(map(self.search_reg.search, map(operator.itemgetter(0), text_list)))
+        row_list = list(itertools.compress(range(len(text_list)), match_list))
+        if self.filter_column_list:
+            filter_position_list = self.filter_position_list
+            row_list = [
+                row for row in row_list if _match_row_text(text_list[row], None, None, [], filter_position_list)
+            ]
+        if self.query_predicate is not None:
+            source_parent = QtCore.QModelIndex()
+            row_list = [row for row in row_list if self._query_accepts_row(row, source_parent)]
+        if len(row_list) > self.fuzzy_top_k * 4:
+            # 候选行太多时, 只给匹配区间最短的一部分行打分
+            row_list = heapq.nsmallest(
+                self.fuzzy_top_k * 4, row_list, key=lambda row: match_list[row].end() - match_list[row].start()
+            )
+        score_list = [None] * len(text_list)
+        for row in row_list:
+            text = text_list[row][0]
+            score_list[row] = (fuzzy_match_score(pattern, text), -len(text))
+        mask = bytearray(len(text_list))
+        for row in heapq.nlargest(self.fuzzy_top_k, row_list, key=score_list.__getitem__):
+            mask[row] = MASK_ACCEPTED
+        self.fuzzy_score_list = score_list
+        return mask
+
+    def _start_fuzzy_ranking(self):
+        if self.fuzzy_ranking_paused:
+            return
+        started = not self.fuzzy_ranking
+        if started:
+            self.fuzzy_sort_backup = (self.sortColumn(), self.sortOrder())
+        # 先取消排序, 否则相同的 sort 参数不会重新排序
+        self.fuzzy_ranking = False
+        super(MSortFilterModel, self).sort(-1)
+        self.fuzzy_ranking = True
+        super(MSortFilterModel, self).sort(0, QtCore.Qt.DescendingOrder)
+        if started:
+            self.sig_fuzzy_ranking_changed.emit(True)
+
+    def _stop_fuzzy_ranking(self):
+        self.fuzzy_score_list = None
+        self.fuzzy_ranking_paused = False
+        if not self.fuzzy_ranking:
+            return
+        self.fuzzy_ranking = False
+        column, order = self.fuzzy_sort_backup
+        super(MSortFilterModel, self).sort(-1)
+        if column >= 0:
+            super(MSortFilterModel, self).sort(column, order)
+        self.sig_fuzzy_ranking_changed.emit(False)
 
-        return True
+    def sortColumn(self):
+        """The column sorted by the user, the fuzzy ranking does not change it."""
+        if self.fuzzy_ranking:
+            return self.fuzzy_sort_backup[0]
+        return super(MSortFilterModel, self).sortColumn()
+
+    def sortOrder(self):
+        """The order sorted by the user, the fuzzy ranking does not change it."""
+        if self.fuzzy_ranking:
+            return self.fuzzy_sort_backup[1]
+        return super(MSortFilterModel, self).sortOrder()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        # 用户点击表头排序时, 不再按模糊搜索的分数排序, 直到搜索内容清空
+        ranking = self.fuzzy_ranking
+        self.fuzzy_ranking = False
+        self.fuzzy_ranking_paused = self.fuzzy_pattern is not None
+        self._sort(column, order)
+        if ranking:
+            self.sig_fuzzy_ranking_changed.emit(False)
+
+    def _sort(self, column, order):
+        self._cancel_source_sort()
+        if self.sort_source_in_place and column >= 0 and isinstance(self.sourceModel(), MTableModel):
+            if self.source_flat is None:
+                self.source_flat = self._is_flat_source()
+            if self.source_flat:
+                # proxy 自己不再排序, 行的顺序就是 source 的顺序
+                super(MSortFilterModel, self).sort(-1)
+                self._start_source_sort(column, order)
+                return
+        super(MSortFilterModel, self).sort(column, order)
+
+    def set_sort_source_in_place(self, enabled=True, threaded=True):
+        """
+        Opt in to sort by reordering the rows of the source model in place, instead of QSortFilterProxyModel
+        calling lessThan O(n log n) times, which costs a Python call each time. It is off by default,
+        then sort only orders the rows of this proxy and leaves the source model as it is.
+        The order is computed from the cached sort keys, in a worker thread if threaded, then the source emits
+        a single layoutChanged and the persistent indexes follow the rows.
+        It works for the MTableModel and MColumnTableModel without children rows, the others are still sorted
+        by the proxy. The rows are not moved again when their values change, sort again to update the order.
+        The source model itself is reordered, so every other proxy and view on the same source model sees
+        the new order too, and get_data_list returns the rows in it. Only enable it when this proxy is the only
+        one that sorts the source model.
+        :param enabled: bool
+        :param threaded: compute the order in ChunkLoader's thread pool, or in the calling thread
+        :return: None
+        """
+        self.sort_source_in_place = enabled
+        self.source_sort_threaded = threaded
+        if not enabled:
+            self._cancel_source_sort()
+
+    def _cancel_source_sort(self):
+        if self.source_sort_loader is not None:
+            self.source_sort_loader.cancel()
+            self.source_sort_loader = None
+
+    def _start_source_sort(self, column, order):
+        self.source_sort_stale = False
+        source_parent = QtCore.QModelIndex()
+        entry = self.sort_key_map.get(id(None))
+        if entry is not None and column in entry[1]:
+            # 已经有缓存的 key, 只需要排序
+            key_list = list(self._get_sort_key_list(column, source_parent))
+            value_list = None
+        else:
+            key_list = None
+            value_list = self._get_sort_value_list(column, source_parent)
+        reverse = order == QtCore.Qt.DescendingOrder
+
+        def _sort():
+            result_key_list = list(map(natural_sort_key, value_list)) if key_list is None else key_list
+            return [(result_key_list, _sort_key_order(result_key_list, reverse))]
+
+        if not self.source_sort_threaded:
+            self._apply_source_order(column, *_sort()[0])
+            return
+        chunk_loader = ChunkLoader(_sort, 1, parent=self, context=(column, order))
+        chunk_loader.signals.sig_chunk_loaded.connect(self._slot_source_order_loaded)
+        chunk_loader.signals.sig_failed.connect(self._slot_source_order_failed)
+        chunk_loader.signals.sig_finished.connect(self._slot_loader_finished)
+        self.source_sort_loader = chunk_loader
+        self.running_loader_set.add(chunk_loader)
+        chunk_loader.start()
+
+    @QtCore.Slot(object, object)
+    def _slot_source_order_loaded(self, chunk_loader, chunk):
+        if chunk_loader is not self.source_sort_loader:
+            return
+        self.source_sort_loader = None
+        if self.source_sort_stale:
+            # 计算期间行有增删或改动, 重新计算
+            self._start_source_sort(*chunk_loader.context)
+            return
+        self._apply_source_order(chunk_loader.context[0], *chunk[0])
+
+    @QtCore.Slot(object, str)
+    def _slot_source_order_failed(self, chunk_loader, message):
+        if chunk_loader is not self.source_sort_loader:
+            return
+        # 例如值之间无法比较, 退回到 proxy 自己排序
+        self.source_sort_loader = None
+        super(MSortFilterModel, self).sort(*chunk_loader.context)
+
+    def _apply_source_order(self, column, key_list, row_list):
+        entry = self.sort_key_map.get(id(None))
+        if entry is None:
+            entry = self.sort_key_map[id(None)] = (None, {}, set())
+        entry[1][column] = key_list
+        if row_list == list(range(len(row_list))):
+            # 已经是这个顺序, 不用重排
+            return
+        self.source_row_order = row_list
+        try:
+            self.sourceModel().reorder_rows(row_list)
+        finally:
+            self.source_row_order = None
+
+    def _apply_filter_mask(self, key, mask, cache=True, relayout=False):
+        self.filter_mask = mask
+        self.filter_mask_key = key
+        if cache:
+            self.search_cache[key] = mask
+            self.search_cache.move_to_end(key)
+            while len(self.search_cache) > self.search_cache_size:
+                self.search_cache.popitem(last=False)
+        self._invalidate_rows_filter(relayout)
+        if self.fuzzy_pattern:
+            self._start_fuzzy_ranking()
+        self.sig_filter_applied.emit()
+
+    def _invalidate_rows_filter(self, relayout=False):
+        if relayout and super(MSortFilterModel, self).sortColumn() < 0:
+            # 大量分散的行显示或隐藏时, 逐段增删行的代价随行数平方增长, 没有排序时整体重新筛选一次快很多
+            self.invalidate()
+            return
+        # Qt 6 可以只重新筛选行, 不用再检查每一列
+        if hasattr(self, "invalidateRowsFilter"):
+            self.invalidateRowsFilter()
+        else:
+            self.invalidateFilter()
+
+    def _get_root_text_list(self):
+        """Get the cached texts of all the top level rows, the missing ones are computed."""
+        source_parent = QtCore.QModelIndex()
+        if not self.sourceModel().rowCount(source_parent):
+            return []
+        self._get_row_text(0, source_parent)
+        text_list = self.search_text_map[id(None)][1]
+        if None in text_list:
+            for row, row_text in enumerate(text_list):
+                if row_text is None:
+                    text_list[row] = self._make_row_text(row, source_parent)
+        return text_list
+
+    def _start_filter_mask(self, key):
+        self.filter_mask_stale = False
+        text_list = list(self._get_root_text_list())
+        executor = self.filter_executor
+        chunk_size = self.filter_chunk_size
+        args = self._get_match_args()
+
+        def _match_all():
+            future_list = [
+                executor.submit(_match_row_text_chunk, text_list[first : first + chunk_size], *args)
+                for first in range(0, len(text_list), chunk_size)
+            ]
+            mask = bytearray()
+            for future in future_list:
+                if chunk_loader.canceled:
+                    # 新的搜索内容已经开始计算, 没有开始的任务直接取消
+                    for other_future in future_list:
+                        other_future.cancel()
+                    return []
+                mask.extend(future.result())
+            return [mask]
+
+        chunk_loader = ChunkLoader(_match_all, 1, parent=self, context=key)
+        chunk_loader.signals.sig_chunk_loaded.connect(self._slot_filter_mask_loaded)
+        chunk_loader.signals.sig_failed.connect(self._slot_filter_mask_failed)
+        chunk_loader.signals.sig_finished.connect(self._slot_loader_finished)
+        self.filter_loader = chunk_loader
+        self.running_loader_set.add(chunk_loader)
+        chunk_loader.start()
+
+    @QtCore.Slot(object, object)
+    def _slot_filter_mask_loaded(self, chunk_loader, chunk):
+        if chunk_loader is not self.filter_loader:
+            return
+        if self.filter_mask_stale:
+            # 计算期间行有增删或改动, 快照已经过期
+            self._start_filter_mask(chunk_loader.context)
+            return
+        self.filter_loader = None
+        self._apply_filter_mask(chunk_loader.context, chunk[0])
+
+    @QtCore.Slot(object, str)
+    def _slot_filter_mask_failed(self, chunk_loader, message):
+        if chunk_loader is not self.filter_loader:
+            return
+        # executor 不可用时退回到逐行匹配
+        self.filter_loader = None
+        self.filter_mask = None
+        self.filter_mask_key = None
+        self.invalidateFilter()
+        self.sig_filter_applied.emit()
+
+    def _start_filter_slice(self, key):
+        """Start to match the rows for the key in time slices, the first slice is matched at once."""
+        self.filter_mask_stale = False
+        row_count = self.sourceModel().rowCount(QtCore.QModelIndex())
+        row_list = None
+        if self.search_literal is not None:
+            row_list = self.find_source_rows(self.search_literal)
+        if row_list is None:
+            row_list = self._get_refine_row_list(key)
+        if row_list is None:
+            row_list = range(row_count)
+        self.filter_slice = _FilterSlice(key, row_list, row_count)
+        self.sig_filter_progress.emit(0)
+        self._slot_filter_slice()
+
+    @QtCore.Slot()
+    def _slot_filter_slice(self):
+        """Match the rows of the running time sliced filtering until the slice time is used up."""
+        filter_slice = self.filter_slice
+        if filter_slice is None:
+            return
+        if self.filter_mask_stale:
+            # 匹配期间行有增删或改动, 行号已经过期, 重新开始
+            self._refilter()
+            return
+        source_parent = QtCore.QModelIndex()
+        args = self._get_match_args()
+        row_list = filter_slice.row_list
+        mask = filter_slice.mask
+        position = filter_slice.position
+        start = time.perf_counter()
+        deadline = start + self.filter_slice_msec / 1000.0
+        while position < len(row_list):
+            end = min(position + 256, len(row_list))
+            for row in row_list[position:end]:
+                mask[row] = _match_row_text(self._get_row_text(row, source_parent), *args)
+            position = end
+            if time.perf_counter() >= deadline:
+                break
+        filter_slice.position = position
+        now = time.perf_counter()
+        filter_slice.match_time += now - start
+        if position >= len(row_list):
+            self.filter_slice = None
+            self._apply_filter_mask(filter_slice.key, mask, relayout=True)
+            # Qt 重新筛选所有的行之后才算显示完
+            self.rowCount()
+            self.filter_apply_cost = time.perf_counter() - now
+            self.sig_filter_progress.emit(100)
+            return
+        self.sig_filter_progress.emit(position * 100 // len(row_list))
+        # 显示一次结果需要 Qt 重新筛选所有的行, 剩余的匹配时间和距离上次显示的时间都比它长很多时才显示部分结果
+        remaining_time = filter_slice.match_time * (len(row_list) - position) / position
+        apply_delay = max(FILTER_PARTIAL_DELAY, 4 * self.filter_apply_cost)
+        if remaining_time > apply_delay and now - filter_slice.apply_time > apply_delay:
+            # 已经匹配的行按结果显示, 还没有匹配的行先隐藏
+            self.filter_mask = bytearray(mask)
+            self.filter_mask_key = None
+            self._invalidate_rows_filter(relayout=True)
+            self.rowCount()
+            filter_slice.apply_time = time.perf_counter()
+            self.filter_apply_cost = filter_slice.apply_time - now
+        self.filter_slice_timer.start()
+
+    @QtCore.Slot(object)
+    def _slot_loader_finished(self, chunk_loader):
+        self.running_loader_set.discard(chunk_loader)
+        chunk_loader.signals.deleteLater()
+
+    def set_search_index(self, enabled=True):
+        """
+        Keep a TrigramIndex of the searchable columns of the top level rows, so a search of 3 or more characters
+        without regex characters only matches the rows found by the index instead of all the rows.
+        The index is built in a worker thread after the data is set, and updated when the rows are inserted,
+        removed or changed. The view's keyboardSearch uses it too, see find_source_rows.
+        :param enabled: bool
+        :return: None
+        """
+        self.search_index_enabled = enabled
+        self._rebuild_search_index()
+
+    def _rebuild_search_index(self):
+        if self.index_loader is not None:
+            self.index_loader.cancel()
+            self.index_loader = None
+        self.index_change_list = None
+        self.search_index = None
+        if self.search_index_enabled and self.sourceModel() is not None:
+            # 合并连续的重置, 在下一次事件循环中生成
+            self.index_timer.start(0)
+        else:
+            self.index_timer.stop()
+
+    @QtCore.Slot()
+    def _start_search_index(self):
+        if not self.search_index_enabled or self.sourceModel() is None:
+            return
+        self.index_change_list = []
+        text_list = [row_text[0] for row_text in self._get_root_text_list()]
+        chunk_loader = ChunkLoader(lambda: [TrigramIndex(text_list)], 1, parent=self)
+        chunk_loader.signals.sig_chunk_loaded.connect(self._slot_search_index_loaded)
+        chunk_loader.signals.sig_failed.connect(self._slot_search_index_failed)
+        chunk_loader.signals.sig_finished.connect(self._slot_loader_finished)
+        self.index_loader = chunk_loader
+        self.running_loader_set.add(chunk_loader)
+        chunk_loader.start()
+
+    @QtCore.Slot(object, object)
+    def _slot_search_index_loaded(self, chunk_loader, chunk):
+        if chunk_loader is not self.index_loader:
+            return
+        search_index = chunk[0]
+        # 生成期间根节点的行有改动, 按顺序补到 index 上, 不用重新生成
+        for method, args in self.index_change_list:
+            getattr(search_index, method)(*args)
+        self.index_loader = None
+        self.index_change_list = None
+        self.search_index = search_index
+
+    @QtCore.Slot(object, str)
+    def _slot_search_index_failed(self, chunk_loader, message):
+        if chunk_loader is self.index_loader:
+            self.index_loader = None
+            self.index_change_list = None
+
+    def _update_search_index(self, method, *args):
+        """Call a TrigramIndex method on the search index, or queue the call while the index is being built."""
+        if self.search_index is not None:
+            getattr(self.search_index, method)(*args)
+        elif self.index_change_list is not None:
+            self.index_change_list.append((method, args))
+
+    def find_source_rows(self, text, column=None, prefix=False):
+        """
+        Find the top level source rows with the search index.
+        :param text: the lowercase text to find
+        :param column: None to find text in all the searchable columns, or a searchable column to find it in
+        :param prefix: only for a column, find the rows whose column text starts with text
+        :return: the sorted source rows, None if the index is not ready, or it can not find text in column
+        """
+        search_index = self.search_index
+        if search_index is None or len(search_index) != self.sourceModel().rowCount():
+            return None
+        if column is not None and column not in self.search_column_list:
+            return None
+        row_list = search_index.find_rows(text)
+        if row_list is None or column is None:
+            return row_list
+        source_parent = QtCore.QModelIndex()
+        position = self.text_column_list.index(column) + 1
+        result = []
+        for row in row_list:
+            column_text = self._get_row_text(row, source_parent)[position] or ""
+            if column_text.startswith(text) if prefix else text in column_text:
+                result.append(row)
+        return result
+
+    def set_fuzzy_search(self, enabled=True, top_k=500):
+        """
+        Search like fzf: the characters of the search pattern must appear in order, eg. "sh10cmp" finds
+        "sh0100_comp_v012". Only the top_k rows with the best fuzzy_match_score are shown, sorted by the score,
+        until the pattern is cleared or a column is sorted.
+        While the rows are sorted by the score, sortColumn and sortOrder still return the column sorted by the user,
+        which is sorted again after the search, and sig_fuzzy_ranking_changed tells the views to hide
+        the sort indicator.
+        :param enabled: bool
+        :param top_k: how many rows are shown at most
+        :return: None
+        """
+        self.fuzzy_enabled = enabled
+        self.fuzzy_top_k = max(1, int(top_k))
 
     def set_search_pattern(self, pattern):
-        if pattern:
+        self.fuzzy_pattern = None
+        if pattern and self.fuzzy_enabled:
+            self.fuzzy_pattern = pattern.lower()
+            # 用于找出候选行, 以及之后有改动的行的匹配
+            self.search_reg = re.compile(".*?".join(re.escape(char) for char in self.fuzzy_pattern), re.DOTALL)
+            self.search_literal = None
+        elif pattern:
             self.search_reg = re.compile(pattern, re.IGNORECASE)
+            self.search_literal = None if REGEX_SPECIAL_REG.search(pattern) else pattern.lower()
         else:
             self.search_reg = None
-        self.invalidateFilter()
+            self.search_literal = None
+        self.match_position_list = [0] if self.fuzzy_pattern else self.search_position_list
+        self._refilter()
+
+    def set_query(self, query):
+        """
+        Filter the rows with a query over their raw values, together with the search pattern and the filter patterns.
+        The query is compiled once into a Python predicate, the top level rows are matched with the whole columns
+        of raw values, read by the same accessors as the model.
+        Syntax, the words are case insensitive:
+            frames > 1000 and status:failed and user in (ann, bob)
+            field = value, field != value, field > value, field >= value, field < value, field <= value
+            field:text      the text is a substring of the value, ignoring case, other values are compared by "="
+            field:1..100    inclusive range, one end can be empty, eg. date:2024-01-01..
+            field in (a, b), field:(a, b)
+            not cond, -cond, cond or cond, (cond), cond and cond, the conditions side by side are joined by and
+            text, "quoted text"    free text, a substring of the searchable columns like the search box
+        The numbers and the ISO dates, eg. 2024-01-31 or 2024-01-31T12:00, are compared with the raw values
+        converted to the same kind, the other values are compared as texts in natural order.
+        A field is a key or a label of header_list, or any row attribute for MTableModel.
+        :param query: str, empty to clear the query
+        :return: None
+        :raise ValueError: the query can not be parsed, or a field is not found
+        """
+        node = _QueryParser(query or "").parse()
+        predicate = None if node is None else self._compile_query_predicate(node)
+        self.query = query or ""
+        self.query_node = node
+        self.query_predicate = predicate
+        self.query_mask = None
+        self._refilter()
+
+    def _update_query(self, source_model=None):
+        """Compile the query again for the new header_list, or the new source model before it is set."""
+        if self.query_node is None:
+            return
+        try:
+            self.query_predicate = self._compile_query_predicate(self.query_node, source_model)
+        except ValueError:
+            # 新的 header 中没有查询的列, 不再使用这个查询
+            self.query = ""
+            self.query_node = None
+            self.query_predicate = None
+        self.query_mask = None
+
+    def _get_query_field(self, field, source_model=None):
+        """
+        Find the raw value of a query field, the column whose key or label is field, ignoring case.
+        :param source_model: the source model to read, the current one by default
+        :return: (column, attr), attr is the row attribute for the MTableModel source, None to read the column
+        """
+        name = field.casefold()
+        column = next(
+            (
+                column
+                for column, attr_dict in enumerate(self.header_list)
+                if name in (str(attr_dict.get("key")).casefold(), str(attr_dict.get("label")).casefold())
+            ),
+            None,
+        )
+        if isinstance(source_model or self.sourceModel(), MTableModel):
+            return column, (None if column is None else self.header_list[column].get("key")) or field
+        if column is None:
+            raise ValueError("Unknown field {!r} in query".format(field))
+        return column, None
+
+    def _compile_query_predicate(self, node, source_model=None):
+        def _make_getter(field):
+            column, attr = self._get_query_field(field, source_model)
+            if attr is None:
+                return lambda handle: self._get_sort_value(handle[0], column, handle[1])
+            return lambda handle: self._get_attr_value(handle[0], attr, handle[1])
+
+        return _compile_query(node, _make_getter, lambda: lambda handle: self._get_row_text(*handle)[0])
+
+    def _get_query_mask(self):
+        """Get the query results of the top level rows, they are matched with the whole columns of raw values."""
+        if self.query_mask is None:
+            source_parent = QtCore.QModelIndex()
+
+            def _get_value_list(field):
+                column, attr = self._get_query_field(field)
+                if attr is None:
+                    return self._get_sort_value_list(column, source_parent)
+                return self._get_attr_value_list(attr, source_parent)
+
+            def _get_text_list():
+                return map(operator.itemgetter(0), self._get_root_text_list())
+
+            self.query_mask = bytearray(_match_query_rows(self.query_node, _get_value_list, _get_text_list))
+        return self.query_mask
+
+    def _query_accepts_row(self, source_row, source_parent):
+        if not source_parent.isValid():
+            query_mask = self._get_query_mask()
+            if source_row < len(query_mask):
+                accepted = query_mask[source_row]
+                if accepted == MASK_UNKNOWN:
+                    accepted = query_mask[source_row] = self.query_predicate((source_row, source_parent))
+                return accepted == MASK_ACCEPTED
+        return self.query_predicate((source_row, source_parent))
 
     def set_filter_attr_pattern(self, attr, pattern):
         for data_dict in self.header_list:
@@ -332,4 +3330,5 @@ class MSortFilterModel(QtCore.QSortFilterProxyModel):
                 else:
                     data_dict["reg"] = None
                 break
-        self.invalidateFilter()
+        self._compile_filter()
+        self._refilter()
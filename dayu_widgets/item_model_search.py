@@ -0,0 +1,506 @@
+"""
+The search helpers of MSortFilterModel: the trigram index, the fuzzy score, the row text matching
+and the parser of set_query.
+"""
+
+# Import built-in modules
+import array
+import datetime
+import itertools
+import numbers
+import operator
+import re
+
+
+class TrigramIndex(object):
+    """
+    A trigram inverted index of row texts, to find the rows containing a substring without scanning all the rows.
+    Each row has a stable id, the posting arrays of the ids only grow, so inserting, removing or changing rows
+    does not rewrite them. The ids of removed or changed rows are left in the arrays, and dropped when the candidates
+    are verified with the row texts. The arrays are compacted when they hold more stale ids than live ones.
+    """
+
+    def __init__(self, text_list=()):
+        # trigram -> array of row id
+        self.posting_map = {}
+        # row id -> text
+        self.text_map = {}
+        # row -> row id
+        self.id_list = []
+        self.next_id = 0
+        # row id -> row, 行有增删后重新生成; 行号和 id 一致时不需要
+        self.row_map = None
+        self.identity = True
+        self.live_count = 0
+        self.stale_count = 0
+        self.insert_rows(0, text_list)
+
+    def __len__(self):
+        return len(self.id_list)
+
+    @staticmethod
+    def get_trigram_set(text):
+        return {text[i : i + 3] for i in range(len(text) - 2)}
+
+    def _add(self, row_id, text, old_text=""):
+        self.text_map[row_id] = text
+        trigram_set = self.get_trigram_set(text)
+        if old_text:
+            trigram_set.difference_update(self.get_trigram_set(old_text))
+        posting_map = self.posting_map
+        for trigram in trigram_set:
+            posting = posting_map.get(trigram)
+            if posting is None:
+                posting = posting_map[trigram] = array.array("q")
+            posting.append(row_id)
+        self.live_count += len(trigram_set)
+
+    def insert_rows(self, row, text_list):
+        """Insert the texts of the new rows before row."""
+        id_list = list(range(self.next_id, self.next_id + len(text_list)))
+        self.identity = self.identity and row == len(self.id_list) == self.next_id
+        self.next_id += len(id_list)
+        for row_id, text in zip(id_list, text_list):
+            self._add(row_id, text)
+        self.id_list[row:row] = id_list
+        self.row_map = None
+
+    def remove_rows(self, first, last):
+        for row_id in self.id_list[first : last + 1]:
+            self.stale_count += len(self.get_trigram_set(self.text_map.pop(row_id)))
+        self.identity = self.identity and last + 1 >= len(self.id_list)
+        del self.id_list[first : last + 1]
+        self.row_map = None
+        self._compact()
+
+    def set_text(self, row, text):
+        row_id = self.id_list[row]
+        old_text = self.text_map[row_id]
+        if old_text == text:
+            return
+        # 旧文字的 trigram 留在数组中, 查询时用新的文字校验
+        self.stale_count += len(self.get_trigram_set(old_text) - self.get_trigram_set(text))
+        self._add(row_id, text, old_text)
+        self._compact()
+
+    def _compact(self):
+        if self.stale_count <= max(self.live_count - self.stale_count, 1024):
+            return
+        text_map = self.text_map
+        self.posting_map = {}
+        self.text_map = {}
+        self.live_count = self.stale_count = 0
+        for row_id in sorted(text_map):
+            self._add(row_id, text_map[row_id])
+
+    def _get_row(self, row_id):
+        if self.identity:
+            return row_id
+        if self.row_map is None:
+            self.row_map = dict(zip(self.id_list, range(len(self.id_list))))
+        return self.row_map[row_id]
+
+    def find_rows(self, text):
+        """
+        Find the rows whose text contains text, the texts are matched as they are.
+        :return: the sorted rows, or None if text is shorter than 3 characters, the index can not help then
+        """
+        if len(text) < 3:
+            return None
+        posting_list = []
+        for trigram in self.get_trigram_set(text):
+            posting = self.posting_map.get(trigram)
+            if posting is None:
+                return []
+            posting_list.append(posting)
+        # 只用最短的数组找候选行, 再用文字校验, 比求交集更快
+        text_map = self.text_map
+        row_id_set = {row_id for row_id in min(posting_list, key=len) if text in text_map.get(row_id, "")}
+        return sorted(self._get_row(row_id) for row_id in row_id_set)
+
+
+# 这些字符后面的字母是单词的开头, 模糊搜索时加分
+FUZZY_SEPARATORS = frozenset(" _-./\\:\n")
+
+
+def fuzzy_match_score(pattern, text):
+    """
+    Score text for a fuzzy pattern, like fzf: the characters of pattern must appear in text in order.
+    The shortest window ending at the first full match is scored, each matched character scores,
+    more for the start of a word, a change between letters and digits, or following the previous match,
+    and the gaps between the matched characters cost.
+    :param pattern: the lowercase pattern
+    :param text: the lowercase text
+    :return: the score, higher is better, None if text does not match
+    """
+    position = -1
+    for char in pattern:
+        position = text.find(char, position + 1)
+        if position < 0:
+            return None
+    # 从第一次完整匹配的结尾往回找，得到最短的匹配区间
+    position += 1
+    for char in reversed(pattern):
+        position = text.rfind(char, 0, position)
+    return _score_fuzzy_window(pattern, text, position)
+
+
+def _score_fuzzy_window(pattern, text, start):
+    score = 0
+    consecutive = 0
+    previous = start - 1
+    position = start - 1
+    for char in pattern:
+        position = text.find(char, position + 1)
+        gap = position - previous - 1
+        if gap > 0:
+            score -= 3 + min(gap, 12)
+            consecutive = 0
+        elif position > start:
+            consecutive += 1
+        score += 16 + consecutive * 4
+        if position == 0 or text[position - 1] in FUZZY_SEPARATORS:
+            score += 8
+        elif text[position - 1].isdigit() != char.isdigit():
+            score += 4
+        previous = position
+    return score
+
+
+def _match_row_text(row_text, search_literal, search_reg, search_position_list, filter_position_list):
+    """Match a cached row text tuple of MSortFilterModel with the search pattern and the filter patterns."""
+    # 如果search 栏有内容 先匹配 search 栏的内容
+    if search_literal is not None:
+        if search_literal not in row_text[0]:
+            return False
+    elif search_reg:
+        for position in search_position_list:
+            text = row_text[position]
+            if text is not None and search_reg.search(text) is not None:
+                # 搜索匹配上了
+                break
+        else:
+            # 全部搜索完毕，没有一个匹配，直接返回 False
+            return False
+
+    # 再去匹配 filter 组合
+    for position, reg_exp in filter_position_list:
+        text = row_text[position]
+        if text is not None and not reg_exp.search(text):
+            # 不符合筛选，直接返回 False
+            return False
+
+    return True
+
+
+def _match_row_text_chunk(text_list, search_literal, search_reg, search_position_list, filter_position_list):
+    """Match a chunk of row text tuples, it runs in the executor, so it only uses its arguments."""
+    return [
+        _match_row_text(row_text, search_literal, search_reg, search_position_list, filter_position_list)
+        for row_text in text_list
+    ]
+
+
+# 自然排序时按数字比较的部分
+NATURAL_DIGIT_REG = re.compile(r"([0-9]+)")
+
+
+def natural_sort_key(value):
+    """
+    Get the sort key of a raw value. None stays None, the numbers are kept as they are,
+    the other values are compared by their lowercase text, with the digits compared by number, eg. "v9" before "v10".
+    The texts are plain strings, each run of digits is prefixed by its length, so sorting them runs in C.
+    """
+    if value is None:
+        return None
+    if value.__class__ is not str:
+        if isinstance(value, numbers.Real):
+            return value
+        value = str(value)
+    part_list = NATURAL_DIGIT_REG.split(value.casefold())
+    for position in range(1, len(part_list), 2):
+        digits = part_list[position].lstrip("0")
+        part_list[position] = "{:02d}{}".format(len(digits), digits)
+    return "".join(part_list)
+
+
+# MSortFilterModel.set_query 的词法: 引号中的文字, 运算符和括号, 其余的词; 数字开头的词可以含有冒号, 例如 2024-01-31T12:00
+QUERY_TOKEN_REG = re.compile(
+    r'\s*(?:"((?:[^"\\]|\\.)*)"|(>=|<=|!=|[=<>:(),])|((?:\.\.)?[0-9][^\s"()<>=!,]*|[^\s"()<>=!:,]+))'
+)
+QUERY_NUMBER_REG = re.compile(r"[-+]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][-+]?[0-9]+)?$")
+QUERY_OPERATOR_MAP = {
+    "=": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+# 查询结果 mask 取反
+QUERY_NOT_TABLE = bytes.maketrans(b"\x00\x01", b"\x01\x00")
+
+
+def _parse_query_literal(text, quoted=False):
+    """Convert a query value into int, float, date or datetime, the quoted values and the other words stay text."""
+    if quoted:
+        return text
+    if QUERY_NUMBER_REG.match(text):
+        try:
+            return int(text)
+        except ValueError:
+            return float(text)
+    for convert in (datetime.date.fromisoformat, datetime.datetime.fromisoformat):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def _get_query_key(value, literal):
+    """
+    Convert a raw value to be compared with a query literal of the same kind: a number, a date or a datetime.
+    The texts are compared by natural_sort_key. Raise ValueError or TypeError if the value can not be converted.
+    """
+    if isinstance(literal, str):
+        return natural_sort_key(str(value))
+    if isinstance(literal, datetime.datetime):
+        if isinstance(value, str):
+            return datetime.datetime.fromisoformat(value)
+        if not isinstance(value, datetime.datetime) and isinstance(value, datetime.date):
+            return datetime.datetime.combine(value, datetime.time())
+        return value
+    if isinstance(literal, datetime.date):
+        if isinstance(value, str):
+            return datetime.date.fromisoformat(value[:10])
+        if isinstance(value, datetime.datetime):
+            return value.date()
+        return value
+    if isinstance(value, str):
+        return float(value)
+    return value
+
+
+def _make_query_test(op, literal):
+    """
+    Build the test of a raw value for a query condition.
+    None and the values which can not be compared with the literal only pass the "!=" test.
+    """
+    if op == ":":
+        if isinstance(literal, str):
+            # 文字按子串匹配, 忽略大小写
+            text = literal.lower()
+            return lambda value: value is not None and text in str(value).lower()
+        op = "="
+    if op == "in":
+        test_list = [_make_query_test("=", item) for item in literal]
+        return lambda value: any(test(value) for test in test_list)
+    if op == "..":
+        test_list = [_make_query_test(sub_op, item) for sub_op, item in zip((">=", "<="), literal) if item is not None]
+        return lambda value: all(test(value) for test in test_list)
+    compare = QUERY_OPERATOR_MAP[op]
+    key = natural_sort_key(literal) if isinstance(literal, str) else literal
+    mismatch = op == "!="
+
+    def _test(value):
+        if value is None:
+            return mismatch
+        try:
+            return compare(_get_query_key(value, literal), key)
+        except (TypeError, ValueError):
+            return mismatch
+
+    return _test
+
+
+class _QueryParser(object):
+    """
+    Parse the query of MSortFilterModel.set_query into a tree of tuples:
+    ("or", [node]), ("and", [node]), ("not", node), ("text", lowercase text) and ("field", field, op, literal),
+    where op is "=", "!=", ">", ">=", "<", "<=", ":", "in" with a list of literals, or ".." with (low, high).
+    """
+
+    def __init__(self, text):
+        self.token_list = []
+        self.position = 0
+        text = text.strip()
+        position = 0
+        while position < len(text):
+            match = QUERY_TOKEN_REG.match(text, position)
+            if match is None:
+                raise ValueError("Invalid character {!r} at {} in query {!r}".format(text[position], position, text))
+            string, op, word = match.groups()
+            if string is not None:
+                self.token_list.append(("string", re.sub(r"\\(.)", r"\1", string)))
+            elif op is not None:
+                self.token_list.append(("op", op))
+            else:
+                self.token_list.append(("word", word))
+            position = match.end()
+        self.text = text
+
+    def parse(self):
+        """Return the root node, None for an empty query."""
+        if not self.token_list:
+            return None
+        node = self._parse_or()
+        if self.position < len(self.token_list):
+            self._raise_unexpected()
+        return node
+
+    def _peek(self, offset=0):
+        position = self.position + offset
+        return self.token_list[position] if position < len(self.token_list) else (None, None)
+
+    def _next(self):
+        token = self._peek()
+        if token[0] is None:
+            raise ValueError("Unexpected end of query {!r}".format(self.text))
+        self.position += 1
+        return token
+
+    def _raise_unexpected(self):
+        raise ValueError("Unexpected {!r} in query {!r}".format(self._peek()[1], self.text))
+
+    def _is_keyword(self, word, offset=0):
+        kind, text = self._peek(offset)
+        return kind == "word" and text.lower() == word
+
+    def _parse_or(self):
+        node_list = [self._parse_and()]
+        while self._is_keyword("or"):
+            self.position += 1
+            node_list.append(self._parse_and())
+        return node_list[0] if len(node_list) == 1 else ("or", node_list)
+
+    def _parse_and(self):
+        node_list = [self._parse_not()]
+        while True:
+            kind, text = self._peek()
+            if kind is None or (kind, text) == ("op", ")") or self._is_keyword("or"):
+                break
+            # 相邻的条件默认是 and
+            if self._is_keyword("and"):
+                self.position += 1
+            node_list.append(self._parse_not())
+        return node_list[0] if len(node_list) == 1 else ("and", node_list)
+
+    def _parse_not(self):
+        if self._is_keyword("not"):
+            self.position += 1
+            return ("not", self._parse_not())
+        kind, text = self._peek()
+        if kind == "word" and len(text) > 1 and text.startswith("-"):
+            self.token_list[self.position] = ("word", text[1:])
+            return ("not", self._parse_not())
+        return self._parse_atom()
+
+    def _parse_atom(self):
+        kind, text = self._next()
+        if (kind, text) == ("op", "("):
+            node = self._parse_or()
+            if self._next() != ("op", ")"):
+                self.position -= 1
+                self._raise_unexpected()
+            return node
+        if kind == "op":
+            self.position -= 1
+            self._raise_unexpected()
+        next_kind, next_text = self._peek()
+        if kind == "word" and next_kind == "op" and (next_text in QUERY_OPERATOR_MAP or next_text == ":"):
+            self.position += 1
+            if next_text == ":" and self._peek() == ("op", "("):
+                return ("field", text, "in", self._parse_value_list())
+            value_kind, value = self._next()
+            if value_kind == "op":
+                self.position -= 1
+                self._raise_unexpected()
+            if value_kind == "word" and ".." in value and next_text in (":", "="):
+                low, high = value.split("..", 1)
+                return (
+                    "field",
+                    text,
+                    "..",
+                    (_parse_query_literal(low) if low else None, _parse_query_literal(high) if high else None),
+                )
+            return ("field", text, next_text, _parse_query_literal(value, value_kind == "string"))
+        if kind == "word" and self._is_keyword("in") and self._peek(1) == ("op", "("):
+            self.position += 1
+            return ("field", text, "in", self._parse_value_list())
+        return ("text", text.lower())
+
+    def _parse_value_list(self):
+        self._next()
+        value_list = []
+        while True:
+            kind, text = self._next()
+            if kind == "op":
+                self.position -= 1
+                self._raise_unexpected()
+            value_list.append(_parse_query_literal(text, kind == "string"))
+            kind, text = self._next()
+            if text == ")" and kind == "op":
+                return value_list
+            if (kind, text) != ("op", ","):
+                self.position -= 1
+                self._raise_unexpected()
+
+
+def _compile_query(node, make_getter, make_text_getter):
+    """
+    Compile a parsed query into a predicate of a row handle.
+    :param node: the root node of _QueryParser
+    :param make_getter: function, takes a field name, returns the function to read its raw value from a row handle
+    :param make_text_getter: function, returns the function to read the lowercase search text from a row handle
+    :return: function, takes a row handle and returns bool
+    """
+    kind = node[0]
+    if kind in ("and", "or"):
+        predicate_list = [_compile_query(sub_node, make_getter, make_text_getter) for sub_node in node[1]]
+        if kind == "and":
+            return lambda handle: all(predicate(handle) for predicate in predicate_list)
+        return lambda handle: any(predicate(handle) for predicate in predicate_list)
+    if kind == "not":
+        predicate = _compile_query(node[1], make_getter, make_text_getter)
+        return lambda handle: not predicate(handle)
+    if kind == "text":
+        text = node[1]
+        get_text = make_text_getter()
+        return lambda handle: text in get_text(handle)
+    get_value = make_getter(node[1])
+    test = _make_query_test(node[2], node[3])
+    return lambda handle: test(get_value(handle))
+
+
+def _match_query_rows(node, get_value_list, get_text_list):
+    """
+    Match all the rows with a parsed query at once, column by column.
+    Each distinct value is tested once, and the results of the sub queries are combined as big integers.
+    :param node: the root node of _QueryParser
+    :param get_value_list: function, takes a field name, returns the raw values of all the rows
+    :param get_text_list: function, returns the lowercase search texts of all the rows
+    :return: bytes, 1 for the accepted rows and 0 for the others
+    """
+    kind = node[0]
+    if kind in ("and", "or"):
+        mask_list = [_match_query_rows(sub_node, get_value_list, get_text_list) for sub_node in node[1]]
+        result = int.from_bytes(mask_list[0], "little")
+        for mask in mask_list[1:]:
+            if kind == "and":
+                result &= int.from_bytes(mask, "little")
+            else:
+                result |= int.from_bytes(mask, "little")
+        return result.to_bytes(len(mask_list[0]), "little")
+    if kind == "not":
+        return _match_query_rows(node[1], get_value_list, get_text_list).translate(QUERY_NOT_TABLE)
+    if kind == "text":
+        return bytes(map(operator.contains, get_text_list(), itertools.repeat(node[1])))
+    value_list = get_value_list(node[1])
+    test = _make_query_test(node[2], node[3])
+    try:
+        result_dict = {value: test(value) for value in set(value_list)}
+    except TypeError:
+        # 有无法 hash 的值, 逐个测试
+        return bytes(map(test, value_list))
+    return bytes(map(result_dict.__getitem__, value_list))
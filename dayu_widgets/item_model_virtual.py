@@ -0,0 +1,343 @@
+"""
+MVirtualTableModel and its data sources, the rows are loaded by blocks when they are shown.
+"""
+
+# Import built-in modules
+import collections
+import sys
+import threading
+
+# Import third-party modules
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets import item_model
+from dayu_widgets.utils import get_obj_value
+
+
+class ListDataSource(object):
+    """
+    The in-process data source of MVirtualTableModel over a list of dict or object rows.
+    The sort is a list of (key, descending), None is the biggest value, the filter is a function row -> bool.
+    The row order of the last sort and filter is cached, fetch can be called from any thread.
+    """
+
+    def __init__(self, data_list):
+        self.data_list = data_list
+        self._lock = threading.Lock()
+        self._order_key = None
+        self._order_list = None
+
+    def _get_order_list(self, sort=None, filter=None):
+        """The row numbers of the sorted and filtered rows, None for all the rows in the list order."""
+        order_key = (tuple(sort or ()), filter)
+        with self._lock:
+            if self._order_key == order_key:
+                return self._order_list
+            if filter is None:
+                row_list = None if not sort else list(range(len(self.data_list)))
+            else:
+                row_list = [row for row, data_obj in enumerate(self.data_list) if filter(data_obj)]
+            # 多列排序: 从最后一列开始做稳定排序
+            for key, descending in reversed(sort or ()):
+                values = [get_obj_value(self.data_list[row], key) for row in row_list]
+                row_list = [row_list[position] for position in item_model._sort_row_list(values, reverse=descending)]
+            self._order_key = order_key
+            self._order_list = row_list
+            return row_list
+
+    def count(self, filter=None):
+        order_list = self._get_order_list(filter=filter)
+        return len(self.data_list) if order_list is None else len(order_list)
+
+    def fetch(self, offset, limit, sort=None, filter=None):
+        order_list = self._get_order_list(sort, filter)
+        if order_list is None:
+            return self.data_list[offset : offset + limit]
+        return [self.data_list[row] for row in order_list[offset : offset + limit]]
+
+
+class SqliteDataSource(object):
+    """
+    The data source of MVirtualTableModel over a SQLite table, the rows are dicts of the selected columns.
+    The sort is a list of (column, descending), the filter is a where clause string,
+    or a tuple of (where clause, parameters), eg. ("status = ?", ["failed"]).
+    Index the sorted and filtered columns, the blocks far from the top are read with OFFSET.
+    """
+
+    def __init__(self, database, table, column_list=None):
+        # 连接在工作线程中使用，由锁保证同一时间只有一个查询
+        self.connection = database
+        if isinstance(database, str):
+            # Import built-in modules
+            import sqlite3
+
+            self.connection = sqlite3.connect(database, check_same_thread=False)
+        self.table = table
+        self.column_list = column_list
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _quote(name):
+        return '"{}"'.format(name.replace('"', '""'))
+
+    def _get_where(self, filter):
+        if not filter:
+            return "", []
+        if isinstance(filter, str):
+            return " WHERE {}".format(filter), []
+        where, parameter_list = filter
+        return " WHERE {}".format(where), list(parameter_list)
+
+    def _execute(self, sql, parameter_list):
+        with self._lock:
+            cursor = self.connection.execute(sql, parameter_list)
+            return cursor.description, cursor.fetchall()
+
+    def count(self, filter=None):
+        where, parameter_list = self._get_where(filter)
+        _, row_list = self._execute("SELECT COUNT(*) FROM {}{}".format(self._quote(self.table), where), parameter_list)
+        return row_list[0][0]
+
+    def fetch(self, offset, limit, sort=None, filter=None):
+        where, parameter_list = self._get_where(filter)
+        columns = ", ".join(map(self._quote, self.column_list)) if self.column_list else "*"
+        order = ""
+        if sort:
+            # 与 ListDataSource 一致: 升序时 NULL 排在最后, 降序正好相反
+            order = " ORDER BY " + ", ".join(
+                "{0} IS NULL {1}, {0} {1}".format(self._quote(key), "DESC" if descending else "ASC")
+                for key, descending in sort
+            )
+        description, row_list = self._execute(
+            "SELECT {} FROM {}{}{} LIMIT ? OFFSET ?".format(columns, self._quote(self.table), where, order),
+            parameter_list + [limit, offset],
+        )
+        key_list = [column[0] for column in description]
+        return [dict(zip(key_list, row)) for row in row_list]
+
+
+def _estimate_block_size(block):
+    """Estimate the memory of a block of rows in bytes from its first row."""
+    if not block:
+        return sys.getsizeof(block)
+    data_obj = block[0]
+    row_size = sys.getsizeof(data_obj)
+    if hasattr(data_obj, "__dict__"):
+        row_size += sys.getsizeof(data_obj.__dict__)
+    row_size += sum(sys.getsizeof(key) + sys.getsizeof(value) for key, value in item_model._get_row_fields(data_obj))
+    return sys.getsizeof(block) + row_size * len(block)
+
+
+class MVirtualTableModel(QtCore.QAbstractTableModel):
+    """
+    A flat table model which does not hold the rows, for the tables too big to load, eg. logs or database tables.
+    rowCount comes from data_source.count(filter), the rows are read by data_source.fetch(offset, limit, sort, filter)
+    in fixed-size blocks on a worker thread, when the view asks for them.
+    The neighbour blocks are prefetched, and the least recently used blocks are dropped over max_cache_bytes.
+    The cells are formatted with the same header_list as MTableModel. Sorting and filtering are done
+    by the data source, so use it with MTableView directly, not behind MSortFilterModel.
+    """
+
+    sig_fetch_failed = QtCore.Signal(int, str)
+
+    def __init__(self, data_source=None, block_size=500, parent=None):
+        super(MVirtualTableModel, self).__init__(parent)
+        self.data_source = data_source
+        self.block_size = block_size
+        self.prefetch_blocks = 1
+        self.max_cache_bytes = 64 * 1024 * 1024
+        self.loading_text = self.tr("Loading...")
+        self.header_list = []
+        self.column_role_list = []
+        self.column_flag_list = []
+        self.row_count = 0
+        self.sort_list = None
+        self.filter = None
+        # block number -> rows, 按最近使用排序
+        self.block_cache = collections.OrderedDict()
+        self.block_size_dict = {}
+        self.cache_bytes = 0
+        # block number -> ChunkLoader, 按请求顺序排序
+        self.loading_dict = collections.OrderedDict()
+        self.max_loading_blocks = 8
+        self.running_loader_set = set()
+        self.last_block_number = None
+        self.refresh()
+
+    def set_header_list(self, header_list):
+        self.beginResetModel()
+        self.header_list = header_list
+        compiled_list = [item_model._compile_column(attr_dict) for attr_dict in header_list]
+        self.column_role_list = [role_dict for role_dict, _ in compiled_list]
+        self.column_flag_list = [flags for _, flags in compiled_list]
+        self.endResetModel()
+
+    def set_data_source(self, data_source):
+        self.data_source = data_source
+        self.refresh()
+
+    def set_filter(self, filter):
+        """Set the filter passed to the data source, None to show all the rows."""
+        self.filter = filter
+        self.refresh()
+
+    def refresh(self):
+        """Drop the loaded blocks and count the rows again, eg. after the data source changed."""
+        self.beginResetModel()
+        for chunk_loader in self.loading_dict.values():
+            chunk_loader.cancel()
+        self.loading_dict.clear()
+        self.block_cache.clear()
+        self.block_size_dict.clear()
+        self.cache_bytes = 0
+        self.last_block_number = None
+        self.row_count = 0 if self.data_source is None else self.data_source.count(self.filter)
+        self.endResetModel()
+
+    def sort(self, column, order=QtCore.Qt.AscendingOrder):
+        if 0 <= column < len(self.header_list):
+            self.sort_list = [(self.header_list[column].get("key"), order == QtCore.Qt.DescendingOrder)]
+        else:
+            self.sort_list = None
+        self.refresh()
+
+    def rowCount(self, parent_index=None):
+        if parent_index and parent_index.isValid():
+            return 0
+        return self.row_count
+
+    def columnCount(self, parent_index=None):
+        if parent_index and parent_index.isValid():
+            return 0
+        return len(self.header_list)
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.ItemIsEnabled
+        return self.column_flag_list[index.column()]
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if orientation == QtCore.Qt.Vertical:
+            return super(MVirtualTableModel, self).headerData(section, orientation, role)
+        if not self.header_list or section >= len(self.header_list):
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return self.header_list[section]["label"]
+        return None
+
+    def get_data_obj(self, index):
+        """Get the row of the index, None if its block is not loaded yet."""
+        if not index.isValid():
+            return None
+        block = self.block_cache.get(index.row() // self.block_size)
+        position = index.row() % self.block_size
+        if block is None or position >= len(block):
+            return None
+        return block[position]
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = index.row()
+        block_number = row // self.block_size
+        if block_number != self.last_block_number:
+            self._touch_block(block_number)
+        block = self.block_cache.get(block_number)
+        if block is None:
+            if index.column() == 0 and role == QtCore.Qt.DisplayRole:
+                return self.loading_text
+            return None
+        position = row - block_number * self.block_size
+        if position >= len(block):
+            return None
+        cell_getter = self.column_role_list[index.column()].get(role)
+        if cell_getter is None:
+            # header 中没有配置该 role
+            return None
+        return cell_getter(block[position])
+
+    def _touch_block(self, block_number):
+        """The view reads a new block, mark it as recently used, load it and its neighbours if needed."""
+        self.last_block_number = block_number
+        if block_number in self.block_cache:
+            self.block_cache.move_to_end(block_number)
+        block_count = (self.row_count + self.block_size - 1) // self.block_size
+        # 先请求当前块，再请求相邻的块
+        for number in sorted(
+            range(block_number - self.prefetch_blocks, block_number + self.prefetch_blocks + 1),
+            key=lambda number: abs(number - block_number),
+        ):
+            if 0 <= number < block_count and number not in self.block_cache:
+                self._request_block(number)
+
+    def _request_block(self, block_number):
+        chunk_loader = self.loading_dict.get(block_number)
+        if chunk_loader is not None:
+            self.loading_dict.move_to_end(block_number)
+            return
+        data_source = self.data_source
+        sort_list = self.sort_list
+        filter = self.filter
+        offset = block_number * self.block_size
+        limit = self.block_size
+
+        def _fetch_block():
+            # 快速滚动时排队的请求可能已经被取消，不再查询
+            if chunk_loader.canceled:
+                return []
+            return data_source.fetch(offset, limit, sort_list, filter)
+
+        chunk_loader = item_model.ChunkLoader(_fetch_block, limit, parent=self, context=block_number)
+        chunk_loader.signals.sig_chunk_loaded.connect(self._slot_block_loaded)
+        chunk_loader.signals.sig_failed.connect(self._slot_block_failed)
+        chunk_loader.signals.sig_finished.connect(self._slot_block_finished)
+        self.loading_dict[block_number] = chunk_loader
+        self.running_loader_set.add(chunk_loader)
+        # 已经滚过去的块最早请求，超出上限时先取消
+        while len(self.loading_dict) > self.max_loading_blocks:
+            self.loading_dict.popitem(last=False)[1].cancel()
+        chunk_loader.start()
+
+    def _store_block(self, block_number, block):
+        self.block_cache[block_number] = block
+        block_size = _estimate_block_size(block)
+        self.block_size_dict[block_number] = block_size
+        self.cache_bytes += block_size
+        while self.cache_bytes > self.max_cache_bytes and len(self.block_cache) > 1:
+            old_number, _ = self.block_cache.popitem(last=False)
+            self.cache_bytes -= self.block_size_dict.pop(old_number)
+            if old_number == self.last_block_number:
+                # 下次读取时重新请求
+                self.last_block_number = None
+
+    @QtCore.Slot(object, object)
+    def _slot_block_loaded(self, chunk_loader, chunk):
+        block_number = chunk_loader.context
+        if self.loading_dict.get(block_number) is not chunk_loader or block_number in self.block_cache:
+            return
+        block = chunk[: self.block_size]
+        self._store_block(block_number, block)
+        first = block_number * self.block_size
+        last = min(first + len(block), self.row_count) - 1
+        if last >= first and self.header_list:
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(self.header_list) - 1))
+
+    @QtCore.Slot(object, str)
+    def _slot_block_failed(self, chunk_loader, message):
+        block_number = chunk_loader.context
+        if self.loading_dict.get(block_number) is not chunk_loader:
+            return
+        self.loading_dict.pop(block_number)
+        self.sig_fetch_failed.emit(block_number * self.block_size, message)
+
+    @QtCore.Slot(object)
+    def _slot_block_finished(self, chunk_loader):
+        block_number = chunk_loader.context
+        if self.loading_dict.get(block_number) is chunk_loader:
+            self.loading_dict.pop(block_number)
+            if block_number not in self.block_cache:
+                # 数据源返回的行比 count 少，记为空块，避免反复请求
+                self._store_block(block_number, [])
+        self.running_loader_set.discard(chunk_loader)
+        chunk_loader.signals.deleteLater()
@@ -1,3 +1,7 @@
+# Import built-in modules
+import bisect
+import time
+
 # Import third-party modules
 from qtpy import QtCore
 from qtpy import QtGui
@@ -7,6 +11,7 @@ from qtpy import QtWidgets
 from dayu_widgets import dayu_theme
 from dayu_widgets import utils
 from dayu_widgets.header_view import MHeaderView
+from dayu_widgets.item_model import MSortFilterModel
 from dayu_widgets.item_model import MTableModel
 from dayu_widgets.menu import MMenu
 from dayu_widgets.qt import MPixmap
@@ -65,7 +70,7 @@ class MOptionDelegate(QtWidgets.QStyledItemDelegate):
         self.editor.setWindowFlags(QtCore.Qt.FramelessWindowHint | QtCore.Qt.Window)
         model = utils.real_model(index)
         real_index = utils.real_index(index)
-        data_obj = real_index.internalPointer()
+        data_obj = model.get_data_obj(real_index)
         attr = "{}_list".format(model.header_list[real_index.column()].get("key"))
 
         self.editor.set_data(utils.get_obj_value(data_obj, attr, []))
@@ -153,18 +158,18 @@ def enable_context_menu(self, enable):
 def slot_context_menu(self, point):
     proxy_index = self.indexAt(point)
     if proxy_index.isValid():
-        need_map = isinstance(self.model(), QtCore.QSortFilterProxyModel)
+        source_model = utils.real_model(self.model())
         selection = []
         selected = (
             self.selectionModel().selectedRows() or
             self.selectionModel().selectedIndexes()
         )
         for index in selected:
-            if need_map:
-                source_index = self.model().mapToSource(index)
-                data_obj = source_index.internalPointer()
+            source_index = utils.real_index(index)
+            if isinstance(source_model, MTableModel):
+                data_obj = source_model.get_data_obj(source_index)
             else:
-                data_obj = index.internalPointer()
+                data_obj = source_index.internalPointer()
             selection.append(data_obj)
         event = utils.ItemViewMenuEvent(view=self, selection=selection, extra={})
         self.sig_context_menu.emit(event)
@@ -173,6 +178,94 @@ def slot_context_menu(self, point):
         self.sig_context_menu.emit(event)
 
 
+def set_auto_scroll(self, flag):
+    """
+    Follow the new rows at the bottom, eg. for a log table.
+    It stops following when the user scrolls up, and follows again when the user scrolls back to the bottom.
+    While it does not follow, dropping the oldest rows does not move the rows in the viewport.
+    """
+    scroll_bar = self.verticalScrollBar()
+    if flag and not self.auto_scroll:
+        scroll_bar.rangeChanged.connect(self._slot_auto_scroll_range)
+        scroll_bar.valueChanged.connect(self._slot_auto_scroll_value)
+    elif not flag and self.auto_scroll:
+        scroll_bar.rangeChanged.disconnect(self._slot_auto_scroll_range)
+        scroll_bar.valueChanged.disconnect(self._slot_auto_scroll_value)
+    self.auto_scroll = flag
+    self.scroll_at_bottom = flag
+    if flag:
+        self.scrollToBottom()
+
+
+@QtCore.Slot(int, int)
+def _slot_auto_scroll_range(self, minimum, maximum):
+    if self.scroll_at_bottom:
+        self.verticalScrollBar().setValue(maximum)
+
+
+@QtCore.Slot(int)
+def _slot_auto_scroll_value(self, value):
+    self.scroll_at_bottom = value >= self.verticalScrollBar().maximum()
+
+
+def keep_scroll_position(self, parent_index, start, end):
+    """Scroll up by the rows removed above the viewport, so the rows the user is reading stay in place."""
+    if not self.auto_scroll or self.scroll_at_bottom or parent_index.isValid():
+        return
+    top_index = self.indexAt(QtCore.QPoint(0, 0))
+    if not top_index.isValid() or start >= top_index.row():
+        return
+    current_index = self.currentIndex()
+    if current_index.isValid() and not current_index.parent().isValid() and start <= current_index.row() <= end:
+        # 删除当前行时 Qt 会把当前行移到下一行并滚动到它
+        self.selectionModel().setCurrentIndex(QtCore.QModelIndex(), QtCore.QItemSelectionModel.NoUpdate)
+    count = min(end + 1, top_index.row()) - start
+    if self.verticalScrollMode() == QtWidgets.QAbstractItemView.ScrollPerPixel:
+        count *= self.visualRect(self.model().index(start, 0, parent_index)).height()
+    scroll_bar = self.verticalScrollBar()
+    scroll_bar.setValue(scroll_bar.value() - count)
+
+
+def keyboard_search(self, search):
+    """
+    Type-ahead with the search index of a MSortFilterModel, see MSortFilterModel.set_search_index.
+    The typed keys are collected like Qt does, once there are 3 characters and the current column is searchable,
+    the next row whose text starts with them is found from the index instead of reading the rows one by one.
+    :return: True if it is handled, else the view should call the default keyboardSearch
+    """
+    now = time.monotonic()
+    if not search or now - self.keyboard_search_time > QtWidgets.QApplication.keyboardInputInterval() / 1000.0:
+        self.keyboard_search_text = ""
+    self.keyboard_search_text += search
+    self.keyboard_search_time = now
+    model = self.model()
+    text = self.keyboard_search_text.lower()
+    if len(text) < 3 or not isinstance(model, MSortFilterModel) or model.sourceModel() is None:
+        return False
+    current_index = self.currentIndex()
+    if current_index.isValid():
+        column = current_index.column()
+    else:
+        column = self.modelColumn() if isinstance(self, QtWidgets.QListView) else 0
+    row_list = model.find_source_rows(text, column, prefix=True)
+    if row_list is None:
+        return False
+    source_model = model.sourceModel()
+    proxy_row_list = sorted(
+        proxy_row
+        for proxy_row in (model.mapFromSource(source_model.index(row, column)).row() for row in row_list)
+        if proxy_row >= 0
+    )
+    if proxy_row_list:
+        # 从当前行开始找，找不到时回到第一个匹配的行
+        current_row = current_index.row() if current_index.isValid() and not current_index.parent().isValid() else 0
+        position = bisect.bisect_left(proxy_row_list, current_row) % len(proxy_row_list)
+        index = model.index(proxy_row_list[position], column)
+        self.setCurrentIndex(index)
+        self.scrollTo(index)
+    return True
+
+
 def mouse_move_event(self, event):
     index = self.indexAt(event.pos())
     real_index = utils.real_index(index)
@@ -210,10 +303,18 @@ class MTableView(QtWidgets.QTableView):
     set_header_list = set_header_list
     enable_context_menu = enable_context_menu
     slot_context_menu = slot_context_menu
+    set_auto_scroll = set_auto_scroll
+    _slot_auto_scroll_range = _slot_auto_scroll_range
+    _slot_auto_scroll_value = _slot_auto_scroll_value
+    keyboard_search = keyboard_search
     sig_context_menu = QtCore.Signal(object)
 
     def __init__(self, size=None, show_row_count=False, parent=None):
         super(MTableView, self).__init__(parent)
+        self.keyboard_search_text = ""
+        self.keyboard_search_time = 0.0
+        self.auto_scroll = False
+        self.scroll_at_bottom = False
         self._no_data_image = None
         self._no_data_text = self.tr("No Data")
         size = size or dayu_theme.default_size
@@ -268,6 +369,10 @@ class MTableView(QtWidgets.QTableView):
         #     'edit': None
         # }
 
+    def keyboardSearch(self, search):
+        if not self.keyboard_search(search):
+            super(MTableView, self).keyboardSearch(search)
+
     def paintEvent(self, event):
         """Override paintEvent when there is no data to show, draw the preset picture and text."""
         model = utils.real_model(self.model())
@@ -278,6 +383,10 @@ class MTableView(QtWidgets.QTableView):
                 draw_empty_content(self.viewport(), self._no_data_text, self._no_data_image)
         return super(MTableView, self).paintEvent(event)
 
+    def rowsAboutToBeRemoved(self, parent_index, start, end):
+        keep_scroll_position(self, parent_index, start, end)
+        super(MTableView, self).rowsAboutToBeRemoved(parent_index, start, end)
+
     def save_state(self, name):
         settings = QtCore.QSettings(
             QtCore.QSettings.IniFormat,
@@ -302,10 +411,13 @@ class MTreeView(QtWidgets.QTreeView):
     set_header_list = set_header_list
     enable_context_menu = enable_context_menu
     slot_context_menu = slot_context_menu
+    keyboard_search = keyboard_search
     sig_context_menu = QtCore.Signal(object)
 
     def __init__(self, parent=None):
         super(MTreeView, self).__init__(parent)
+        self.keyboard_search_text = ""
+        self.keyboard_search_time = 0.0
         self._no_data_image = None
         self._no_data_text = self.tr("No Data")
         self.header_list = []
@@ -313,6 +425,11 @@ class MTreeView(QtWidgets.QTreeView):
         self.setHeader(self.header_view)
         self.setSortingEnabled(True)
         self.setAlternatingRowColors(True)
+        self.collapsed.connect(self._slot_collapsed)
+
+    def keyboardSearch(self, search):
+        if not self.keyboard_search(search):
+            super(MTreeView, self).keyboardSearch(search)
 
     def paintEvent(self, event):
         """Override paintEvent when there is no data to show, draw the preset picture and text."""
@@ -324,6 +441,13 @@ class MTreeView(QtWidgets.QTreeView):
                 draw_empty_content(self.viewport(), self._no_data_text, self._no_data_image)
         return super(MTreeView, self).paintEvent(event)
 
+    @QtCore.Slot(QtCore.QModelIndex)
+    def _slot_collapsed(self, index):
+        """Stop loading the lazy children of the collapsed node."""
+        model = utils.real_model(self.model())
+        if isinstance(model, MTableModel):
+            model.cancel_fetch(utils.real_index(index))
+
     def set_no_data_text(self, text):
         self._no_data_text = text
 
@@ -386,10 +510,18 @@ class MListView(QtWidgets.QListView):
     set_header_list = set_header_list
     enable_context_menu = enable_context_menu
     slot_context_menu = slot_context_menu
+    set_auto_scroll = set_auto_scroll
+    _slot_auto_scroll_range = _slot_auto_scroll_range
+    _slot_auto_scroll_value = _slot_auto_scroll_value
+    keyboard_search = keyboard_search
     sig_context_menu = QtCore.Signal(object)
 
     def __init__(self, size=None, parent=None):
         super(MListView, self).__init__(parent)
+        self.keyboard_search_text = ""
+        self.keyboard_search_time = 0.0
+        self.auto_scroll = False
+        self.scroll_at_bottom = False
         self._no_data_image = None
         self._no_data_text = self.tr("No Data")
         self.setProperty("dayu_size", size or dayu_theme.default_size)
@@ -406,6 +538,10 @@ class MListView(QtWidgets.QListView):
         else:
             self.setModelColumn(0)
 
+    def keyboardSearch(self, search):
+        if not self.keyboard_search(search):
+            super(MListView, self).keyboardSearch(search)
+
     def paintEvent(self, event):
         """Override paintEvent when there is no data to show, draw the preset picture and text."""
         model = utils.real_model(self.model())
@@ -416,5 +552,9 @@ class MListView(QtWidgets.QListView):
                 draw_empty_content(self.viewport(), self._no_data_text, self._no_data_image)
         return super(MListView, self).paintEvent(event)
 
+    def rowsAboutToBeRemoved(self, parent_index, start, end):
+        keep_scroll_position(self, parent_index, start, end)
+        super(MListView, self).rowsAboutToBeRemoved(parent_index, start, end)
+
     def set_no_data_text(self, text):
         self._no_data_text = text
@@ -3,12 +3,14 @@ from qtpy import QtCore
 from qtpy import QtWidgets
 
 # Import local modules
+from dayu_widgets import item_view_set
 from dayu_widgets.button_group import MToolButtonGroup
 from dayu_widgets.item_model import MSortFilterModel
 from dayu_widgets.item_model import MTableModel
 from dayu_widgets.item_view import MBigView
 from dayu_widgets.item_view import MTableView
 from dayu_widgets.line_edit import MLineEdit
+from dayu_widgets.loading import MLoadingWrapper
 from dayu_widgets.page import MPage
 from dayu_widgets.tool_button import MToolButton
 
@@ -21,12 +23,20 @@ class MItemViewFullSet(QtWidgets.QWidget):
     sig_current_column_changed = QtCore.Signal(QtCore.QModelIndex, QtCore.QModelIndex)
     sig_selection_changed = QtCore.Signal(QtCore.QItemSelection, QtCore.QItemSelection)
     sig_context_menu = QtCore.Signal(object)
+    _slot_stop_loading = item_view_set._slot_stop_loading
+    _slot_search_text_changed = item_view_set._slot_search_text_changed
+    _slot_search_delay_text_changed = item_view_set._slot_search_delay_text_changed
+    searchable = item_view_set.searchable
 
     def __init__(self, table_view=True, big_view=False, parent=None):
         super(MItemViewFullSet, self).__init__(parent)
         self.sort_filter_model = MSortFilterModel()
         self.source_model = MTableModel()
         self.sort_filter_model.setSourceModel(self.source_model)
+        self.source_model.sig_fetch_progress.connect(self.set_record_count)
+        self.source_model.sig_fetch_progress.connect(self._slot_stop_loading)
+        self.source_model.sig_fetch_finished.connect(self._slot_stop_loading)
+        self.source_model.sig_fetch_failed.connect(self._slot_stop_loading)
 
         self.stack_widget = QtWidgets.QStackedWidget()
 
@@ -72,19 +82,23 @@ class MItemViewFullSet(QtWidgets.QWidget):
         self.search_line_edit = MLineEdit().search().small()
         self.search_attr_button = MToolButton().icon_only().svg("down_fill.svg").small()
         self.search_line_edit.set_prefix_widget(self.search_attr_button)
-        self.search_line_edit.textChanged.connect(self.sort_filter_model.set_search_pattern)
+        self.search_line_edit.textChanged.connect(self._slot_search_text_changed)
+        self.search_line_edit.sig_delay_text_changed.connect(self._slot_search_delay_text_changed)
+        self.sort_filter_model.sig_filter_progress.connect(self.search_line_edit.set_progress)
         self.search_line_edit.setVisible(False)
 
         self.top_lay.addStretch()
         self.top_lay.addWidget(self.search_line_edit)
         self.tool_bar.setLayout(self.top_lay)
 
+        self.loading_wrapper = MLoadingWrapper(self.stack_widget, loading=False)
+
         self.page_set = MPage()
         self.main_lay = QtWidgets.QVBoxLayout()
         self.main_lay.setSpacing(5)
         self.main_lay.setContentsMargins(0, 0, 0, 0)
         self.main_lay.addWidget(self.tool_bar)
-        self.main_lay.addWidget(self.stack_widget)
+        self.main_lay.addWidget(self.loading_wrapper)
         self.main_lay.addWidget(self.page_set)
         self.setLayout(self.main_lay)
 
@@ -131,10 +145,24 @@ class MItemViewFullSet(QtWidgets.QWidget):
 
     @QtCore.Slot()
     def setup_data(self, data_list):
+        self.loading_wrapper.set_dayu_loading(False)
         self.source_model.clear()
         if data_list:
             self.source_model.set_data_list(data_list)
-        self.set_record_count(len(data_list))
+        self.set_record_count(self.source_model.rowCount())
+
+    def setup_data_async(self, loader, chunk_size=200):
+        """The record count is reset until the rows arrive, see item_view_set.setup_data_async."""
+        item_view_set.setup_data_async(self, loader, chunk_size)
+        self.set_record_count(0)
+
+    def update_data(self, data_list, key="id"):
+        """
+        Refresh the data by the primary key, only the changed rows and cells are updated,
+        the selection and scroll position are kept.
+        """
+        self.source_model.update_data_list(data_list or [], key=key)
+        self.set_record_count(self.source_model.rowCount())
 
     @QtCore.Slot(int)
     def set_record_count(self, total):
@@ -142,8 +170,3 @@ class MItemViewFullSet(QtWidgets.QWidget):
 
     def get_data(self):
         return self.source_model.get_data_list()
-
-    def searchable(self):
-        """Enable search line edit visible."""
-        self.search_line_edit.setVisible(True)
-        return self
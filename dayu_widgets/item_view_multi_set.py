@@ -4,6 +4,7 @@ from qtpy import QtCore
 from qtpy import QtWidgets
 
 from dayu_widgets import dayu_theme
+from dayu_widgets import item_view_set
 # Import local modules
 from dayu_widgets.button_group import MToolButtonGroup
 from dayu_widgets.combo_box import MComboBox
@@ -15,6 +16,7 @@ from dayu_widgets.item_view import MTableView
 from dayu_widgets.item_view import MTreeView
 from dayu_widgets.label import MLabel
 from dayu_widgets.line_edit import MLineEdit
+from dayu_widgets.loading import MLoadingWrapper
 from dayu_widgets.tool_button import MToolButton
 
 
@@ -26,6 +28,10 @@ class MItemViewMultiSet(QtWidgets.QWidget):
     sig_current_column_changed = QtCore.Signal(QtCore.QModelIndex, QtCore.QModelIndex)
     sig_selection_changed = QtCore.Signal(QtCore.QItemSelection, QtCore.QItemSelection)
     sig_context_menu = QtCore.Signal(object)
+    _slot_stop_loading = item_view_set._slot_stop_loading
+    _slot_search_text_changed = item_view_set._slot_search_text_changed
+    _slot_search_delay_text_changed = item_view_set._slot_search_delay_text_changed
+    searchable = item_view_set.searchable
 
     def __init__(self, table_view=True, big_view=False, tree_view=False, list_view=False,
                  show_row_count=False, view_size=None,
@@ -36,7 +42,12 @@ class MItemViewMultiSet(QtWidgets.QWidget):
         self.sort_filter_model = MSortFilterModel()
         self.source_model = MTableModel()
         self.sort_filter_model.setSourceModel(self.source_model)
+        self.source_model.sig_fetch_progress.connect(self._slot_stop_loading)
+        self.source_model.sig_fetch_finished.connect(self._slot_data_loaded)
+        self.source_model.sig_fetch_failed.connect(self._slot_data_load_failed)
         self.raw_data_list = []
+        # setup_data_async 开始的加载还没有结束
+        self._is_loading = False
         self._is_grouped = False
         self._pre_group_view_index = 0
 
@@ -106,7 +117,9 @@ class MItemViewMultiSet(QtWidgets.QWidget):
         self.search_line_edit = MLineEdit().search().small()
         self.search_attr_button = MToolButton().icon_only().svg("down_fill.svg").small()
         self.search_line_edit.set_prefix_widget(self.search_attr_button)
-        self.search_line_edit.textChanged.connect(self.sort_filter_model.set_search_pattern)
+        self.search_line_edit.textChanged.connect(self._slot_search_text_changed)
+        self.search_line_edit.sig_delay_text_changed.connect(self._slot_search_delay_text_changed)
+        self.sort_filter_model.sig_filter_progress.connect(self.search_line_edit.set_progress)
         self.search_line_edit.setVisible(False)
 
         self.top_lay.addStretch()
@@ -116,11 +129,13 @@ class MItemViewMultiSet(QtWidgets.QWidget):
         self.top_lay.addWidget(self.search_line_edit)
         self.tool_bar.setLayout(self.top_lay)
 
+        self.loading_wrapper = MLoadingWrapper(self.stack_widget, loading=False)
+
         self.main_lay = QtWidgets.QVBoxLayout()
         self.main_lay.setSpacing(5)
         self.main_lay.setContentsMargins(0, 0, 0, 0)
         self.main_lay.addWidget(self.tool_bar)
-        self.main_lay.addWidget(self.stack_widget)
+        self.main_lay.addWidget(self.loading_wrapper)
 
         self.setLayout(self.main_lay)
 
@@ -175,18 +190,47 @@ class MItemViewMultiSet(QtWidgets.QWidget):
 
     @QtCore.Slot()
     def setup_data(self, data_list):
+        self.loading_wrapper.set_dayu_loading(False)
+        self._is_loading = False
         self.raw_data_list = data_list
         self._apply_grouping()
 
+    def setup_data_async(self, loader, chunk_size=200):
+        """The grouping is applied when all the data is loaded, see item_view_set.setup_data_async."""
+        self.raw_data_list = []
+        self._is_loading = True
+        item_view_set.setup_data_async(self, loader, chunk_size)
+
+    @QtCore.Slot()
+    def _slot_data_loaded(self):
+        # 只处理 setup_data_async 开始的加载, 这时 source 中是还没有分组的原始数据
+        if not self._is_loading:
+            return
+        self._is_loading = False
+        self.loading_wrapper.set_dayu_loading(False)
+        self.raw_data_list = list(self.source_model.get_data_list())
+        if self._is_grouped:
+            self._apply_grouping()
+
+    @QtCore.Slot(object, str)
+    def _slot_data_load_failed(self, context, message):
+        # 子节点加载失败时 context 是它的父节点, 与根节点的数据无关
+        if context is None:
+            self._slot_data_loaded()
+
     def _flatten(self, data_list):
         out = []
         for x in data_list:
-            new_x = x.copy()
-            new_x.pop("_parent", None) # Clean up old parent reference to avoid crash
-            children = new_x.pop("children", [])
-            out.append(new_x)
-            if children:
+            children = x.get("children")
+            if isinstance(children, list) and children:
+                # Only the nodes with children are copied, to drop their children in the flat list.
+                # The lazy children are not loaded yet, they stay under their node
+                new_x = x.copy()
+                new_x.pop("children")
+                out.append(new_x)
                 out.extend(self._flatten(children))
+            else:
+                out.append(x)
         return out
 
     def _group_by(self, data_list, key):
@@ -271,11 +315,6 @@ class MItemViewMultiSet(QtWidgets.QWidget):
     def get_data(self):
         return self.source_model.get_data_list()
 
-    def searchable(self):
-        """Enable search line edit visible."""
-        self.search_line_edit.setVisible(True)
-        return self
-
     def groupable(self):
         """Enable group combo box visible."""
         self.group_label.setVisible(True)
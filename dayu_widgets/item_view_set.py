@@ -10,9 +10,57 @@ from dayu_widgets.item_view import MListView
 from dayu_widgets.item_view import MTableView
 from dayu_widgets.item_view import MTreeView
 from dayu_widgets.line_edit import MLineEdit
+from dayu_widgets.loading import MLoadingWrapper
 from dayu_widgets.tool_button import MToolButton
 
 
+# MItemViewSet, MItemViewFullSet 和 MItemViewMultiSet 共用的方法
+def setup_data_async(self, loader, chunk_size=200):
+    """
+    Load the data with loader in a worker thread, the rows are shown by chunks while loading.
+    The loading mask is shown until the first chunk arrives. A newer setup_data/setup_data_async cancels it.
+    :param loader: function without argument, it returns an iterable, a generator,
+                   a coroutine or an async iterable of the rows
+    :param chunk_size: how many rows are inserted at once
+    :return: None
+    """
+    self.loading_wrapper.set_dayu_loading(True)
+    self.source_model.set_data_loader(loader, chunk_size)
+
+
+@QtCore.Slot()
+def _slot_stop_loading(self, *args):
+    self.loading_wrapper.set_dayu_loading(False)
+
+
+@QtCore.Slot(str)
+def _slot_search_text_changed(self, text):
+    # 分片搜索时等输入停顿后再开始
+    if not self.sort_filter_model.filter_slice_msec:
+        self.sort_filter_model.set_search_pattern(text)
+
+
+@QtCore.Slot(str)
+def _slot_search_delay_text_changed(self, text):
+    if self.sort_filter_model.filter_slice_msec:
+        self.sort_filter_model.set_search_pattern(text)
+
+
+def searchable(self, fuzzy=False, top_k=500, time_slice=0):
+    """
+    Enable search line edit visible.
+    :param fuzzy: search like fzf, eg. "sh10cmp" finds "sh0100_comp_v012", the rows are sorted by the score
+    :param top_k: how many rows the fuzzy search shows at most
+    :param time_slice: milliseconds the search runs per event loop turn, eg. 8 for big models,
+                       the search starts after the typing pauses and the line edit shows its progress.
+                       0 to search all the rows at once on each key
+    """
+    self.sort_filter_model.set_fuzzy_search(fuzzy, top_k)
+    self.sort_filter_model.set_filter_time_slice(time_slice)
+    self.search_line_edit.setVisible(True)
+    return self
+
+
 class MItemViewSet(QtWidgets.QWidget):
     sig_double_clicked = QtCore.Signal(QtCore.QModelIndex)
     sig_left_clicked = QtCore.Signal(QtCore.QModelIndex)
@@ -20,6 +68,11 @@ class MItemViewSet(QtWidgets.QWidget):
     BigViewType = MBigView
     TreeViewType = MTreeView
     ListViewType = MListView
+    setup_data_async = setup_data_async
+    _slot_stop_loading = _slot_stop_loading
+    _slot_search_text_changed = _slot_search_text_changed
+    _slot_search_delay_text_changed = _slot_search_delay_text_changed
+    searchable = searchable
 
     def __init__(self, view_type=None, parent=None):
         super(MItemViewSet, self).__init__(parent)
@@ -30,6 +83,9 @@ class MItemViewSet(QtWidgets.QWidget):
         self.sort_filter_model = MSortFilterModel()
         self.source_model = MTableModel()
         self.sort_filter_model.setSourceModel(self.source_model)
+        self.source_model.sig_fetch_progress.connect(self._slot_stop_loading)
+        self.source_model.sig_fetch_finished.connect(self._slot_stop_loading)
+        self.source_model.sig_fetch_failed.connect(self._slot_stop_loading)
         view_class = view_type or MItemViewSet.TableViewType
         self.item_view = view_class()
         self.item_view.doubleClicked.connect(self.sig_double_clicked)
@@ -39,17 +95,25 @@ class MItemViewSet(QtWidgets.QWidget):
         self._search_line_edit = MLineEdit().search().small()
         self._search_attr_button = MToolButton().icon_only().svg("down_fill.svg").small()
         self._search_line_edit.set_prefix_widget(self._search_attr_button)
-        self._search_line_edit.textChanged.connect(self.sort_filter_model.set_search_pattern)
+        self._search_line_edit.textChanged.connect(self._slot_search_text_changed)
+        self._search_line_edit.sig_delay_text_changed.connect(self._slot_search_delay_text_changed)
+        self.sort_filter_model.sig_filter_progress.connect(self._search_line_edit.set_progress)
         self._search_line_edit.setVisible(False)
         self._search_lay = QtWidgets.QHBoxLayout()
         self._search_lay.setContentsMargins(0, 0, 0, 0)
         self._search_lay.addStretch()
         self._search_lay.addWidget(self._search_line_edit)
 
+        self.loading_wrapper = MLoadingWrapper(self.item_view, loading=False)
+
         self.main_lay.addLayout(self._search_lay)
-        self.main_lay.addWidget(self.item_view)
+        self.main_lay.addWidget(self.loading_wrapper)
         self.setLayout(self.main_lay)
 
+    @property
+    def search_line_edit(self):
+        return self._search_line_edit
+
     @QtCore.Slot(QtCore.QModelIndex)
     def slot_left_clicked(self, start_index):
         button = QtWidgets.QApplication.mouseButtons()
@@ -66,18 +130,21 @@ class MItemViewSet(QtWidgets.QWidget):
 
     @QtCore.Slot()
     def setup_data(self, data_list):
+        self.loading_wrapper.set_dayu_loading(False)
         self.source_model.clear()
         if data_list:
             self.source_model.set_data_list(data_list)
 
+    def update_data(self, data_list, key="id"):
+        """
+        Refresh the data by the primary key, only the changed rows and cells are updated,
+        the selection and scroll position are kept.
+        """
+        self.source_model.update_data_list(data_list or [], key=key)
+
     def get_data(self):
         return self.source_model.get_data_list()
 
-    def searchable(self):
-        """Enable search line edit visible."""
-        self._search_line_edit.setVisible(True)
-        return self
-
     def insert_widget(self, widget):
         """Use can insert extra widget into search layout."""
         self._search_lay.insertWidget(0, widget)
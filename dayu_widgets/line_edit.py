@@ -7,6 +7,7 @@ import functools
 
 # Import third-party modules
 from qtpy import QtCore
+from qtpy import QtGui
 from qtpy import QtWidgets
 
 # Import local modules
@@ -44,6 +45,8 @@ class MLineEdit(QtWidgets.QLineEdit):
         self._delay_timer.timeout.connect(self._slot_delay_text_changed)
         self.textChanged.connect(self._slot_begin_to_start_delay)
         self._dayu_size = dayu_theme.default_size
+        # 底部进度条的百分比, -1 表示不显示
+        self._progress = -1
 
     def get_dayu_size(self):
         """
@@ -71,6 +74,29 @@ class MLineEdit(QtWidgets.QLineEdit):
         """Set delay timer's timeout duration."""
         self._delay_timer.setInterval(millisecond)
 
+    @QtCore.Slot(int)
+    def set_progress(self, value):
+        """
+        Show a thin progress bar at the bottom of the line edit, eg. the progress of a search.
+        :param value: integer, percent from 0 to 100, the bar is hidden at 100 or below 0
+        :return: None
+        """
+        self._progress = value if 0 <= value < 100 else -1
+        self.update()
+
+    def paintEvent(self, event):
+        """Override paintEvent to draw the progress bar"""
+        super(MLineEdit, self).paintEvent(event)
+        if self._progress < 0:
+            return
+        painter = QtGui.QPainter(self)
+        rect = self.rect()
+        painter.fillRect(
+            QtCore.QRect(rect.left(), rect.bottom() - 1, rect.width() * self._progress // 100, 2),
+            QtGui.QColor(dayu_theme.primary_color),
+        )
+        painter.end()
+
     @QtCore.Slot()
     def _slot_delay_text_changed(self):
         self.sig_delay_text_changed.emit(self.text())
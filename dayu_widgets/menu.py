@@ -24,7 +24,8 @@ class CompatStyle(QtWidgets.QProxyStyle):
     """PySide2 PySide6"""
 
     def __init__(self, style=None):
-        super(CompatStyle, self).__init__(style)
+        # QProxyStyle 会接管传入的 style, 销毁时会把 QApplication 的 style 一起删掉, 所以这里不传给父类
+        super(CompatStyle, self).__init__()
         self.style = style
 
     @property
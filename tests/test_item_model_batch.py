@@ -0,0 +1,192 @@
+"""
+Test MTableModel.batch coalescing dataChanged.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+from qtpy import QtGui
+from qtpy import QtWidgets
+
+# Import local modules
+from dayu_widgets.header_view import MHeaderView
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True},
+    {"label": "Age", "key": "age"},
+    {"label": "Score", "key": "score"},
+]
+
+
+def _make_data_list(count):
+    return [{"name": "n{}".format(i), "age": i, "score": i * 10} for i in range(count)]
+
+
+def _get_rect(top_left, bottom_right):
+    return top_left.row(), bottom_right.row(), top_left.column(), bottom_right.column()
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list(10))
+    return result
+
+
+@pytest.fixture
+def changed_list(model):
+    result = []
+    model.dataChanged.connect(
+        lambda top_left, bottom_right, role_list=(): result.append(
+            (_get_rect(top_left, bottom_right), [int(getattr(role, "value", role)) for role in role_list])
+        )
+    )
+    return result
+
+
+def test_without_batch(model, changed_list):
+    """Each setData emits its own dataChanged."""
+    for row in range(3):
+        model.setData(model.index(row, 1), 0)
+    assert [rect for rect, _ in changed_list] == [(0, 0, 1, 1), (1, 1, 1, 1), (2, 2, 1, 1)]
+
+
+def test_batch_rectangles(model, changed_list):
+    """The cells are merged into the fewest rectangles on exit."""
+    with model.batch():
+        for row in range(2, 6):
+            model.setData(model.index(row, 1), 0)
+            model.setData(model.index(row, 2), 0)
+        model.setData(model.index(8, 0), "x")
+        model.setData(model.index(8, 2), "x")
+        # 批量中 data() 已经是新值
+        assert model.index(2, 1).data() == 0
+        assert changed_list == []
+    assert changed_list == [((2, 5, 1, 2), []), ((8, 8, 0, 0), []), ((8, 8, 2, 2), [])]
+
+
+def test_batch_roles(model, changed_list):
+    """The check state changes only carry CheckStateRole, the roles of a cell are merged."""
+    check_role = int(getattr(QtCore.Qt.CheckStateRole, "value", QtCore.Qt.CheckStateRole))
+    with model.batch():
+        for row in range(4):
+            model.setData(model.index(row, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+        model.setData(model.index(3, 0), "x")
+    assert changed_list == [((0, 2, 0, 0), [check_role]), ((3, 3, 0, 0), [])]
+
+
+def test_nested_batch(model, changed_list):
+    """Only the outermost batch emits."""
+    with model.batch():
+        with model.batch():
+            model.setData(model.index(0, 1), 0)
+        assert changed_list == []
+        model.setData(model.index(1, 1), 0)
+    assert changed_list == [((0, 1, 1, 1), [])]
+
+
+def test_batch_flush_before_row_changes(model, changed_list):
+    """The pending cells are emitted with their old row numbers before the rows change."""
+    with model.batch():
+        model.setData(model.index(5, 1), 0)
+        model.remove_rows([0, 1])
+        assert changed_list == [((5, 5, 1, 1), [])]
+        model.setData(model.index(3, 1), 1)
+    assert changed_list == [((5, 5, 1, 1), []), ((3, 3, 1, 1), [])]
+
+
+def test_batch_dropped_on_reset(model, changed_list):
+    """A reset in the batch drops the pending cells."""
+    with model.batch():
+        model.setData(model.index(5, 1), 0)
+        model.set_data_list(_make_data_list(2))
+    assert changed_list == []
+
+
+def test_batch_tree(qapp):
+    """The cells of each parent are merged separately, the check propagation is one batch."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "a", "children": _make_data_list(3)},
+            {"name": "b", "children": _make_data_list(3)},
+        ]
+    )
+    changed_list = []
+    model.dataChanged.connect(
+        lambda top_left, bottom_right, role_list=(): changed_list.append(
+            (top_left.parent().row(), _get_rect(top_left, bottom_right))
+        )
+    )
+    with model.batch():
+        for row in range(2):
+            parent_index = model.index(row, 0)
+            model.setData(model.index(0, 1, parent_index), 0)
+            model.setData(model.index(1, 1, parent_index), 0)
+    assert sorted(changed_list) == [(0, (0, 1, 1, 1)), (1, (0, 1, 1, 1))]
+    del changed_list[:]
+    model.setData(model.index(0, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    assert sorted(changed_list) == [(-1, (0, 0, 0, 0)), (0, (0, 2, 0, 0))]
+
+
+def test_header_select_all(qtbot):
+    """The header Select All/Invert updates the check states without resetting the model."""
+    source_model = MTableModel()
+    source_model.set_header_list(HEADER_LIST)
+    source_model.set_data_list(_make_data_list(5))
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(source_model)
+    view = QtWidgets.QTableView()
+    qtbot.addWidget(view)
+    view.setModel(proxy_model)
+    header_view = MHeaderView(QtCore.Qt.Horizontal)
+    view.setHorizontalHeader(header_view)
+
+    reset_list = []
+    changed_list = []
+    source_model.modelReset.connect(lambda: reset_list.append(True))
+    source_model.dataChanged.connect(lambda *args: changed_list.append(_get_rect(args[0], args[1])))
+    header_view._slot_set_select(0, QtCore.Qt.Checked)
+    assert reset_list == []
+    assert changed_list == [(0, 4, 0, 0)]
+    assert all(data_dict["name_checked"] == QtCore.Qt.Checked for data_dict in source_model.get_data_list())
+
+    source_model.setData(source_model.index(1, 0), QtCore.Qt.Unchecked, QtCore.Qt.CheckStateRole)
+    header_view._slot_set_select(0, None)
+    assert [data_dict["name_checked"] for data_dict in source_model.get_data_list()] == [
+        QtCore.Qt.Unchecked,
+        QtCore.Qt.Checked,
+        QtCore.Qt.Unchecked,
+        QtCore.Qt.Unchecked,
+        QtCore.Qt.Unchecked,
+    ]
+
+
+def test_header_select_plain_model(qtbot):
+    """The header Select All/Invert also works on a source model without batch."""
+    source_model = QtGui.QStandardItemModel(3, 1)
+    for row in range(3):
+        item = QtGui.QStandardItem(str(row))
+        item.setCheckable(True)
+        source_model.setItem(row, 0, item)
+    source_model.setData(source_model.index(1, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    view = QtWidgets.QTableView()
+    qtbot.addWidget(view)
+    view.setModel(source_model)
+    header_view = MHeaderView(QtCore.Qt.Horizontal)
+    view.setHorizontalHeader(header_view)
+    header_view._slot_set_select(0, None)
+    assert [source_model.item(row).checkState() for row in range(3)] == [
+        QtCore.Qt.Checked,
+        QtCore.Qt.Unchecked,
+        QtCore.Qt.Checked,
+    ]
+    header_view._slot_set_select(0, QtCore.Qt.Unchecked)
+    assert all(source_model.item(row).checkState() == QtCore.Qt.Unchecked for row in range(3))
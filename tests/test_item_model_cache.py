@@ -0,0 +1,102 @@
+"""
+Test MTableModel data cache.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MTableModel
+
+
+@pytest.fixture
+def call_list():
+    return []
+
+
+@pytest.fixture
+def header_list(call_list):
+    def _display(value, data_obj):
+        call_list.append(value)
+        return "<{}>".format(value)
+
+    return [{"label": "Name", "key": "name", "display": _display}]
+
+
+@pytest.fixture
+def model(qapp, header_list):
+    result = MTableModel()
+    result.set_header_list(header_list)
+    result.set_data_cache(2)
+    result.set_data_list([{"name": "a"}, {"name": "b"}, {"name": "c"}])
+    return result
+
+
+def test_cache_disabled_by_default(qapp, header_list, call_list):
+    """Without cache every data() call runs the formatter."""
+    model = MTableModel()
+    model.set_header_list(header_list)
+    model.set_data_list([{"name": "a"}])
+    model.index(0, 0).data()
+    model.index(0, 0).data()
+    assert call_list == ["a", "a"]
+    assert model.get_data_cache_info()["hits"] == 0
+
+
+def test_cache_hit_and_miss(model, call_list):
+    """The second call of the same cell and role is a hit."""
+    assert model.index(0, 0).data() == "<a>"
+    assert model.index(0, 0).data() == "<a>"
+    assert model.index(0, 0).data(QtCore.Qt.ToolTipRole) == "a"
+    assert call_list == ["a"]
+    assert model.get_data_cache_info() == {"hits": 1, "misses": 2, "rows": 1, "max_rows": 2}
+
+
+def test_cache_lru(model, call_list):
+    """The least recently used row is dropped when the cache is full."""
+    for row in (0, 1, 0, 2, 0, 1):
+        model.index(row, 0).data()
+    assert call_list == ["a", "b", "c", "b"]
+    assert model.get_data_cache_info()["rows"] == 2
+
+
+def test_cache_invalidate_set_data(model):
+    """setData drops the cached row."""
+    model.index(0, 0).data()
+    model.setData(model.index(0, 0), "x")
+    assert model.index(0, 0).data() == "<x>"
+
+
+def test_cache_invalidate_rows(model):
+    """Rows changed outside the model are refreshed with invalidate_rows."""
+    data_obj = model.get_data_list()[1]
+    model.index(1, 0).data()
+    data_obj["name"] = "y"
+    assert model.index(1, 0).data() == "<b>"
+    model.invalidate_rows([data_obj])
+    assert model.index(1, 0).data() == "<y>"
+
+
+def test_cache_invalidate_data_list(model):
+    """set_data_list, append and remove keep the cache consistent."""
+    model.index(0, 0).data()
+    model.set_data_list([{"name": "d"}])
+    assert model.get_data_cache_info()["rows"] == 0
+    assert model.index(0, 0).data() == "<d>"
+    model.append({"name": "e"})
+    assert model.index(1, 0).data() == "<e>"
+    model.remove(model.get_data_list()[0])
+    assert model.index(0, 0).data() == "<e>"
+
+
+def test_cache_column_model(qapp, header_list):
+    """The column model caches by row number and drops all on remove."""
+    model = MColumnTableModel()
+    model.set_header_list(header_list)
+    model.set_data_cache(10)
+    model.set_data_list([{"name": "a"}, {"name": "b"}])
+    assert model.index(0, 0).data() == "<a>"
+    model.remove(model.get_data_list()[0])
+    assert model.index(0, 0).data() == "<b>"
@@ -0,0 +1,108 @@
+"""
+Test MTableModel tri-state check propagation.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [{"label": "Name", "key": "name", "checkable": True}]
+
+
+def _make_tree(width_list, prefix="n"):
+    if not width_list:
+        return []
+    return [
+        {"name": "{}{}".format(prefix, i), "children": _make_tree(width_list[1:], "{}{}_".format(prefix, i))}
+        for i in range(width_list[0])
+    ]
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_tree([2, 2, 3]))
+    return result
+
+
+def _state(index):
+    return index.data(QtCore.Qt.CheckStateRole)
+
+
+def _check(model, index, state=QtCore.Qt.Checked):
+    assert model.setData(index, state, QtCore.Qt.CheckStateRole)
+
+
+def test_check_leaf_propagates_to_all_ancestors(model):
+    """A checked leaf makes every ancestor partially checked, at any depth."""
+    root_index = model.index(0, 0)
+    branch_index = model.index(1, 0, root_index)
+    _check(model, model.index(2, 0, branch_index))
+    assert _state(branch_index) == QtCore.Qt.PartiallyChecked
+    assert _state(root_index) == QtCore.Qt.PartiallyChecked
+    assert _state(model.index(1, 0)) == QtCore.Qt.Unchecked
+
+    for row in range(2):
+        _check(model, model.index(row, 0, branch_index))
+    assert _state(branch_index) == QtCore.Qt.Checked
+    assert _state(root_index) == QtCore.Qt.PartiallyChecked
+
+    _check(model, model.index(0, 0, branch_index), QtCore.Qt.Unchecked)
+    assert _state(branch_index) == QtCore.Qt.PartiallyChecked
+    for row in (1, 2):
+        _check(model, model.index(row, 0, branch_index), QtCore.Qt.Unchecked)
+    assert _state(branch_index) == QtCore.Qt.Unchecked
+    assert _state(root_index) == QtCore.Qt.Unchecked
+
+
+def test_check_root_propagates_to_all_descendants(model):
+    """Checking a node checks its whole subtree, with one dataChanged per parent."""
+    changed_list = []
+    model.dataChanged.connect(lambda top_left, bottom_right, *args: changed_list.append((top_left, bottom_right)))
+    root_index = model.index(0, 0)
+    _check(model, root_index)
+    # root 自己 + root 的 children + 2 个 branch 的 children
+    assert len(changed_list) == 4
+    for branch_row in range(2):
+        branch_index = model.index(branch_row, 0, root_index)
+        assert _state(branch_index) == QtCore.Qt.Checked
+        assert all(_state(model.index(row, 0, branch_index)) == QtCore.Qt.Checked for row in range(3))
+
+    leaf_index = model.index(0, 0, model.index(0, 0, root_index))
+    _check(model, leaf_index, QtCore.Qt.Unchecked)
+    assert _state(model.index(0, 0, root_index)) == QtCore.Qt.PartiallyChecked
+    assert _state(root_index) == QtCore.Qt.PartiallyChecked
+    _check(model, leaf_index)
+    assert _state(root_index) == QtCore.Qt.Checked
+
+
+def test_check_counts_follow_row_changes(model):
+    """Inserted and removed rows are counted again."""
+    root_index = model.index(0, 0)
+    branch_index = model.index(0, 0, root_index)
+    _check(model, model.index(0, 0, branch_index))
+    model.remove_rows([1, 2], branch_index)
+    _check(model, model.index(0, 0, branch_index), QtCore.Qt.Unchecked)
+    _check(model, model.index(0, 0, branch_index))
+    assert _state(branch_index) == QtCore.Qt.Checked
+    model.insert_rows(1, [{"name": "new"}], branch_index)
+    _check(model, model.index(1, 0, branch_index), QtCore.Qt.Unchecked)
+    assert _state(branch_index) == QtCore.Qt.PartiallyChecked
+
+
+def test_check_many_children(qapp):
+    """Checking a parent of many children emits a single ranged dataChanged for them."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(_make_tree([1, 20000]))
+    changed_list = []
+    model.dataChanged.connect(lambda top_left, bottom_right, *args: changed_list.append(bottom_right.row()))
+    _check(model, model.index(0, 0))
+    assert changed_list == [0, 19999]
+    _check(model, model.index(19999, 0, model.index(0, 0)), QtCore.Qt.Unchecked)
+    assert _state(model.index(0, 0)) == QtCore.Qt.PartiallyChecked
@@ -0,0 +1,148 @@
+"""
+Test MColumnTableModel column oriented storage.
+"""
+
+# Import built-in modules
+import array
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True, "searchable": True},
+    {"label": "Frames", "key": "frames", "editable": True},
+    {"label": "Size", "key": "size", "display": lambda x, y: "{} ({})".format(x, y.get("name"))},
+]
+
+DATA_LIST = [
+    {"name": "b", "frames": 20, "size": 1.5},
+    {"name": "a", "frames": 100, "size": 0.5},
+    {"name": "c", "frames": 3, "size": 2.5},
+]
+
+
+@pytest.fixture
+def model(qapp):
+    result = MColumnTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list([dict(data_dict) for data_dict in DATA_LIST])
+    return result
+
+
+def test_column_types(model):
+    """Numeric columns are packed into typed arrays, others stay list."""
+    assert isinstance(model.get_column("frames"), array.array)
+    assert model.get_column("frames").typecode == "q"
+    assert model.get_column("size").typecode == "d"
+    assert model.get_column("name") == ["b", "a", "c"]
+    assert model.rowCount() == 3
+    assert len(model.get_data_list()) == 3
+
+
+def test_data_and_formatter(model):
+    """Header formatters receive a row object supporting dict style access."""
+    assert model.index(0, 0).data() == "b"
+    assert model.index(1, 1).data() == 100
+    assert model.index(2, 2).data() == "2.5 (c)"
+    assert model.index(0, 0).data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Unchecked
+    assert not model.index(0, 0).parent().isValid()
+    assert model.rowCount(model.index(0, 0)) == 0
+
+
+def test_set_data(model):
+    """setData writes into the columns, and degrades the array when the type changes."""
+    assert model.setData(model.index(0, 1), 42)
+    assert model.get_value(0, "frames") == 42
+    assert model.setData(model.index(0, 1), "many")
+    assert model.get_column("frames") == ["many", 100, 3]
+    model.setData(model.index(1, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    assert model.index(1, 0).data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Checked
+
+
+def test_set_column_data(qapp):
+    """Columns can be given directly, with the same length."""
+    model = MColumnTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_column_data({"name": ["x", "y"], "frames": [1, 2], "size": [0.1, 0.2]})
+    assert model.rowCount() == 2
+    assert model.get_data_list()[1].to_dict() == {"name": "y", "frames": 2, "size": 0.2}
+    with pytest.raises(ValueError):
+        model.set_column_data({"name": ["x"], "frames": [1, 2]})
+
+
+def test_append_and_remove(model):
+    """Append and remove rows keep every column aligned."""
+    model.append({"name": "d", "frames": 7, "size": 1.0})
+    assert model.rowCount() == 4
+    assert model.get_value(3, "frames") == 7
+    model.remove(model.get_data_list()[0])
+    assert model.get_column("name") == ["a", "c", "d"]
+    assert list(model.get_column("frames")) == [100, 3, 7]
+    with pytest.raises(ValueError):
+        model.remove({"name": "a"})
+
+
+@pytest.mark.parametrize("order, result", ((QtCore.Qt.AscendingOrder, [3, 20, 100]), (QtCore.Qt.DescendingOrder, [100, 20, 3])))
+def test_sort(model, order, result):
+    """Sort in the model itself and through MSortFilterModel with the raw values."""
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    proxy_model.sort(1, order)
+    assert [proxy_model.index(row, 1).data() for row in range(3)] == result
+
+    model.sort(1, order)
+    assert list(model.get_column("frames")) == result
+
+
+def test_generator(qapp):
+    """Rows from a generator are appended into the columns by chunk."""
+    model = MColumnTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_fetch_chunk_size(2)
+    model.set_data_list(dict(data_dict) for data_dict in DATA_LIST)
+    while model.canFetchMore(QtCore.QModelIndex()):
+        model.fetchMore(QtCore.QModelIndex())
+    assert model.rowCount() == 3
+    assert model.get_column("frames").typecode == "q"
+    assert list(model.get_column("frames")) == [20, 100, 3]
+
+
+def test_extra_fields(qapp):
+    """The fields of the dict rows that are not in the header stay readable by the formatters."""
+    header_list = [
+        {"label": "Name", "key": "name", "display": lambda x, y: "{}/{}".format(y["path"], x)},
+        {"label": "Frames", "key": "frames", "display": lambda x, y: "{}{}".format(x, y.get("unit", ""))},
+    ]
+    model = MColumnTableModel()
+    model.set_header_list(header_list)
+    model.set_data_list([{"name": "a", "path": "/a", "frames": 1}, {"name": "b", "path": "/b", "frames": 2}])
+    assert model.index(1, 0).data() == "/b/b"
+    assert model.index(1, 1).data() == "2"
+    assert model.get_data_list()[0].to_dict() == {"name": "a", "path": "/a", "frames": 1}
+
+    model.append({"name": "c", "path": "/c", "frames": 3, "unit": "f"})
+    assert model.index(2, 0).data() == "/c/c"
+    assert model.index(2, 1).data() == "3f"
+    assert model.get_column("unit") == [None, None, "f"]
+
+
+def test_set_value_type(model):
+    """A bool or an int does not fit an int or float array, the column degrades to a list to keep the value."""
+    assert model.setData(model.index(0, 1), True)
+    assert model.get_column("frames") == [True, 100, 3]
+    assert model.get_value(0, "frames") is True
+    model.set_value(0, "size", 2)
+    assert model.get_column("size") == [2, 0.5, 2.5]
+    assert type(model.get_value(0, "size")) is int
+
+    model.set_data_list([dict(data_dict) for data_dict in DATA_LIST])
+    model.append({"name": "d", "frames": False, "size": 1.0})
+    assert model.get_column("frames") == [20, 100, 3, False]
+    assert model.get_column("size").typecode == "d"
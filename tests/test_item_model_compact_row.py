@@ -0,0 +1,117 @@
+"""
+Test the compact row class made by make_row_class.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model import make_row_class
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True},
+    {"label": "Age", "key": "age", "display": lambda x, y: "{} years".format(x)},
+    {"label": "Score", "key": "score", "color": lambda x, y: "#ff0000" if x and x < 60 else None},
+]
+
+
+def test_make_row_class():
+    """The fields come from header_list, checkable columns and extra keys."""
+    row_class = make_row_class(HEADER_LIST, name="Person", extra_key_list=["children", "age"])
+    assert row_class.__name__ == "Person"
+    assert row_class.__slots__ == ("name", "name_checked", "age", "score", "children")
+    row = row_class("ann", age=20)
+    assert not hasattr(row, "__dict__")
+    assert (row.name, row["age"], row.score, row.get("score", 0), row.get("other", 1)) == ("ann", 20, None, None, 1)
+    row["score"] = 90
+    assert row.to_dict() == {"name": "ann", "name_checked": None, "age": 20, "score": 90, "children": None}
+    assert "score" in row and "other" not in row
+    with pytest.raises(KeyError):
+        row["other"] = 1
+    with pytest.raises(AttributeError):
+        row.other = 1
+    assert repr(make_row_class(["a"])(1)) == "Row(a=1)"
+
+
+@pytest.mark.parametrize("key", ("a b", "class", "__init__", None))
+def test_make_row_class_invalid_key(key):
+    with pytest.raises(ValueError):
+        make_row_class(["name", key])
+
+
+def test_from_dict_list():
+    """The dicts are converted with their children, the extra keys are ignored."""
+    data_list = [{"name": "a", "age": 1, "other": 2, "children": [{"name": "b"}]}, {"name": "c"}]
+    row_list = make_row_class(HEADER_LIST).from_dict_list(data_list)
+    assert [row.to_dict() for row in row_list] == [
+        {"name": "a", "name_checked": None, "age": 1, "score": None},
+        {"name": "c", "name_checked": None, "age": None, "score": None},
+    ]
+    tree_row_list = make_row_class(HEADER_LIST, extra_key_list=["children"]).from_dict_list(data_list)
+    assert tree_row_list[0].children[0].name == "b"
+    assert tree_row_list[1].children is None
+
+
+@pytest.mark.parametrize("row_class", (None, make_row_class(HEADER_LIST, extra_key_list=["children"])))
+def test_model_with_compact_rows(qapp, row_class):
+    """The compact rows give the same data as the dict rows, with or without set_row_class."""
+    data_list = [{"name": "ann", "age": 20, "score": 50}, {"name": "bob", "age": 10, "score": 90}]
+    dict_model = MTableModel()
+    dict_model.set_header_list(HEADER_LIST)
+    dict_model.set_data_list(data_list)
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_row_class(row_class)
+    model.set_data_list(make_row_class(HEADER_LIST, extra_key_list=["children"]).from_dict_list(data_list))
+    for row in range(2):
+        for column in range(3):
+            for role in (QtCore.Qt.DisplayRole, QtCore.Qt.ForegroundRole, QtCore.Qt.CheckStateRole):
+                assert model.index(row, column).data(role) == dict_model.index(row, column).data(role)
+
+    model.setData(model.index(0, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    model.setData(model.index(1, 1), 11)
+    assert model.index(0, 0).data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Checked
+    assert model.index(1, 1).data() == "11 years"
+
+
+def test_model_mixed_rows(qapp):
+    """The rows which are not of row_class, eg. the group rows, still work."""
+    row_class = make_row_class(HEADER_LIST, extra_key_list=["children"])
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_row_class(row_class)
+    model.set_data_list(
+        [{"name": "group", "_is_group": True, "children": [row_class("ann", age=20)]}, {"name": "dict", "age": 3}]
+    )
+    assert model.index(0, 0).data() == "group"
+    assert model.index(0, 1).data() == ""
+    assert model.index(1, 1).data() == "3 years"
+    assert model.index(0, 1, model.index(0, 0)).data() == "20 years"
+
+
+def test_update_compact_rows(qapp):
+    """update_data_list reads the fields of the compact rows."""
+    row_class = make_row_class(["id", "name"])
+    model = MTableModel()
+    model.set_header_list([{"label": "Name", "key": "name"}])
+    model.set_row_class(row_class)
+    model.set_data_list([row_class(1, "a"), row_class(2, "b")])
+    old_row = model.get_data_list()[1]
+    model.update_data_list([row_class(2, "x"), row_class(3, "c")])
+    assert model.get_data_list()[0] is old_row
+    assert [row.name for row in model.get_data_list()] == ["x", "c"]
+
+
+def test_row_class_arguments():
+    row_class = make_row_class(["name", "age"])
+    assert row_class("ann", age=20).to_dict() == {"name": "ann", "age": 20}
+    assert row_class().to_dict() == {"name": None, "age": None}
+    with pytest.raises(TypeError):
+        row_class("ann", 20, 1)
+    with pytest.raises(TypeError):
+        row_class("ann", name="bob")
+    with pytest.raises(TypeError):
+        row_class(other=1)
@@ -0,0 +1,83 @@
+"""
+Test MTableModel streaming rows from a data generator.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}]
+
+
+def _row_generator(count):
+    for i in range(count):
+        yield {"name": "row_{}".format(i)}
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    return result
+
+
+def test_generator_is_fetched_by_chunk(model):
+    """Each fetchMore inserts one chunk with a single insert signal, without reset."""
+    inserted = []
+    resets = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.modelReset.connect(lambda: resets.append(True))
+    model.set_fetch_chunk_size(10)
+    model.set_data_list(_row_generator(25))
+    resets.clear()
+
+    assert model.rowCount() == 0
+    assert model.canFetchMore(QtCore.QModelIndex())
+    model.fetchMore(QtCore.QModelIndex())
+    assert model.rowCount() == 10
+    model.fetchMore(QtCore.QModelIndex())
+    model.fetchMore(QtCore.QModelIndex())
+    assert model.rowCount() == 25
+    assert inserted == [(0, 9), (10, 19), (20, 24)]
+    assert not resets
+    assert not model.canFetchMore(QtCore.QModelIndex())
+    assert model.index(24, 0).data() == "row_24"
+
+
+def test_generator_progress_and_finished_signals(model):
+    """Progress reports the loaded row count and finished is emitted once."""
+    progress = []
+    finished = []
+    model.sig_fetch_progress.connect(progress.append)
+    model.sig_fetch_finished.connect(lambda: finished.append(True))
+    model.set_fetch_chunk_size(5)
+    model.set_data_list(_row_generator(10))
+    while model.canFetchMore(QtCore.QModelIndex()):
+        model.fetchMore(QtCore.QModelIndex())
+
+    assert progress == [5, 10]
+    assert finished == [True]
+
+
+def test_generator_auto_fetch(qtbot, model):
+    """Auto fetch fills the model in background."""
+    model.set_fetch_chunk_size(50)
+    model.set_auto_fetch(True)
+    with qtbot.waitSignal(model.sig_fetch_finished, timeout=2000):
+        model.set_data_list(_row_generator(500))
+    assert model.rowCount() == 500
+    assert not model.timer.isActive()
+
+
+def test_append_inserts_row(model):
+    """Append announce the new row with rowsInserted."""
+    model.set_data_list([{"name": "a"}])
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.append({"name": "b"})
+    assert inserted == [(1, 1)]
+    assert model.rowCount() == 2
@@ -0,0 +1,142 @@
+"""
+Test the fuzzy search of MSortFilterModel and the item view sets.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model import fuzzy_match_score
+from dayu_widgets.item_view import MTableView
+from dayu_widgets.item_view_full_set import MItemViewFullSet
+from dayu_widgets.item_view_multi_set import MItemViewMultiSet
+from dayu_widgets.item_view_set import MItemViewSet
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status"},
+]
+NAME_LIST = ["sh0100_lgt_v001", "sh0100_comp_v012", "s_h_x", "sh0200_comp_v003", "shot10_cmp", "prop_chair"]
+
+
+def _name_list(proxy_model):
+    return [proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list([{"name": name, "status": "done" if i % 2 else "wait"} for i, name in enumerate(NAME_LIST)])
+    return result
+
+
+@pytest.fixture
+def proxy_model(model):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    result.set_fuzzy_search(True)
+    return result
+
+
+def test_fuzzy_match_score():
+    assert fuzzy_match_score("sh10cmp", "prop_chair") is None
+    assert fuzzy_match_score("cmp", "cmp") > fuzzy_match_score("cmp", "comp")
+    assert fuzzy_match_score("comp", "sh_comp") > fuzzy_match_score("comp", "shcomp")
+    # 使用最短的匹配区间
+    assert fuzzy_match_score("ab", "a____ab") == fuzzy_match_score("ab", "ab")
+
+
+def test_fuzzy_search(proxy_model):
+    """The matched rows are sorted by the score, and the previous sort comes back when the pattern is cleared."""
+    proxy_model.sort(1, QtCore.Qt.AscendingOrder)
+    proxy_model.set_search_pattern("SH10cmp")
+    assert _name_list(proxy_model) == ["shot10_cmp", "sh0100_comp_v012"]
+    proxy_model.set_search_pattern("comp")
+    assert _name_list(proxy_model) == ["sh0100_comp_v012", "sh0200_comp_v003"]
+    proxy_model.set_filter_attr_pattern("status", "wait")
+    proxy_model.set_search_pattern("sh0")
+    assert _name_list(proxy_model) == ["sh0100_lgt_v001", "shot10_cmp"]
+    proxy_model.set_filter_attr_pattern("status", "")
+    proxy_model.set_search_pattern("")
+    assert proxy_model.sortColumn() == 1
+    assert _name_list(proxy_model)[:3] == ["sh0100_comp_v012", "sh0200_comp_v003", "prop_chair"]
+
+
+def test_fuzzy_top_k(proxy_model, model):
+    """Only the best top_k rows are shown, a header sort replaces the ranking."""
+    proxy_model.set_fuzzy_search(True, top_k=2)
+    proxy_model.set_search_pattern("sh")
+    assert proxy_model.rowCount() == 2
+    proxy_model.set_fuzzy_search(True, top_k=10)
+    proxy_model.set_search_pattern("sh")
+    assert proxy_model.rowCount() == 5
+    proxy_model.sort(0, QtCore.Qt.AscendingOrder)
+    assert _name_list(proxy_model) == sorted(NAME_LIST[:5])
+    # 新的行按普通的子序列匹配
+    model.append({"name": "xshx"})
+    assert "xshx" in _name_list(proxy_model)
+    proxy_model.set_fuzzy_search(False)
+    proxy_model.set_search_pattern("s_h")
+    assert _name_list(proxy_model) == ["s_h_x"]
+
+
+def test_fuzzy_ranking_keeps_sort(proxy_model):
+    """The ranking does not change the sorted column, a header sort during the search stops the ranking."""
+    ranking_list = []
+    proxy_model.sig_fuzzy_ranking_changed.connect(ranking_list.append)
+    proxy_model.sort(1, QtCore.Qt.DescendingOrder)
+    proxy_model.set_search_pattern("sh10cmp")
+    assert _name_list(proxy_model) == ["shot10_cmp", "sh0100_comp_v012"]
+    assert (proxy_model.sortColumn(), proxy_model.sortOrder()) == (1, QtCore.Qt.DescendingOrder)
+    proxy_model.set_search_pattern("sh10c")
+    assert ranking_list == [True]
+    proxy_model.sort(0, QtCore.Qt.AscendingOrder)
+    assert ranking_list == [True, False]
+    # 继续输入时保持用户的排序
+    proxy_model.set_search_pattern("sh10cmp")
+    assert _name_list(proxy_model) == ["sh0100_comp_v012", "shot10_cmp"]
+    assert (proxy_model.sortColumn(), proxy_model.sortOrder()) == (0, QtCore.Qt.AscendingOrder)
+    proxy_model.set_search_pattern("")
+    proxy_model.set_search_pattern("sh10cmp")
+    assert _name_list(proxy_model) == ["shot10_cmp", "sh0100_comp_v012"]
+    assert ranking_list == [True, False, True]
+
+
+def test_fuzzy_ranking_sort_indicator(qtbot, proxy_model):
+    view = MTableView()
+    qtbot.addWidget(view)
+    view.setModel(proxy_model)
+    view.sortByColumn(1, QtCore.Qt.AscendingOrder)
+    proxy_model.set_search_pattern("sh10cmp")
+    assert not view.header_view.isSortIndicatorShown()
+    proxy_model.set_search_pattern("")
+    assert view.header_view.isSortIndicatorShown()
+    assert view.header_view.sortIndicatorSection() == proxy_model.sortColumn() == 1
+    proxy_model.set_search_pattern("sh10cmp")
+    # 搜索时点击表头, 按该列排序并重新显示排序箭头
+    view.header_view.setSortIndicator(0, QtCore.Qt.DescendingOrder)
+    assert view.header_view.isSortIndicatorShown()
+    assert _name_list(proxy_model) == ["shot10_cmp", "sh0100_comp_v012"]
+    assert (proxy_model.sortColumn(), proxy_model.sortOrder()) == (0, QtCore.Qt.DescendingOrder)
+
+
+@pytest.fixture(params=(MItemViewSet, MItemViewFullSet, MItemViewMultiSet))
+def item_view_set(request, qtbot):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    qtbot.addWidget(result)
+    return result
+
+
+def test_item_view_set_fuzzy(item_view_set):
+    item_view_set.setup_data([{"name": name} for name in NAME_LIST])
+    assert item_view_set.searchable(fuzzy=True) is item_view_set
+    line_edit = item_view_set.search_line_edit
+    line_edit.setText("sh10cmp")
+    assert _name_list(item_view_set.sort_filter_model) == ["shot10_cmp", "sh0100_comp_v012"]
@@ -0,0 +1,103 @@
+"""
+Test MTableModel compiled header_list dispatch.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+from qtpy import QtGui
+
+# Import local modules
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+class _Row(object):
+    def __init__(self, name, age):
+        self.name = name
+        self.age = age
+
+
+HEADER_LIST = [
+    {
+        "label": "Name",
+        "key": "name",
+        "checkable": True,
+        "searchable": True,
+        "color": "#ff0000",
+        "tooltip": lambda x, y: "tip {}".format(x),
+        "font": lambda x, y: {"bold": True},
+    },
+    {
+        "label": "Age",
+        "key": "age",
+        "editable": True,
+        "display": lambda x, y: "{} years".format(x),
+        "alignment": "right",
+        "bg_color": lambda x, y: "#00ff00" if x > 18 else None,
+    },
+    {"label": "Score", "key": "score", "draggable": True, "data": {90: "A", 60: "C"}},
+]
+
+
+@pytest.fixture(params=("dict", "object"))
+def model(request, qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    if request.param == "dict":
+        result.set_data_list([{"name": "ann", "age": 20, "score": 90}, {"name": "bob", "age": 10}])
+    else:
+        result.set_data_list([_Row("ann", 20), _Row("bob", 10)])
+    return result
+
+
+def test_display_and_formatter_roles(model):
+    """Every configured role goes through the config formatter then the model formatter."""
+    assert model.index(0, 0).data() == "ann"
+    assert model.index(0, 0).data(QtCore.Qt.EditRole) == "ann"
+    assert model.index(0, 0).data(QtCore.Qt.ToolTipRole) == "tip ann"
+    assert model.index(0, 0).data(QtCore.Qt.ForegroundRole) == QtGui.QColor("#ff0000")
+    assert model.index(0, 0).data(QtCore.Qt.FontRole).bold()
+    assert model.index(0, 1).data() == "20 years"
+    assert model.index(0, 1).data(QtCore.Qt.TextAlignmentRole) == QtCore.Qt.AlignRight
+    assert model.index(0, 1).data(QtCore.Qt.BackgroundRole) == QtGui.QColor("#00ff00")
+    assert model.index(1, 1).data(QtCore.Qt.BackgroundRole) == QtGui.QColor()
+    assert model.index(1, 2).data() == "--"
+
+
+def test_unconfigured_roles(model):
+    """Roles without config return None, except display/edit/tooltip."""
+    assert model.index(0, 1).data(QtCore.Qt.ForegroundRole) is None
+    assert model.index(0, 1).data(QtCore.Qt.DecorationRole) is None
+    assert model.index(0, 1).data(QtCore.Qt.CheckStateRole) is None
+    assert model.index(0, 0).data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Unchecked
+    assert model.index(1, 2).data(QtCore.Qt.ToolTipRole) == "--"
+
+
+def test_flags(model):
+    """Flags are compiled from the column config."""
+    assert model.flags(model.index(0, 0)) & QtCore.Qt.ItemIsUserCheckable
+    assert not model.flags(model.index(0, 0)) & QtCore.Qt.ItemIsEditable
+    assert model.flags(model.index(0, 1)) & QtCore.Qt.ItemIsEditable
+    assert model.flags(model.index(0, 2)) & QtCore.Qt.ItemIsDragEnabled
+    assert model.flags(model.index(0, 2)) & QtCore.Qt.ItemIsSelectable
+
+
+def test_cell_getter(model):
+    """get_cell_getter gives the same value as data()."""
+    data_obj = model.get_data_obj(model.index(0, 1))
+    assert model.get_cell_getter(1)(data_obj) == "20 years"
+    assert model.get_cell_getter(1, QtCore.Qt.ForegroundRole) is None
+
+
+def test_filter_with_compiled_getter(model):
+    """MSortFilterModel reads the compiled display of the source model."""
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.set_search_pattern("bo")
+    assert proxy_model.rowCount() == 1
+    proxy_model.set_search_pattern("")
+    proxy_model.set_filter_attr_pattern("age", "^20")
+    assert proxy_model.rowCount() == 1
+    assert proxy_model.index(0, 0).data() == "ann"
@@ -0,0 +1,131 @@
+"""
+Test MTableModel primary key and path indexes.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "ID", "key": "id"},
+]
+
+
+def _make_data_list(count):
+    return [{"id": i, "name": "n{}".format(i)} for i in range(count)]
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list(5))
+    result.set_key("id")
+    return result
+
+
+def test_key_lookup(model):
+    """The rows are found by key, the missing keys give an invalid index."""
+    index = model.index_for_key(3, column=1)
+    assert (index.row(), index.column()) == (3, 1)
+    assert model.row_for_key(0) == 0
+    assert model.row_for_key(99) is None
+    assert not model.index_for_key(99).isValid()
+
+
+def test_key_insert_remove_move(model):
+    """The key index follows the row changes."""
+    model.insert_rows(1, [{"id": 10, "name": "a"}])
+    model.extend([{"id": 11, "name": "b"}])
+    assert model.row_for_key(10) == 1
+    assert model.row_for_key(4) == 5
+    assert model.row_for_key(11) == 6
+    model.remove_rows([0, 1])
+    assert model.row_for_key(10) is None
+    assert model.row_for_key(1) == 0
+    model.move_rows([0], 3)
+    assert [model.row_for_key(key) for key in (2, 3, 1, 4, 11)] == [0, 1, 2, 3, 4]
+
+
+def test_key_set_data_and_reset(model):
+    """Changing a key with setData or resetting the data rebuilds the entries."""
+    model.setData(model.index(2, 1), 20)
+    assert model.row_for_key(2) is None
+    assert model.row_for_key(20) == 2
+    model.set_data_list(_make_data_list(2)[::-1])
+    assert model.row_for_key(0) == 1
+    assert model.row_for_key(20) is None
+    model.set_key(None)
+    assert model.row_for_key(0) is None
+
+
+def test_key_update_data_list(qapp):
+    """update_data_list keeps the key index up to date."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(_make_data_list(5))
+    model.set_key("name")
+    model.update_data_list([{"id": 4, "name": "x"}, {"id": 0, "name": "n0"}, {"id": 9, "name": "n9"}])
+    assert [model.row_for_key(key) for key in ("x", "n0", "n9", "n4", "n1")] == [0, 1, 2, None, None]
+
+
+@pytest.fixture
+def tree_model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(
+        [
+            {
+                "id": 1,
+                "name": "seq010",
+                "children": [
+                    {"id": 2, "name": "sh0100", "children": [{"id": 3, "name": "comp"}, {"id": 4, "name": "anim"}]},
+                    {"id": 5, "name": "sh0200"},
+                ],
+            },
+            {"id": 6, "name": "seq020", "children": lambda: [{"id": 7, "name": "sh0300"}]},
+        ]
+    )
+    return result
+
+
+def test_tree_key(tree_model):
+    """The keys of the whole tree are indexed, the index has the right parent."""
+    tree_model.set_key("id")
+    index = tree_model.index_for_key(4)
+    assert index.row() == 1
+    assert tree_model.get_data_obj(index.parent())["name"] == "sh0100"
+    assert tree_model.get_data_obj(index.parent().parent())["name"] == "seq010"
+    tree_model.remove_rows([0], tree_model.index_for_key(1))
+    assert not tree_model.index_for_key(3).isValid()
+    assert tree_model.row_for_key(5) == 0
+
+
+def test_tree_path(tree_model):
+    """The nodes are found by path, the path index follows the tree changes."""
+    index = tree_model.index_for_path("seq010/sh0100/anim", column=1)
+    assert (index.row(), index.column(), index.data()) == (1, 1, 4)
+    assert tree_model.index_for_path("/seq010/sh0200/").data() == "sh0200"
+    assert not tree_model.index_for_path("seq010/sh0300").isValid()
+    assert not tree_model.index_for_path("seq020/sh0300").isValid()
+    assert not tree_model.index_for_path("").isValid()
+
+    parent_index = tree_model.index_for_path("seq010")
+    tree_model.insert_rows(0, [{"id": 8, "name": "sh0050"}], parent_index)
+    assert tree_model.index_for_path("seq010/sh0100/anim").parent().row() == 1
+    assert tree_model.index_for_path("seq010/sh0050").row() == 0
+    tree_model.setData(tree_model.index_for_path("seq010/sh0050"), "sh0060")
+    assert not tree_model.index_for_path("seq010/sh0050").isValid()
+    assert tree_model.index_for_path("seq010/sh0060").row() == 0
+    tree_model.move_rows([1], 0, parent_index, QtCore.QModelIndex())
+    assert tree_model.index_for_path("sh0100/comp").parent().row() == 0
+    assert not tree_model.index_for_path("seq010/sh0100").isValid()
+
+    tree_model.set_path_key("id")
+    assert tree_model.index_for_path("2.3", sep=".").data() == "comp"
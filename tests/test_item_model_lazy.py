@@ -0,0 +1,195 @@
+"""
+Test MTableModel lazy loading of tree children.
+"""
+
+# Import built-in modules
+import asyncio
+import threading
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import ChunkLoader
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view import MTreeView
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}]
+
+
+def _name_list(model, parent_index):
+    return [model.index(row, 0, parent_index).data() for row in range(model.rowCount(parent_index))]
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_fetch_chunk_size(3)
+    return result
+
+
+def test_lazy_children(qtbot, model):
+    """The loader runs in a worker thread and the rows are inserted by chunk before the loading row."""
+    thread_list = []
+
+    def _load():
+        thread_list.append(threading.current_thread())
+        for i in range(7):
+            yield {"name": "shot{}".format(i), "children": lambda: [{"name": "task"}]}
+
+    model.set_data_list([{"name": "seq", "children": _load}, {"name": "empty"}])
+    seq_index = model.index(0, 0)
+    assert model.hasChildren(seq_index)
+    assert model.rowCount(seq_index) == 0
+    assert model.canFetchMore(seq_index)
+    assert not model.hasChildren(model.index(1, 0))
+
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    model.fetchMore(seq_index)
+    assert _name_list(model, seq_index) == ["Loading..."]
+    assert not model.canFetchMore(seq_index)
+    qtbot.waitUntil(lambda: model.rowCount(seq_index) == 7)
+    assert inserted == [(0, 0), (0, 2), (3, 5), (6, 6)]
+    assert thread_list[0] is not threading.main_thread()
+    assert model.get_data_list()[0]["children"][0]["name"] == "shot0"
+
+    shot_index = model.index(2, 0, seq_index)
+    assert shot_index.parent() == seq_index
+    model.fetchMore(shot_index)
+    qtbot.waitUntil(lambda: _name_list(model, shot_index) == ["task"])
+
+
+def test_async_loader(qtbot, model):
+    """Async functions and async generators are run in the worker too."""
+
+    async def _load_list():
+        await asyncio.sleep(0)
+        return [{"name": "a"}, {"name": "b"}]
+
+    async def _load_iter():
+        for i in range(4):
+            await asyncio.sleep(0)
+            yield {"name": str(i)}
+
+    model.set_data_list([{"name": "list", "children": _load_list}, {"name": "iter", "children": _load_iter}])
+    for row in range(2):
+        model.fetchMore(model.index(row, 0))
+    qtbot.waitUntil(lambda: _name_list(model, model.index(0, 0)) == ["a", "b"])
+    qtbot.waitUntil(lambda: _name_list(model, model.index(1, 0)) == ["0", "1", "2", "3"])
+
+
+def test_cancel_on_collapse(qtbot, model):
+    """Collapsing the node stops the loading and puts the loader back."""
+    event = threading.Event()
+
+    def _load():
+        yield {"name": "first"}
+        event.wait(5)
+        yield {"name": "second"}
+
+    model.set_fetch_chunk_size(1)
+    model.set_data_list([{"name": "seq", "children": _load}])
+    tree_view = MTreeView()
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    tree_view.setModel(proxy_model)
+    qtbot.addWidget(tree_view)
+    tree_view.show()
+    proxy_index = proxy_model.index(0, 0)
+    tree_view.expand(proxy_index)
+    qtbot.waitUntil(lambda: _name_list(model, model.index(0, 0)) == ["first", "Loading..."])
+    tree_view.collapse(proxy_index)
+    assert model.rowCount(model.index(0, 0)) == 0
+    assert model.get_data_list()[0]["children"] is _load
+    event.set()
+    qtbot.wait(50)
+    assert model.rowCount(model.index(0, 0)) == 0
+    assert not model.lazy_loader_map
+    qtbot.waitUntil(lambda: not model.running_loader_set)
+
+
+def test_loader_failed(qtbot, model):
+    """A failed loader emits sig_fetch_failed and can be fetched again."""
+
+    def _load():
+        raise IOError("no connection")
+
+    model.set_data_list([{"name": "seq", "children": _load}])
+    with qtbot.waitSignal(model.sig_fetch_failed) as blocker:
+        model.fetchMore(model.index(0, 0))
+    assert blocker.args[1] == "OSError: no connection"
+    assert model.rowCount(model.index(0, 0)) == 0
+    assert model.canFetchMore(model.index(0, 0))
+
+
+def test_delete_model_while_loading(qtbot):
+    """Deleting the model cancels the running loader, it still finishes in the worker thread."""
+    started = threading.Event()
+    event = threading.Event()
+
+    def _load():
+        started.set()
+        event.wait(5)
+        yield {"name": "late"}
+
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_loader(_load)
+    chunk_loader = next(iter(model.running_loader_set))
+    finished = []
+    chunk_loader.signals.sig_finished.connect(finished.append)
+    assert started.wait(5)
+    destroyed = []
+    model.destroyed.connect(lambda: destroyed.append(True))
+    model.deleteLater()
+    QtCore.QCoreApplication.sendPostedEvents(None, QtCore.QEvent.DeferredDelete)
+    assert destroyed
+    del model
+    assert chunk_loader.canceled
+    event.set()
+    qtbot.waitUntil(lambda: finished == [chunk_loader])
+    qtbot.waitUntil(lambda: chunk_loader not in ChunkLoader.running_set)
+
+
+@pytest.mark.parametrize("async_loader", [False, True])
+def test_loader_internal_error(qapp, async_loader):
+    """Only the errors of the loader count as failed, an error while sending the chunks is raised."""
+
+    def _load():
+        yield {"name": "a"}
+        raise IOError("no connection")
+
+    async def _async_load():
+        yield {"name": "a"}
+        raise IOError("no connection")
+
+    class _BrokenSignal(object):
+        def emit(self, *args):
+            raise RuntimeError("broken")
+
+    class _Signals(object):
+        def __init__(self, chunk_signal):
+            self.emitted = []
+            self.sig_chunk_loaded = chunk_signal
+            self.sig_failed = self
+            self.sig_finished = self
+
+        def emit(self, *args):
+            self.emitted.append(args)
+
+    chunk_loader = ChunkLoader(_async_load if async_loader else _load, chunk_size=1)
+    chunk_loader.signals = _Signals(_BrokenSignal())
+    with pytest.raises(RuntimeError):
+        chunk_loader.run()
+    assert chunk_loader.signals.emitted == [(chunk_loader,)]
+
+    chunk_loader.signals = _Signals(_Signals(None))
+    chunk_loader.run()
+    assert chunk_loader.signals.sig_chunk_loaded.emitted == [(chunk_loader, [{"name": "a"}])]
+    assert chunk_loader.signals.emitted == [(chunk_loader, "OSError: no connection"), (chunk_loader,)]
@@ -0,0 +1,123 @@
+"""
+Test the capped append-only mode of MTableModel and the auto scroll of the views.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view import MListView
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [{"label": "Message", "key": "message"}]
+
+
+def _make_data_list(start, count):
+    return [{"message": "m{}".format(i)} for i in range(start, start + count)]
+
+
+def _message_list(model):
+    return [model.index(row, 0).data() for row in range(model.rowCount())]
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list(0, 3))
+    result.set_max_rows(5)
+    return result
+
+
+@pytest.fixture
+def signal_list(model):
+    result = []
+    model.rowsInserted.connect(lambda parent, first, last: result.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: result.append(("remove", first, last)))
+    model.modelReset.connect(lambda: result.append(("reset",)))
+    return result
+
+
+def test_coalesce_appends(qtbot, model, signal_list):
+    """The rows appended in one frame are inserted together, the oldest rows are removed together."""
+    for data_dict in _make_data_list(3, 4):
+        model.append(data_dict)
+    assert model.rowCount() == 3
+    qtbot.waitUntil(lambda: model.rowCount() == 5)
+    assert signal_list == [("remove", 0, 1), ("insert", 1, 4)]
+    assert _message_list(model) == ["m2", "m3", "m4", "m5", "m6"]
+    assert model.dropped_row_count == 2
+
+
+def test_flush_more_than_max_rows(model, signal_list):
+    """When more than max_rows come in one frame, only the last rows are inserted."""
+    model.extend(_make_data_list(3, 12))
+    model.flush_rows()
+    assert signal_list == [("remove", 0, 2), ("insert", 0, 4)]
+    assert _message_list(model) == ["m10", "m11", "m12", "m13", "m14"]
+    assert model.dropped_row_count == 10
+
+
+def test_set_max_rows(model, signal_list):
+    """Lowering max_rows drops the oldest rows, None inserts the rows on append again."""
+    model.extend(_make_data_list(3, 1))
+    model.set_max_rows(2)
+    assert signal_list == [("insert", 3, 3), ("remove", 0, 1)]
+    model.set_max_rows(None)
+    model.append({"message": "new"})
+    assert _message_list(model) == ["m2", "m3", "new"]
+    model.set_max_rows(5)
+    model.append({"message": "dropped"})
+    model.set_data_list([])
+    model.flush_rows()
+    assert model.rowCount() == 0
+
+
+def test_proxy_model(qtbot, model):
+    """The sort filter model follows the range inserts and removes."""
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(HEADER_LIST)
+    proxy_model.setSourceModel(model)
+    model.extend(_make_data_list(3, 4))
+    model.flush_rows()
+    assert _message_list(proxy_model) == ["m2", "m3", "m4", "m5", "m6"]
+
+
+@pytest.mark.parametrize("view_class", (MTableView, MListView))
+def test_auto_scroll(qtbot, view_class):
+    """The view follows the new rows until the user scrolls up, and keeps the rows the user reads in place."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_max_rows(110)
+    view = view_class()
+    qtbot.addWidget(view)
+    view.setModel(model)
+    view.resize(200, 200)
+    view.show()
+    view.set_auto_scroll(True)
+    scroll_bar = view.verticalScrollBar()
+
+    model.extend(_make_data_list(0, 100))
+    model.flush_rows()
+    qtbot.waitUntil(lambda: scroll_bar.maximum() > 0 and scroll_bar.value() == scroll_bar.maximum())
+
+    scroll_bar.setValue(scroll_bar.maximum() // 2)
+    qtbot.wait(50)
+    top_message = view.indexAt(QtCore.QPoint(0, 0)).data()
+    model.extend(_make_data_list(100, 20))
+    model.flush_rows()
+    qtbot.wait(50)
+    assert not view.scroll_at_bottom
+    assert view.indexAt(QtCore.QPoint(0, 0)).data() == top_message
+
+    scroll_bar.setValue(scroll_bar.maximum())
+    model.extend(_make_data_list(120, 10))
+    model.flush_rows()
+    last_index = model.index(model.rowCount() - 1, 0)
+    assert last_index.data() == "m129"
+    qtbot.waitUntil(lambda: view.viewport().rect().contains(view.visualRect(last_index).center()))
@@ -0,0 +1,112 @@
+"""
+Test MSortFilterModel matching the top level rows in a concurrent.futures executor.
+"""
+
+# Import built-in modules
+import concurrent.futures
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets.item_model import MASK_UNKNOWN
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status"},
+]
+
+
+class RecordExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Record how many tasks are submitted."""
+
+    def __init__(self):
+        super(RecordExecutor, self).__init__(2)
+        self.submit_count = 0
+
+    def submit(self, *args, **kwargs):
+        self.submit_count += 1
+        return super(RecordExecutor, self).submit(*args, **kwargs)
+
+
+def _name_list(proxy_model):
+    return [proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture
+def executor():
+    result = RecordExecutor()
+    yield result
+    result.shutdown()
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(
+        [{"name": "shot{}".format(i), "status": "done" if i % 2 else "wait"} for i in range(100)]
+        + [{"name": "seq", "children": [{"name": "shot7x", "status": "wait"}]}]
+    )
+    return result
+
+
+@pytest.fixture
+def proxy_model(model, executor):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    result.set_filter_executor(executor, chunk_size=30)
+    return result
+
+
+def test_parallel_filter(qtbot, proxy_model, executor):
+    """The mask is computed by chunks, then the proxy is filtered once, the children are still matched."""
+    with qtbot.waitSignal(proxy_model.sig_filter_applied):
+        proxy_model.set_search_pattern("shot7")
+    assert _name_list(proxy_model) == ["shot7"] + ["shot{}".format(i) for i in range(70, 80)] + ["seq"]
+    assert executor.submit_count == 4
+    assert len(proxy_model.filter_mask) == 101
+
+    with qtbot.waitSignal(proxy_model.sig_filter_applied):
+        proxy_model.set_filter_attr_pattern("status", "done")
+    assert _name_list(proxy_model) == ["shot7"] + ["shot{}".format(i) for i in range(71, 80, 2)]
+
+    # 清空内容直接生效，不需要等待
+    proxy_model.set_filter_attr_pattern("status", "")
+    proxy_model.set_search_pattern("")
+    assert proxy_model.rowCount() == 101
+    assert proxy_model.filter_mask is None
+
+
+def test_stale_pattern_dropped(qtbot, proxy_model):
+    """Only the results of the last pattern are applied."""
+    applied_list = []
+    proxy_model.sig_filter_applied.connect(lambda: applied_list.append(_name_list(proxy_model)))
+    proxy_model.set_search_pattern("shot1")
+    proxy_model.set_search_pattern("shot2")
+    proxy_model.set_search_pattern("shot99")
+    qtbot.waitUntil(lambda: bool(applied_list))
+    qtbot.wait(50)
+    assert applied_list == [["shot99"]]
+
+
+def test_source_changes(qtbot, proxy_model, model):
+    """The mask follows the source rows, the rows changed while matching are matched again."""
+    with qtbot.waitSignal(proxy_model.sig_filter_applied):
+        proxy_model.set_search_pattern("shot9")
+    model.setData(model.index(0, 0), "shot900")
+    model.insert_rows(0, [{"name": "shot9a"}])
+    model.remove_rows([2])
+    assert _name_list(proxy_model)[:3] == ["shot9a", "shot900", "shot9"]
+    assert list(proxy_model.filter_mask[:2]) == [MASK_UNKNOWN, MASK_UNKNOWN]
+
+    with qtbot.waitSignal(proxy_model.sig_filter_applied):
+        proxy_model.set_search_pattern("shot5")
+        model.append({"name": "shot5z"})
+    assert _name_list(proxy_model) == ["shot5"] + ["shot{}".format(i) for i in range(50, 60)] + ["shot5z"]
+    assert len(proxy_model.filter_mask) == 102
+    assert MASK_UNKNOWN not in proxy_model.filter_mask
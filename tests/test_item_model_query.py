@@ -0,0 +1,144 @@
+"""
+Test the query filter of MSortFilterModel.
+"""
+
+# Import built-in modules
+import datetime
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Frames", "key": "frames", "display": lambda x, y: "{} f".format(x)},
+    {"label": "Status", "key": "status"},
+    {"label": "User", "key": "user"},
+    {"label": "Date", "key": "date"},
+]
+
+
+def _make_data_list():
+    return [
+        {"name": "sh010", "frames": 1200, "status": "failed", "user": "ann", "date": datetime.date(2024, 1, 5)},
+        {"name": "sh020", "frames": 800, "status": "done", "user": "bob", "date": datetime.date(2024, 2, 1)},
+        {"name": "sh030", "frames": 2400, "status": "failed", "user": "cat", "date": None},
+        {"name": "sh040", "frames": None, "status": "FAILED", "user": "bob", "date": "2024-03-01", "note": "retake"},
+    ]
+
+
+def _name_list(proxy_model):
+    return [proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list())
+    return result
+
+
+@pytest.fixture
+def proxy_model(model):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    return result
+
+
+@pytest.mark.parametrize(
+    "query, name_list",
+    (
+        ("frames > 1000 and status:failed and user in (ann, bob)", ["sh010"]),
+        ("frames>1000 status:fail", ["sh010", "sh030"]),
+        ("frames:1000..2000", ["sh010"]),
+        ("-status:failed", ["sh020"]),
+        ("NOT (user = bob OR user = ann)", ["sh030"]),
+        ("date >= 2024-02-01", ["sh020", "sh040"]),
+        ("date:..2024-01-31", ["sh010"]),
+        ("date > 2024-01-31T12:00", ["sh020", "sh040"]),
+        ("date:2024-01-01T00:00..2024-02-01T00:00", ["sh010", "sh020"]),
+        ("date:..2024-01-05T12:00:30", ["sh010"]),
+        ("Frames != 800", ["sh010", "sh030", "sh040"]),
+        ("sh03 or SH04", ["sh030", "sh040"]),
+        ('status:(done, "failed") frames<1000', ["sh020"]),
+        ("name > sh20", ["sh030", "sh040"]),
+        ("name >= sh020 and name < sh40", ["sh020", "sh030"]),
+        ("", ["sh010", "sh020", "sh030", "sh040"]),
+    ),
+)
+def test_query(proxy_model, query, name_list):
+    proxy_model.set_query(query)
+    assert _name_list(proxy_model) == name_list
+
+
+def test_query_with_search_and_changes(proxy_model, model):
+    """The query is combined with the search pattern, the changed rows are matched again."""
+    proxy_model.set_query("status:failed")
+    proxy_model.set_search_pattern("sh0[12]")
+    assert _name_list(proxy_model) == ["sh010"]
+    model.setData(model.index(1, 2), "failed")
+    assert _name_list(proxy_model) == ["sh010", "sh020"]
+    model.insert_rows(0, [{"name": "sh011", "status": "failed"}, {"name": "sh012", "status": "done"}])
+    assert _name_list(proxy_model) == ["sh011", "sh010", "sh020"]
+    model.remove_rows([1, 2])
+    proxy_model.set_search_pattern("")
+    assert _name_list(proxy_model) == ["sh011", "sh020", "sh030", "sh040"]
+    proxy_model.set_query("")
+    assert proxy_model.rowCount() == 4
+
+
+def test_query_sorted_in_source(proxy_model, model):
+    proxy_model.set_query("frames >= 1000")
+    proxy_model.set_sort_source_in_place(threaded=False)
+    proxy_model.sort(1, QtCore.Qt.DescendingOrder)
+    assert _name_list(proxy_model) == ["sh030", "sh010"]
+
+
+def test_query_row_attribute(qapp):
+    """The fields out of header_list are read from the row objects of MTableModel."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(_make_data_list())
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.set_query("note:retake")
+    assert _name_list(proxy_model) == ["sh040"]
+
+
+def test_invalid_query(proxy_model):
+    proxy_model.set_query("user = bob")
+    for query in ("(status:done", "frames >", "user in (a, b", "!done", "frames = )"):
+        with pytest.raises(ValueError):
+            proxy_model.set_query(query)
+    assert _name_list(proxy_model) == ["sh020", "sh040"]
+
+
+def test_tree_query(qapp):
+    """The children rows are matched by the compiled predicate, their parents are kept."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "seq", "children": [{"name": "sh010", "frames": 10}, {"name": "sh020", "frames": 20}]},
+            {"name": "asset", "frames": 30, "children": [{"name": "prop", "frames": 5}]},
+        ]
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.set_query("frames >= 20")
+    assert _name_list(proxy_model) == ["seq", "asset"]
+    seq_index = proxy_model.index(0, 0)
+    assert [proxy_model.index(row, 0, seq_index).data() for row in range(proxy_model.rowCount(seq_index))] == [
+        "sh020"
+    ]
+    assert proxy_model.rowCount(proxy_model.index(1, 0)) == 0
@@ -0,0 +1,128 @@
+"""
+Test MTableModel bulk insert/remove/move rows.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}, {"label": "Frames", "key": "frames"}]
+
+
+def _name_list(model, parent_index=None):
+    parent_index = QtCore.QModelIndex() if parent_index is None else parent_index
+    return [model.index(row, 0, parent_index).data() for row in range(model.rowCount(parent_index))]
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list([{"name": str(i), "frames": i} for i in range(10)])
+    return result
+
+
+@pytest.fixture
+def signal_list(model):
+    result = []
+    model.rowsInserted.connect(lambda parent, first, last: result.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: result.append(("remove", first, last)))
+    model.rowsMoved.connect(lambda parent, first, last, dest, row: result.append(("move", first, last, row)))
+    model.modelReset.connect(lambda: result.append(("reset",)))
+    return result
+
+
+def test_insert_rows(model, signal_list):
+    """Insert in the middle with one signal, the persistent indexes after it are shifted."""
+    persistent_index = QtCore.QPersistentModelIndex(model.index(5, 0))
+    model.insert_rows(2, [{"name": "a", "frames": 1}, {"name": "b", "frames": 2}])
+    model.extend([{"name": "c", "frames": 3}])
+    model.insert_rows(0, [])
+    assert signal_list == [("insert", 2, 3), ("insert", 12, 12)]
+    assert _name_list(model) == ["0", "1", "a", "b", "2", "3", "4", "5", "6", "7", "8", "9", "c"]
+    assert persistent_index.row() == 7
+    assert persistent_index.data() == "5"
+
+
+def test_insert_rows_mixed_type(qapp):
+    """The column model degrades the typed array when the inserted values do not fit."""
+    model = MColumnTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list([{"name": "a", "frames": 1}, {"name": "b", "frames": 2}])
+    model.insert_rows(1, [{"name": "x", "frames": "many"}])
+    assert model.get_column("frames") == [1, "many", 2]
+
+
+def test_remove_rows(model, signal_list):
+    """Contiguous rows are removed together, from the last range to the first."""
+    persistent_index = QtCore.QPersistentModelIndex(model.index(9, 0))
+    removed_index = QtCore.QPersistentModelIndex(model.index(3, 0))
+    model.remove_rows([1, 2, 3, range(6, 8), (7, 8)])
+    assert signal_list == [("remove", 6, 8), ("remove", 1, 3)]
+    assert _name_list(model) == ["0", "4", "5", "9"]
+    assert persistent_index.row() == 3
+    assert not removed_index.isValid()
+    with pytest.raises(IndexError):
+        model.remove_rows([4])
+
+
+@pytest.mark.parametrize(
+    "rows, destination, result",
+    (
+        ([1, 2, 8], 5, ["0", "3", "4", "1", "2", "8", "5", "6", "7", "9"]),
+        ([0, 9], 10, ["1", "2", "3", "4", "5", "6", "7", "8", "0", "9"]),
+        ([(3, 6)], 5, ["0", "1", "2", "3", "4", "5", "6", "7", "8", "9"]),
+        ([5, 6, 2], 0, ["2", "5", "6", "0", "1", "3", "4", "7", "8", "9"]),
+    ),
+)
+def test_move_rows(model, signal_list, rows, destination, result):
+    """The moved rows keep their order and the persistent indexes follow them."""
+    persistent_list = [QtCore.QPersistentModelIndex(model.index(row, 0)) for row in range(10)]
+    assert model.move_rows(rows, destination)
+    assert _name_list(model) == result
+    assert all(signal[0] == "move" for signal in signal_list)
+    assert [persistent_index.data() for persistent_index in persistent_list] == [str(i) for i in range(10)]
+    assert [persistent_index.row() for persistent_index in persistent_list] == [
+        result.index(str(i)) for i in range(10)
+    ]
+
+
+def test_move_rows_to_other_parent(qapp):
+    """Rows can be moved under another parent of a tree."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list(
+        [
+            {"name": "a", "children": [{"name": "a0"}, {"name": "a1"}, {"name": "a2"}]},
+            {"name": "b", "children": [{"name": "b0"}]},
+        ]
+    )
+    a_index = model.index(0, 0)
+    b_index = model.index(1, 0)
+    persistent_index = QtCore.QPersistentModelIndex(model.index(2, 0, a_index))
+    assert model.move_rows([0, 2], 1, a_index, b_index)
+    assert _name_list(model, a_index) == ["a1"]
+    assert _name_list(model, b_index) == ["b0", "a0", "a2"]
+    assert persistent_index.parent() == b_index
+    assert persistent_index.row() == 2
+    assert model.index(1, 0, b_index).parent() == b_index
+    # 不能移到自己的子节点下
+    assert not model.move_rows([1], 0, QtCore.QModelIndex(), model.index(0, 0, b_index))
+
+
+def test_remove_many_rows_without_reset(qapp):
+    """Removing every other row of a big table emits one remove per range and no reset."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list([{"name": str(i)} for i in range(10000)])
+    resets = []
+    model.modelReset.connect(lambda: resets.append(True))
+    model.remove_rows(range(0, 10000, 2))
+    assert model.rowCount() == 5000
+    assert model.index(0, 0).data() == "1"
+    assert not resets
@@ -0,0 +1,158 @@
+"""
+Test the cached search text of MSortFilterModel.
+"""
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+
+
+def _make_header_list(call_list):
+    def _display(value, data_obj):
+        call_list.append(value)
+        return "{} years".format(value)
+
+    return [
+        {"label": "Name", "key": "name", "searchable": True},
+        {"label": "Age", "key": "age", "searchable": True, "display": _display},
+        {"label": "City", "key": "city"},
+    ]
+
+
+def _name_list(proxy_model):
+    return [proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture
+def call_list():
+    return []
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp, call_list):
+    result = request.param()
+    result.set_header_list(_make_header_list(call_list))
+    result.set_data_list(
+        [
+            {"name": "Ann", "age": 20, "city": "Paris"},
+            {"name": "Bob", "age": 31, "city": "London"},
+            {"name": "Cat", "age": None, "city": "Berlin"},
+        ]
+    )
+    return result
+
+
+@pytest.fixture
+def proxy_model(model, call_list):
+    result = MSortFilterModel()
+    result.set_header_list(_make_header_list(call_list))
+    result.setSourceModel(model)
+    return result
+
+
+def test_search_cached_text(proxy_model, call_list):
+    """The display texts are computed once, the literal and regex patterns match them ignoring case."""
+    proxy_model.set_search_pattern("B")
+    assert _name_list(proxy_model) == ["Bob"]
+    assert len(call_list) == 3
+    proxy_model.set_search_pattern("2")
+    assert _name_list(proxy_model) == ["Ann"]
+    proxy_model.set_search_pattern("^a|^c")
+    assert _name_list(proxy_model) == ["Ann", "Cat"]
+    proxy_model.set_search_pattern("n years")
+    assert _name_list(proxy_model) == []
+    # 不会跨列匹配
+    proxy_model.set_search_pattern("ann\n20")
+    assert _name_list(proxy_model) == []
+    assert len(call_list) == 3
+
+
+def test_filter_column(proxy_model, call_list):
+    """A column with a reg is matched too, even if it is not searchable."""
+    proxy_model.set_filter_attr_pattern("city", "^(paris|berlin)$")
+    assert _name_list(proxy_model) == ["Ann", "Cat"]
+    proxy_model.set_search_pattern("a")
+    assert _name_list(proxy_model) == ["Ann", "Cat"]
+    proxy_model.set_filter_attr_pattern("city", "")
+    assert _name_list(proxy_model) == ["Ann", "Bob", "Cat"]
+
+
+def test_search_text_follows_changes(proxy_model, model, call_list):
+    """Only the changed, inserted rows are computed again, the removed rows are dropped."""
+    proxy_model.set_search_pattern("b")
+    assert _name_list(proxy_model) == ["Bob"]
+    del call_list[:]
+    model.setData(model.index(0, 0), "Bea")
+    assert _name_list(proxy_model) == ["Bea", "Bob"]
+    model.insert_rows(1, [{"name": "Abe", "age": 5}, {"name": "Sam", "age": 6}])
+    assert _name_list(proxy_model) == ["Bea", "Abe", "Bob"]
+    model.remove_rows([0, 1])
+    assert _name_list(proxy_model) == ["Bob"]
+    assert call_list == [20, 5, 6]
+    model.set_data_list([{"name": "Rob", "age": 1}])
+    assert _name_list(proxy_model) == ["Rob"]
+
+
+def test_tree_search(qapp, call_list):
+    """The children rows have their own cached texts."""
+    model = MTableModel()
+    model.set_header_list(_make_header_list(call_list))
+    model.set_data_list(
+        [
+            {"name": "seq", "children": [{"name": "shot", "age": 1}, {"name": "comp", "age": 2}]},
+            {"name": "asset", "children": [{"name": "prop", "age": 3}]},
+        ]
+    )
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(_make_header_list(call_list))
+    proxy_model.setSourceModel(model)
+    proxy_model.set_search_pattern("comp")
+    assert _name_list(proxy_model) == ["seq"]
+    assert proxy_model.rowCount(proxy_model.index(0, 0)) == 1
+    model.setData(model.index(0, 0, model.index(1, 0)), "comp2")
+    assert _name_list(proxy_model) == ["seq", "asset"]
+
+    other_model = MTableModel()
+    other_model.set_header_list(_make_header_list(call_list))
+    other_model.set_data_list([{"name": "comp"}])
+    proxy_model.setSourceModel(other_model)
+    assert _name_list(proxy_model) == ["comp"]
+    model.setData(model.index(0, 0), "none")
+    assert proxy_model.search_text_map[id(None)][1][0][1] == "comp"
+
+
+def test_flat_source_filtering(qapp, call_list):
+    """The recursive filtering is only enabled when the source has children rows."""
+    model = MTableModel()
+    model.set_header_list(_make_header_list(call_list))
+    model.set_data_list([{"name": "seq"}, {"name": "asset"}])
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(_make_header_list(call_list))
+    proxy_model.setSourceModel(model)
+    proxy_model.set_search_pattern("shot")
+    assert not proxy_model.isRecursiveFilteringEnabled()
+    assert _name_list(proxy_model) == []
+    model.insert_rows(0, [{"name": "seq2", "children": [{"name": "shot"}]}])
+    assert proxy_model.isRecursiveFilteringEnabled()
+    assert _name_list(proxy_model) == ["seq2"]
+
+
+def test_flat_source_reset_to_tree(qapp, call_list):
+    """A tree set to a flat source is filtered recursively again before the rows are read."""
+    model = MTableModel()
+    model.set_header_list(_make_header_list(call_list))
+    model.set_data_list([{"name": "comp_a"}, {"name": "lgt"}])
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list(_make_header_list(call_list))
+    proxy_model.setSourceModel(model)
+    proxy_model.set_search_pattern("comp")
+    assert _name_list(proxy_model) == ["comp_a"]
+    assert not proxy_model.isRecursiveFilteringEnabled()
+    model.set_data_list([{"name": "shot", "children": [{"name": "comp_b"}]}])
+    assert proxy_model.isRecursiveFilteringEnabled()
+    assert _name_list(proxy_model) == ["shot"]
+    assert proxy_model.rowCount(proxy_model.index(0, 0)) == 1
@@ -0,0 +1,148 @@
+"""
+Test the refined and the cached search results of MSortFilterModel.
+"""
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets import item_model
+from dayu_widgets import item_model_search
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view_full_set import MItemViewFullSet
+from dayu_widgets.item_view_multi_set import MItemViewMultiSet
+from dayu_widgets.item_view_set import MItemViewSet
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Status", "key": "status"},
+]
+
+
+def _make_data_list():
+    return [{"name": "sh{:03d}".format(i), "status": "done" if i % 2 else "wait"} for i in range(200)]
+
+
+def _name_list(proxy_model):
+    return [proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture
+def match_list(monkeypatch):
+    """Record the matched rows."""
+    result = []
+    match_row_text = item_model._match_row_text
+
+    def _match(row_text, *args):
+        result.append(row_text[0])
+        return match_row_text(row_text, *args)
+
+    monkeypatch.setattr(item_model, "_match_row_text", _match)
+    monkeypatch.setattr(item_model_search, "_match_row_text", _match)
+    return result
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list())
+    return result
+
+
+@pytest.fixture
+def proxy_model(model):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    return result
+
+
+def test_refine_and_cache(proxy_model, match_list):
+    """A narrower literal only matches the accepted rows, going back to a recent pattern matches nothing."""
+    proxy_model.set_search_pattern("sh0")
+    assert proxy_model.rowCount() == 100
+    assert len(match_list) == 200
+    del match_list[:]
+    proxy_model.set_search_pattern("sh01")
+    assert proxy_model.rowCount() == 10
+    assert len(match_list) == 100
+    del match_list[:]
+    proxy_model.set_search_pattern("sh012")
+    assert _name_list(proxy_model) == ["sh012"]
+    assert len(match_list) == 10
+    del match_list[:]
+    proxy_model.set_search_pattern("sh01")
+    proxy_model.set_search_pattern("sh0")
+    assert proxy_model.rowCount() == 100
+    assert match_list == []
+
+    # 正则和不包含之前内容的搜索重新匹配所有行
+    proxy_model.set_search_pattern("sh1.0")
+    assert proxy_model.rowCount() == 10
+    assert len(match_list) == 200
+    del match_list[:]
+    proxy_model.set_search_pattern("h19")
+    assert proxy_model.rowCount() == 10
+    assert len(match_list) == 200
+
+
+def test_refine_from_filter(proxy_model, match_list):
+    """A search typed after a filter only matches the rows accepted by the filter."""
+    proxy_model.set_filter_attr_pattern("status", "done")
+    assert proxy_model.rowCount() == 100
+    del match_list[:]
+    proxy_model.set_search_pattern("9")
+    assert proxy_model.rowCount() == 28
+    assert len(match_list) == 100
+    proxy_model.set_filter_attr_pattern("status", "")
+    assert proxy_model.rowCount() == 38
+
+
+def test_cache_follows_source(proxy_model, model, match_list):
+    """The changed rows are matched again when a cached result is used."""
+    proxy_model.set_search_pattern("sh00")
+    proxy_model.set_search_pattern("sh001")
+    model.setData(model.index(5, 0), "sh001x")
+    model.insert_rows(0, [{"name": "sh0010"}])
+    model.remove_rows([199])
+    del match_list[:]
+    proxy_model.set_search_pattern("sh00")
+    assert _name_list(proxy_model) == ["sh0010"] + ["sh00{}".format(i) for i in range(5)] + ["sh001x"] + [
+        "sh00{}".format(i) for i in range(6, 10)
+    ]
+    assert sorted(match_list) == ["sh0010", "sh001x"]
+
+    model.set_data_list(_make_data_list())
+    assert proxy_model.search_cache == {}
+    assert proxy_model.rowCount() == 10
+
+
+def test_cache_size(proxy_model):
+    proxy_model.search_cache_size = 2
+    for pattern in ("sh1", "sh2", "sh3", "sh4"):
+        proxy_model.set_search_pattern(pattern)
+    assert [key[0] for key in proxy_model.search_cache] == ["sh3", "sh4"]
+
+
+@pytest.fixture(params=(MItemViewSet, MItemViewFullSet, MItemViewMultiSet))
+def item_view_set(request, qtbot):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    qtbot.addWidget(result)
+    return result
+
+
+def test_item_view_set_typing(item_view_set, match_list):
+    """Typing and deleting in the search line edit of the item view sets uses the refined and cached results."""
+    item_view_set.setup_data(_make_data_list())
+    item_view_set.searchable()
+    line_edit = item_view_set.search_line_edit
+    line_edit.setText("sh1")
+    del match_list[:]
+    line_edit.setText("sh19")
+    line_edit.setText("sh1")
+    assert item_view_set.sort_filter_model.rowCount() == 100
+    assert len(match_list) == 100
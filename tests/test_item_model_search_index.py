@@ -0,0 +1,171 @@
+"""
+Test the trigram search index of MSortFilterModel and the type-ahead of the views.
+"""
+
+# Import built-in modules
+import threading
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets import item_model
+from dayu_widgets import item_model_search
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model import TrigramIndex
+from dayu_widgets.item_view import MListView
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "searchable": True},
+    {"label": "Task", "key": "task", "searchable": True},
+    {"label": "Status", "key": "status"},
+]
+
+
+def _make_data_list():
+    return [
+        {"name": "asset{:03d}".format(i), "task": "model" if i % 2 else "rig", "status": "done" if i % 3 else "wait"}
+        for i in range(300)
+    ]
+
+
+@pytest.fixture
+def match_list(monkeypatch):
+    """Record the matched rows."""
+    result = []
+    match_row_text = item_model._match_row_text
+
+    def _match(row_text, *args):
+        result.append(row_text[0])
+        return match_row_text(row_text, *args)
+
+    monkeypatch.setattr(item_model, "_match_row_text", _match)
+    monkeypatch.setattr(item_model_search, "_match_row_text", _match)
+    return result
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_data_list())
+    return result
+
+
+@pytest.fixture
+def proxy_model(qtbot, model):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    result.set_search_index(True)
+    qtbot.waitUntil(lambda: result.search_index is not None)
+    return result
+
+
+def test_trigram_index():
+    """The rows keep their ids through the changes, the stale ids are dropped by the text check."""
+    index = TrigramIndex(["abcd", "bcde", "xyz"])
+    assert index.find_rows("bcd") == [0, 1]
+    assert index.find_rows("bc") is None
+    assert index.find_rows("zzz") == []
+    index.insert_rows(1, ["abcx"])
+    index.set_text(0, "nope")
+    assert index.find_rows("abc") == [1]
+    index.remove_rows(0, 1)
+    assert index.find_rows("bcd") == [0]
+    assert len(index) == 2
+    # 大部分 id 过期后重新整理数组
+    for _ in range(600):
+        index.set_text(1, "xyz1")
+        index.set_text(1, "xyz2")
+    assert index.stale_count < 1200
+    assert index.find_rows("xyz") == [1]
+
+
+def test_index_search(proxy_model, model, match_list):
+    """Only the rows found by the index are matched, the index follows the source rows."""
+    proxy_model.set_search_pattern("SET01")
+    assert proxy_model.rowCount() == 10
+    assert len(match_list) == 10
+    del match_list[:]
+    proxy_model.set_search_pattern("et012")
+    assert proxy_model.rowCount() == 1
+    assert len(match_list) == 1
+
+    model.setData(model.index(0, 0), "asset012b")
+    model.insert_rows(0, [{"name": "asset0120", "task": "rig"}])
+    model.remove_rows([300])
+    assert proxy_model.find_source_rows("et012") == [0, 1, 13]
+    assert proxy_model.find_source_rows("rig", column=1, prefix=True)[:3] == [0, 1, 3]
+    assert proxy_model.find_source_rows("rig", column=2) is None
+    assert proxy_model.find_source_rows("as") is None
+    assert proxy_model.rowCount() == 3
+
+
+def test_index_rebuilt(qtbot, proxy_model, model):
+    model.set_data_list([{"name": "shot010"}, {"name": "shot020"}])
+    assert proxy_model.search_index is None
+    assert proxy_model.find_source_rows("shot") is None
+    qtbot.waitUntil(lambda: proxy_model.search_index is not None)
+    assert proxy_model.find_source_rows("t02") == [1]
+    proxy_model.set_search_index(False)
+    qtbot.wait(10)
+    assert proxy_model.search_index is None
+
+
+@pytest.mark.parametrize("cls", (MTableView, MListView))
+def test_keyboard_search(qtbot, monkeypatch, cls, proxy_model):
+    """The typed keys go to the next row starting with them, found by the index from the third key."""
+    find_list = []
+    find_source_rows = proxy_model.find_source_rows
+
+    def _find_source_rows(text, column=None, prefix=False):
+        find_list.append((text, column, prefix))
+        return find_source_rows(text, column, prefix)
+
+    monkeypatch.setattr(proxy_model, "find_source_rows", _find_source_rows)
+    view = cls()
+    qtbot.addWidget(view)
+    view.setModel(proxy_model)
+    proxy_model.sort(0, item_model.QtCore.Qt.DescendingOrder)
+    for key in "asset1":
+        view.keyboardSearch(key)
+    assert view.currentIndex().data() == "asset199"
+    for key in "0":
+        view.keyboardSearch(key)
+    assert view.currentIndex().data() == "asset109"
+    view.keyboardSearch("")
+    for key in "asset05":
+        view.keyboardSearch(key)
+    assert view.currentIndex().data() == "asset059"
+    assert find_list[0] == ("ass", 0, True)
+    assert len(find_list) == 10
+
+
+def test_changes_during_build(qtbot, monkeypatch, proxy_model, model):
+    """The changes made while the index is built are applied to it afterwards, it is not built again."""
+    event = threading.Event()
+    build_list = []
+
+    class _SlowIndex(TrigramIndex):
+        def __init__(self, text_list=()):
+            build_list.append(len(text_list))
+            event.wait(5)
+            super(_SlowIndex, self).__init__(text_list)
+
+    monkeypatch.setattr(item_model, "TrigramIndex", _SlowIndex)
+    model.set_data_list([{"name": "shot{:03d}".format(i)} for i in range(10)])
+    qtbot.waitUntil(lambda: build_list == [10])
+    model.insert_rows(0, [{"name": "intro"}])
+    model.remove_rows([5])
+    model.setData(model.index(1, 0), "outro")
+    event.set()
+    qtbot.waitUntil(lambda: proxy_model.search_index is not None)
+    assert build_list == [10]
+    assert proxy_model.find_source_rows("tro") == [0, 1]
+    assert proxy_model.find_source_rows("hot") == list(range(2, 10))
+    assert proxy_model.find_source_rows("t000") == []
+    assert proxy_model.find_source_rows("t004") == []
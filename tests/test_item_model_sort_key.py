@@ -0,0 +1,156 @@
+"""
+Test the cached natural sort keys of MSortFilterModel, and the sort in the source model.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_model import natural_sort_key
+
+
+def _make_header_list(call_list):
+    def _display(value, data_obj):
+        call_list.append(value)
+        return "--" if value is None else "{} MB".format(value)
+
+    return [
+        {"label": "Name", "key": "name", "searchable": True},
+        {"label": "Size", "key": "size", "display": _display},
+    ]
+
+
+def _column_list(proxy_model, column=0):
+    return [proxy_model.index(row, column).data() for row in range(proxy_model.rowCount())]
+
+
+@pytest.fixture
+def call_list():
+    return []
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp, call_list):
+    result = request.param()
+    result.set_header_list(_make_header_list(call_list))
+    result.set_data_list(
+        [
+            {"name": "v10", "size": 9},
+            {"name": "v9", "size": None},
+            {"name": "V1", "size": 100},
+            {"name": None, "size": 20},
+            {"name": "v2", "size": 3},
+        ]
+    )
+    return result
+
+
+@pytest.fixture
+def proxy_model(model, call_list):
+    result = MSortFilterModel()
+    result.set_header_list(_make_header_list(call_list))
+    result.setSourceModel(model)
+    return result
+
+
+def test_natural_sort_key():
+    assert sorted(["v10", "V9", "v09a", "v9b", "v1"], key=natural_sort_key) == ["v1", "V9", "v09a", "v9b", "v10"]
+    assert natural_sort_key(None) is None
+    assert natural_sort_key(2.5) == 2.5
+    assert natural_sort_key(True) is True
+    assert natural_sort_key(("a", 12)) == natural_sort_key("('a', 12)")
+
+
+@pytest.mark.parametrize(
+    "order, name_list, size_list",
+    (
+        (QtCore.Qt.AscendingOrder, ["V1", "v2", "v9", "v10", "--"], ["3 MB", "9 MB", "20 MB", "100 MB", "--"]),
+        (QtCore.Qt.DescendingOrder, ["v10", "v9", "v2", "V1", "--"], ["100 MB", "20 MB", "9 MB", "3 MB", "--"]),
+    ),
+)
+def test_proxy_sort(proxy_model, call_list, order, name_list, size_list):
+    """The raw values are compared in natural order without the formatters, None is always at the end."""
+    proxy_model.sort(0, order)
+    assert _column_list(proxy_model) == name_list
+    del call_list[:]
+    proxy_model.sort(1, order)
+    assert call_list == []
+    assert _column_list(proxy_model, 1) == size_list
+
+
+def test_sort_keys_follow_changes(proxy_model, model):
+    """Only the changed and inserted rows get new keys, the proxy sorts them again."""
+    proxy_model.sort(0, QtCore.Qt.AscendingOrder)
+    key_list = proxy_model.sort_key_map[id(None)][1][0]
+    model.setData(model.index(0, 0), "v0")
+    assert _column_list(proxy_model) == ["v0", "V1", "v2", "v9", "--"]
+    model.insert_rows(1, [{"name": "v3"}])
+    model.remove_rows([2])
+    assert _column_list(proxy_model) == ["v0", "V1", "v2", "v3", "--"]
+    assert proxy_model.sort_key_map[id(None)][1][0] is key_list
+    assert key_list == ["v00", "v013", "v011", None, "v012"]
+
+
+def test_sort_source_in_place(proxy_model, model, call_list):
+    """The rows are reordered in the source, the caches and the persistent indexes follow them."""
+    proxy_model.set_sort_source_in_place(threaded=False)
+    proxy_model.set_search_pattern("v")
+    persistent_index = QtCore.QPersistentModelIndex(proxy_model.index(0, 0))
+    text_count = len(call_list)
+    proxy_model.sort(0, QtCore.Qt.DescendingOrder)
+    assert proxy_model.sortColumn() == -1
+    assert [model.index(row, 0).data() for row in range(5)] == ["v10", "v9", "v2", "V1", "--"]
+    assert _column_list(proxy_model) == ["v10", "v9", "v2", "V1"]
+    assert persistent_index.row() == 0 and persistent_index.data() == "v10"
+    proxy_model.sort(1, QtCore.Qt.AscendingOrder)
+    assert _column_list(proxy_model) == ["v2", "v10", "V1", "v9"]
+    assert persistent_index.row() == 1
+    proxy_model.set_search_pattern("v1")
+    assert _column_list(proxy_model) == ["v10", "V1"]
+    assert len(call_list) == text_count
+
+
+def test_threaded_sort_source_in_place(qtbot, proxy_model, model):
+    proxy_model.set_sort_source_in_place()
+    proxy_model.sort(1, QtCore.Qt.DescendingOrder)
+    qtbot.waitUntil(lambda: proxy_model.source_sort_loader is None)
+    assert _column_list(proxy_model, 1) == ["100 MB", "20 MB", "9 MB", "3 MB", "--"]
+    proxy_model.sort(0, QtCore.Qt.AscendingOrder)
+    # 计算期间插入的行也会排序
+    model.insert_rows(0, [{"name": "v5", "size": 1}])
+    qtbot.waitUntil(lambda: proxy_model.source_sort_loader is None)
+    assert _column_list(proxy_model) == ["V1", "v2", "v5", "v9", "v10", "--"]
+
+
+def test_two_proxies_on_one_source(proxy_model, model, call_list):
+    """By default a proxy sort leaves the source model alone, the in place sort reorders it for every proxy."""
+    other_proxy_model = MSortFilterModel()
+    other_proxy_model.set_header_list(_make_header_list(call_list))
+    other_proxy_model.setSourceModel(model)
+    source_list = [model.index(row, 0).data() for row in range(model.rowCount())]
+    proxy_model.sort(0, QtCore.Qt.AscendingOrder)
+    assert _column_list(proxy_model) == ["V1", "v2", "v9", "v10", "--"]
+    assert _column_list(other_proxy_model) == source_list
+    assert [model.index(row, 0).data() for row in range(model.rowCount())] == source_list
+
+    other_proxy_model.sort(1, QtCore.Qt.AscendingOrder)
+    proxy_model.set_sort_source_in_place(threaded=False)
+    proxy_model.sort(0, QtCore.Qt.DescendingOrder)
+    assert [model.index(row, 0).data() for row in range(model.rowCount())] == ["v10", "v9", "v2", "V1", "--"]
+    # 另一个 proxy 的行也跟着 source 重排, 它自己排序的列保持不变
+    assert _column_list(other_proxy_model, 1) == ["3 MB", "9 MB", "20 MB", "100 MB", "--"]
+    other_proxy_model.sort(-1)
+    assert _column_list(other_proxy_model) == ["v10", "v9", "v2", "V1", "--"]
+
+
+def test_reorder_rows(model):
+    with pytest.raises(ValueError):
+        model.reorder_rows([0, 1, 1, 2, 3])
+    index = QtCore.QPersistentModelIndex(model.index(4, 1))
+    model.reorder_rows([4, 3, 2, 1, 0])
+    assert index.row() == 0
+    assert model.index(0, 0).data() == "v2"
@@ -0,0 +1,117 @@
+"""
+Test the ticking mode of MTableModel, the posted updates are applied once per frame.
+"""
+
+# Import built-in modules
+import threading
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "Progress", "key": "progress", "display": lambda x, y: "{}%".format(x)},
+    {"label": "Status", "key": "status"},
+    {"label": "ID", "key": "id"},
+]
+
+
+def _get_rect(top_left, bottom_right):
+    return top_left.row(), bottom_right.row(), top_left.column(), bottom_right.column()
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list([{"id": i, "name": "task{}".format(i), "progress": 0, "status": "wait"} for i in range(10)])
+    result.set_key("id")
+    result.set_tick_rate(60)
+    return result
+
+
+@pytest.fixture
+def changed_list(model):
+    result = []
+    model.dataChanged.connect(lambda top_left, bottom_right, *args: result.append(_get_rect(top_left, bottom_right)))
+    return result
+
+
+def test_post_update_needs_tick_rate(qapp):
+    model = MTableModel()
+    with pytest.raises(RuntimeError):
+        model.post_update(1, "progress", 10)
+
+
+def test_merged_updates(model, changed_list):
+    """Only the last value of a field is applied, the cells of one flush are merged into rectangles."""
+    for row in range(2, 6):
+        for progress in range(0, 101, 10):
+            model.post_update(row, "progress", progress)
+    model.post_update(2, "status", "done")
+    model.post_update(99, "status", "done")
+    assert changed_list == []
+    model.flush_updates()
+    assert sorted(changed_list) == [(2, 2, 1, 2), (3, 5, 1, 1)]
+    assert model.index(5, 1).data() == "100%"
+    assert model.index(2, 2).data() == "done"
+    assert model.get_tick_info() == {
+        "posted": 46,
+        "merged": 40,
+        "dropped": 1,
+        "applied": 5,
+        "flushes": 1,
+        "pending": 0,
+    }
+
+
+def test_unchanged_and_extra_fields(model, changed_list):
+    """The unchanged values emit nothing, a field out of header_list refreshes the whole row."""
+    model.post_update(1, "status", "wait")
+    model.flush_updates()
+    assert changed_list == []
+    model.post_update(1, "host", "farm01")
+    model.flush_updates()
+    assert changed_list == [(1, 1, 0, 3)]
+    assert model.get_data_obj(model.index(1, 0))["host"] == "farm01"
+
+
+def test_flush_while_posting(model):
+    """Flushing while the producers post keeps the counters consistent."""
+    thread_list = [
+        threading.Thread(target=lambda row=row: [model.post_update(row, "progress", i) for i in range(2000)])
+        for row in (1, 2, 99)
+    ]
+    for thread in thread_list:
+        thread.start()
+    while any(thread.is_alive() for thread in thread_list):
+        model.flush_updates()
+    model.flush_updates()
+    tick_info = model.get_tick_info()
+    assert tick_info["posted"] == 6000
+    assert tick_info["pending"] == 0
+    assert tick_info["merged"] + tick_info["applied"] + tick_info["dropped"] == 6000
+    assert model.index(2, 1).data() == "1999%"
+
+
+def test_post_from_threads(qtbot, model, changed_list):
+    """The producers post from their threads, the timer applies the updates in the main thread."""
+    thread_list = [
+        threading.Thread(target=lambda row=row: [model.post_update(row, "progress", i) for i in range(1000)])
+        for row in range(4)
+    ]
+    for thread in thread_list:
+        thread.start()
+    for thread in thread_list:
+        thread.join()
+    qtbot.waitUntil(lambda: [model.index(row, 1).data() for row in range(4)] == ["999%"] * 4)
+    assert model.get_tick_info()["posted"] == 4000
+
+    model.set_tick_rate(0)
+    with pytest.raises(RuntimeError):
+        model.post_update(0, "status", "done")
@@ -0,0 +1,122 @@
+"""
+Test the time sliced filtering of MSortFilterModel.
+"""
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets import item_model
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MSortFilterModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view_full_set import MItemViewFullSet
+
+
+HEADER_LIST = [{"label": "Name", "key": "name", "searchable": True}]
+ROW_COUNT = 20000
+
+
+def _name_set(proxy_model):
+    return {proxy_model.index(row, 0).data() for row in range(proxy_model.rowCount())}
+
+
+def _expected_set(pattern, row_count=ROW_COUNT):
+    return {"item_{}".format(i) for i in range(row_count) if pattern in "item_{}".format(i)}
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list([{"name": "item_{}".format(i)} for i in range(ROW_COUNT)])
+    return result
+
+
+@pytest.fixture
+def proxy_model(model):
+    result = MSortFilterModel()
+    result.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    result.setSourceModel(model)
+    result.set_filter_time_slice(1)
+    return result
+
+
+def test_time_slice(qtbot, proxy_model):
+    """The rows are matched over several event loop turns, the progress goes up to 100."""
+    progress_list = []
+    proxy_model.sig_filter_progress.connect(progress_list.append)
+    with qtbot.waitSignal(proxy_model.sig_filter_applied, timeout=10000):
+        proxy_model.set_search_pattern("item_1")
+        assert proxy_model.filter_slice is not None
+    assert _name_set(proxy_model) == _expected_set("item_1")
+    assert progress_list[0] == 0 and progress_list[-1] == 100
+    assert len(progress_list) > 2 and progress_list == sorted(progress_list)
+    # 缓存中的结果直接使用, 缩小范围只匹配之前匹配的行
+    proxy_model.set_search_pattern("")
+    proxy_model.set_search_pattern("item_1")
+    assert proxy_model.filter_slice is None
+    with qtbot.waitSignal(proxy_model.sig_filter_applied, timeout=10000):
+        proxy_model.set_search_pattern("item_19")
+    assert _name_set(proxy_model) == _expected_set("item_19")
+
+
+def test_partial_results(qtbot, monkeypatch, proxy_model):
+    monkeypatch.setattr(item_model, "FILTER_PARTIAL_DELAY", 0)
+    proxy_model.set_search_pattern("item_1")
+    assert 0 < proxy_model.rowCount() < len(_expected_set("item_1"))
+    assert proxy_model.filter_mask_key is None
+    with qtbot.waitSignal(proxy_model.sig_filter_applied, timeout=10000):
+        pass
+    assert _name_set(proxy_model) == _expected_set("item_1")
+
+
+def test_newer_pattern_cancels(qtbot, proxy_model):
+    applied_list = []
+    proxy_model.sig_filter_applied.connect(lambda: applied_list.append(proxy_model.search_literal))
+    proxy_model.set_search_pattern("item_1")
+    with qtbot.waitSignal(proxy_model.sig_filter_applied, timeout=10000):
+        proxy_model.set_search_pattern("item_2")
+    qtbot.wait(20)
+    assert applied_list == ["item_2"]
+    assert _name_set(proxy_model) == _expected_set("item_2")
+
+
+def test_rows_changed_during_slice(qtbot, proxy_model, model):
+    """The search starts again when the rows change, the new rows are matched too."""
+    proxy_model.set_search_pattern("item_3")
+    with qtbot.waitSignal(proxy_model.sig_filter_applied, timeout=10000):
+        model.insert_rows(0, [{"name": "item_3x"}])
+    assert _name_set(proxy_model) == _expected_set("item_3") | {"item_3x"}
+
+
+def test_small_model_at_once(qapp):
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list([{"name": "sh010"}, {"name": "sh020"}])
+    proxy_model = MSortFilterModel()
+    proxy_model.set_header_list([dict(attr_dict) for attr_dict in HEADER_LIST])
+    proxy_model.setSourceModel(model)
+    proxy_model.set_filter_time_slice()
+    proxy_model.set_search_pattern("sh02")
+    assert proxy_model.filter_slice is None
+    assert _name_set(proxy_model) == {"sh020"}
+
+
+def test_view_set_time_slice(qtbot):
+    """The view set searches after the typing pauses and shows the progress in the search line edit."""
+    view_set = MItemViewFullSet()
+    qtbot.addWidget(view_set)
+    view_set.set_header_list(HEADER_LIST)
+    view_set.setup_data([{"name": "item_{}".format(i)} for i in range(ROW_COUNT)])
+    view_set.searchable(time_slice=1)
+    view_set.search_line_edit.set_delay_duration(10)
+    progress_list = []
+    view_set.sort_filter_model.sig_filter_progress.connect(progress_list.append)
+    view_set.search_line_edit.setText("item_5")
+    assert view_set.sort_filter_model.rowCount() == ROW_COUNT
+    with qtbot.waitSignal(view_set.sort_filter_model.sig_filter_applied, timeout=10000):
+        pass
+    assert view_set.sort_filter_model.rowCount() == len(_expected_set("item_5"))
+    assert progress_list[-1] == 100
+    assert view_set.search_line_edit._progress == -1
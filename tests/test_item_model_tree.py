@@ -0,0 +1,112 @@
+"""
+Test MTableModel tree mode.
+"""
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}]
+
+
+def _make_tree():
+    return [
+        {
+            "name": "seq{}".format(i),
+            "children": [{"name": "shot", "children": [{"name": "comp"}, {"name": "light"}]} for _ in range(3)],
+        }
+        for i in range(3)
+    ]
+
+
+@pytest.fixture
+def model(qapp):
+    result = MTableModel()
+    result.set_header_list(HEADER_LIST)
+    result.set_data_list(_make_tree())
+    return result
+
+
+def test_tree_parent_row(model):
+    """parent() gives the right row even when the siblings are equal dicts."""
+    for seq_row in range(3):
+        seq_index = model.index(seq_row, 0)
+        assert not seq_index.parent().isValid()
+        for shot_row in range(3):
+            shot_index = model.index(shot_row, 0, seq_index)
+            assert shot_index.parent() == seq_index
+            task_index = model.index(1, 0, shot_index)
+            assert task_index.data() == "light"
+            assert task_index.parent().row() == shot_row
+            assert task_index.parent().parent().row() == seq_row
+
+
+def test_tree_row_cache_follow_changes(model):
+    """The row index is kept right after append/remove and data outside changes."""
+    seq_index = model.index(2, 0)
+    shot_index = model.index(0, 0, seq_index)
+    assert model.index(0, 0, shot_index).parent().parent().row() == 2
+
+    model.remove(model.get_data_list()[0])
+    seq_index = model.index(1, 0)
+    shot_index = model.index(0, 0, seq_index)
+    assert model.index(0, 0, shot_index).parent().parent().row() == 1
+
+    model.append({"name": "seq3", "children": [{"name": "shot"}]})
+    seq_index = model.index(2, 0)
+    assert model.index(0, 0, seq_index).parent().row() == 2
+
+    # 在 model 之外修改 children
+    seq_obj = model.get_data_list()[1]
+    seq_obj["children"].insert(0, {"name": "new_shot"})
+    shot_index = model.index(3, 0, model.index(1, 0))
+    assert model.index(0, 0, shot_index).parent().row() == 3
+
+
+def test_tree_get_child_row(model):
+    """get_child_row returns None for an item which is not a child."""
+    root_item = model.root_item
+    seq_obj = model.get_data_list()[1]
+    assert model.get_child_row(root_item, seq_obj) == 1
+    assert model.get_child_row(root_item, {"name": "seq1"}) is None
+    assert model.rowCount(model.index(1, 0)) == 3
+    assert model.hasChildren(model.index(0, 0, model.index(0, 0)))
+    assert not model.hasChildren(model.index(0, 0, model.index(0, 0, model.index(0, 0))))
+    assert model.index(0, 0).data(QtCore.Qt.DisplayRole) == "seq0"
+
+
+def test_tree_parent_map_keeps_rows_clean(model):
+    """The parent link is kept by the model, the user rows are never touched."""
+    seq_obj = model.get_data_list()[0]
+    shot_obj = seq_obj["children"][0]
+    task_index = model.index(0, 0, model.index(0, 0, model.index(0, 0)))
+    assert task_index.parent().parent().row() == 0
+    assert "_parent" not in seq_obj
+    assert "_parent" not in shot_obj
+    assert "_parent" not in shot_obj["children"][0]
+    assert model.get_parent_item(shot_obj) is seq_obj
+    assert model.get_parent_item(seq_obj) is None
+
+    model.remove(seq_obj)
+    assert model.get_parent_item(shot_obj) is None
+    model.set_data_list([])
+    assert not model.parent_map
+
+
+def test_tree_flatten_keeps_leaf(qapp):
+    """MItemViewMultiSet groups the leaf rows themselves, without copy."""
+    # Import local modules
+    from dayu_widgets.item_view_multi_set import MItemViewMultiSet
+
+    item_view_set = MItemViewMultiSet(tree_view=True)
+    data_list = _make_tree()
+    flat_list = item_view_set._flatten(data_list)
+    leaf = data_list[0]["children"][0]["children"][0]
+    assert len(flat_list) == 3 + 9 + 18
+    assert any(data_obj is leaf for data_obj in flat_list)
+    assert all("children" not in data_obj for data_obj in flat_list)
+    assert "children" in data_list[0]
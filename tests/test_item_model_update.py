@@ -0,0 +1,147 @@
+"""
+Test MTableModel keyed update of the data list.
+"""
+
+# Import built-in modules
+import random
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model import MColumnTableModel
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view_set import MItemViewSet
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name", "checkable": True},
+    {"label": "Status", "key": "status"},
+    {"label": "Progress", "key": "progress"},
+]
+
+
+def _make_data_list(id_list, status="wait"):
+    return [{"id": i, "name": "job{}".format(i), "status": status, "progress": 0} for i in id_list]
+
+
+def _id_list(model):
+    return [model.get_data_obj(model.index(row, 0)).get("id") for row in range(model.rowCount())]
+
+
+@pytest.fixture(params=(MTableModel, MColumnTableModel))
+def model(request, qapp):
+    result = request.param()
+    result.set_header_list(HEADER_LIST + [{"label": "ID", "key": "id"}])
+    result.set_data_list(_make_data_list(range(10)))
+    return result
+
+
+@pytest.fixture
+def signal_list(model):
+    result = []
+    model.rowsInserted.connect(lambda parent, first, last: result.append(("insert", first, last)))
+    model.rowsRemoved.connect(lambda parent, first, last: result.append(("remove", first, last)))
+    model.rowsMoved.connect(lambda parent, first, last, dest, row: result.append(("move", first, last, row)))
+    model.modelReset.connect(lambda: result.append(("reset",)))
+    model.dataChanged.connect(
+        lambda top_left, bottom_right, *args: result.append(
+            ("changed", top_left.row(), bottom_right.row(), top_left.column(), bottom_right.column())
+        )
+    )
+    return result
+
+
+def test_update_nothing_changed(model, signal_list):
+    """The same data emits nothing."""
+    model.update_data_list(_make_data_list(range(10)))
+    assert signal_list == []
+
+
+def test_update_changed_cells(model, signal_list):
+    """Only the changed cells are announced, adjacent rows are merged."""
+    data_list = _make_data_list(range(10))
+    for row in (3, 4, 7):
+        data_list[row]["status"] = "render"
+    data_list[7]["progress"] = 50
+    model.update_data_list(data_list)
+    assert signal_list == [("changed", 3, 4, 1, 1), ("changed", 7, 7, 1, 2)]
+    assert model.index(7, 2).data() == 50
+
+
+def test_update_insert_remove(model, signal_list):
+    """Removed and new rows are sent with coalesced ranges, without reset."""
+    persistent_index = QtCore.QPersistentModelIndex(model.index(5, 0))
+    model.update_data_list(_make_data_list([0, 1, 100, 101, 4, 5, 6, 9, 102]))
+    assert signal_list == [("remove", 7, 8), ("remove", 2, 3), ("insert", 2, 3), ("insert", 8, 8)]
+    assert _id_list(model) == [0, 1, 100, 101, 4, 5, 6, 9, 102]
+    assert persistent_index.row() == 5
+
+
+def test_update_move(model, signal_list):
+    """Only the rows out of the longest ordered sequence are moved."""
+    persistent_index = QtCore.QPersistentModelIndex(model.index(9, 0))
+    model.update_data_list(_make_data_list([9, 0, 1, 2, 3, 4, 5, 6, 7, 8]))
+    assert signal_list == [("move", 9, 9, 0)]
+    assert _id_list(model) == [9, 0, 1, 2, 3, 4, 5, 6, 7, 8]
+    assert persistent_index.row() == 0
+
+
+def test_update_random(model):
+    """Random updates always give the new order and values."""
+    randomizer = random.Random(0)
+    for _ in range(20):
+        id_list = randomizer.sample(range(30), randomizer.randint(0, 30))
+        data_list = _make_data_list(id_list, status=randomizer.choice(["wait", "done"]))
+        model.update_data_list(data_list)
+        assert _id_list(model) == id_list
+        assert [model.index(row, 1).data() for row in range(len(id_list))] == [x["status"] for x in data_list]
+
+
+def test_update_keep_extra_fields(qapp):
+    """The row objects are kept, with the fields the new data does not have."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    data_list = _make_data_list(range(3))
+    model.set_data_list(data_list)
+    model.setData(model.index(1, 0), QtCore.Qt.Checked, QtCore.Qt.CheckStateRole)
+    model.update_data_list(_make_data_list(range(3), status="done"))
+    assert model.get_data_list()[1] is data_list[1]
+    assert model.index(1, 0).data(QtCore.Qt.CheckStateRole) == QtCore.Qt.Checked
+    assert model.index(1, 1).data() == "done"
+    with pytest.raises(ValueError):
+        model.update_data_list(_make_data_list([1, 1]))
+
+
+def test_update_children(qapp):
+    """The children are updated recursively under the kept parent rows."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+    model.set_data_list([{"id": "a", "name": "a", "children": _make_data_list(range(3))}])
+    parent_index = model.index(0, 0)
+    child_index = QtCore.QPersistentModelIndex(model.index(2, 0, parent_index))
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((parent.row(), first, last)))
+    model.update_data_list([{"id": "a", "name": "a", "children": _make_data_list([2, 3])}])
+    assert inserted == [(0, 1, 1)]
+    assert model.rowCount(parent_index) == 2
+    assert child_index.row() == 0
+    assert child_index.parent() == parent_index
+    assert model.index(1, 0, parent_index).data() == "job3"
+
+
+def test_item_view_set_update_data(qapp):
+    """MItemViewSet.update_data keeps the selection."""
+    item_view_set = MItemViewSet()
+    item_view_set.set_header_list(HEADER_LIST)
+    item_view_set.setup_data(_make_data_list(range(5)))
+    selection_model = item_view_set.item_view.selectionModel()
+    selection_model.select(
+        item_view_set.sort_filter_model.index(3, 0),
+        QtCore.QItemSelectionModel.Select | QtCore.QItemSelectionModel.Rows,
+    )
+    item_view_set.update_data(_make_data_list([0, 3, 4], status="done"))
+    selected_list = selection_model.selectedRows()
+    assert [index.row() for index in selected_list] == [1]
+    assert selected_list[0].data() == "job3"
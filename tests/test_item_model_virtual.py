@@ -0,0 +1,161 @@
+"""
+Test MVirtualTableModel loading the row blocks from a data source.
+"""
+
+# Import built-in modules
+import sqlite3
+import threading
+
+# Import third-party modules
+import pytest
+from qtpy import QtCore
+
+# Import local modules
+from dayu_widgets.item_model_virtual import ListDataSource
+from dayu_widgets.item_model_virtual import MVirtualTableModel
+from dayu_widgets.item_model_virtual import SqliteDataSource
+from dayu_widgets.item_view import MTableView
+
+
+HEADER_LIST = [
+    {"label": "Name", "key": "name"},
+    {"label": "Size", "key": "size", "display": lambda x, y: "{} MB".format(x)},
+]
+
+
+def _make_data_list(count):
+    return [{"name": "n{}".format(i), "size": i % 7 or None} for i in range(count)]
+
+
+class RecordDataSource(ListDataSource):
+    """Record the fetch calls and their threads."""
+
+    def __init__(self, data_list):
+        super(RecordDataSource, self).__init__(data_list)
+        self.fetch_list = []
+        self.thread_set = set()
+
+    def fetch(self, offset, limit, sort=None, filter=None):
+        self.fetch_list.append(offset)
+        self.thread_set.add(threading.current_thread())
+        return super(RecordDataSource, self).fetch(offset, limit, sort, filter)
+
+
+@pytest.fixture
+def data_source():
+    return RecordDataSource(_make_data_list(1000))
+
+
+@pytest.fixture
+def model(qapp, data_source):
+    result = MVirtualTableModel(data_source, block_size=100)
+    result.set_header_list(HEADER_LIST)
+    return result
+
+
+def test_list_data_source():
+    """The rows are sorted with None as the biggest value, filtered and sliced."""
+    data_source = ListDataSource(_make_data_list(20))
+    assert data_source.count() == 20
+    assert [row["name"] for row in data_source.fetch(18, 5)] == ["n18", "n19"]
+    keep_small = lambda row: row["size"] is None or row["size"] < 3  # noqa: E731
+    assert data_source.count(keep_small) == 9
+    row_list = data_source.fetch(0, 20, [("size", True), ("name", False)], keep_small)
+    assert [row["name"] for row in row_list] == ["n0", "n14", "n7", "n16", "n2", "n9", "n1", "n15", "n8"]
+
+
+def test_sqlite_data_source():
+    """The sort and filter are passed to the query."""
+    connection = sqlite3.connect(":memory:", check_same_thread=False)
+    connection.execute("CREATE TABLE job (name TEXT, size INTEGER)")
+    connection.executemany("INSERT INTO job VALUES (:name, :size)", _make_data_list(20))
+    data_source = SqliteDataSource(connection, "job")
+    assert data_source.count() == 20
+    assert data_source.count(("size < ?", [3])) == 6
+    assert data_source.fetch(0, 2) == [{"name": "n0", "size": None}, {"name": "n1", "size": 1}]
+    row_list = data_source.fetch(1, 3, [("size", True), ("name", False)], "size IS NULL OR size < 3")
+    assert [row["name"] for row in row_list] == ["n14", "n7", "n16"]
+    row_list = SqliteDataSource(connection, "job", ["name"]).fetch(16, 10, [("size", False), ("name", False)])
+    assert row_list == [{"name": "n6"}, {"name": "n0"}, {"name": "n14"}, {"name": "n7"}]
+
+
+def test_load_blocks(qtbot, model, data_source):
+    """The block of the read row and its neighbours are loaded on a worker thread."""
+    assert model.rowCount() == 1000
+    assert model.columnCount() == 2
+    assert model.headerData(1, QtCore.Qt.Horizontal) == "Size"
+    assert model.index(250, 0).data() == "Loading..."
+    assert model.index(250, 1).data() is None
+    changed_list = []
+    model.dataChanged.connect(lambda top_left, bottom_right, *args: changed_list.append(top_left.row()))
+    qtbot.waitUntil(lambda: len(changed_list) == 3)
+    assert sorted(changed_list) == [100, 200, 300]
+    assert threading.main_thread() not in data_source.thread_set
+    assert (model.index(250, 0).data(), model.index(250, 1).data()) == ("n250", "5 MB")
+    assert model.get_data_obj(model.index(399, 0))["name"] == "n399"
+    assert model.get_data_obj(model.index(400, 0)) is None
+
+
+def test_lru_cache(qtbot, model, data_source):
+    """The least recently used blocks are dropped over the memory budget."""
+    model.prefetch_blocks = 0
+    model.max_cache_bytes = 1
+    for row in (0, 500, 0):
+        model.index(row, 0).data()
+        qtbot.waitUntil(lambda row=row: model.index(row, 0).data() == "n{}".format(row))
+        assert list(model.block_cache) == [row // 100]
+    assert data_source.fetch_list == [0, 500, 0]
+
+
+def test_sort_and_filter(qtbot, model):
+    """Sorting and filtering are done by the data source, the old blocks are dropped."""
+    model.index(0, 0).data()
+    qtbot.waitUntil(lambda: model.index(0, 0).data() == "n0")
+    reset_list = []
+    model.modelReset.connect(lambda: reset_list.append(True))
+    model.sort(1, QtCore.Qt.AscendingOrder)
+    assert reset_list == [True]
+    assert model.index(0, 0).data() == "Loading..."
+    qtbot.waitUntil(lambda: model.index(0, 0).data() == "n1")
+    model.set_filter(lambda row: row["name"].endswith("99"))
+    assert model.rowCount() == 10
+    qtbot.waitUntil(lambda: model.index(0, 0).data() == "n99")
+    assert model.index(9, 0).data() == "n399"
+
+
+def test_stale_and_failed_blocks(qtbot, qapp):
+    """The blocks loaded before a refresh are dropped, the failures are reported."""
+    event = threading.Event()
+
+    class SlowDataSource(ListDataSource):
+        def fetch(self, offset, limit, sort=None, filter=None):
+            event.wait(5)
+            if self.data_list[0] == "fail":
+                raise IOError("offline")
+            return super(SlowDataSource, self).fetch(offset, limit, sort, filter)
+
+    model = MVirtualTableModel(SlowDataSource([{"name": "old"}]))
+    model.set_header_list(HEADER_LIST)
+    model.index(0, 0).data()
+    model.set_data_source(SlowDataSource(["fail"]))
+    failed_list = []
+    model.sig_fetch_failed.connect(lambda offset, message: failed_list.append((offset, message)))
+    model.index(0, 0).data()
+    event.set()
+    qtbot.waitUntil(lambda: failed_list == [(0, "OSError: offline")])
+    qtbot.waitUntil(lambda: not model.running_loader_set)
+    assert model.block_cache == {}
+
+
+def test_table_view(qtbot, qapp):
+    """MTableView sorts through the model and shows the loaded rows of a big source."""
+    model = MVirtualTableModel(ListDataSource(_make_data_list(100000)))
+    model.set_header_list(HEADER_LIST)
+    view = MTableView()
+    qtbot.addWidget(view)
+    view.setModel(model)
+    view.set_header_list(HEADER_LIST)
+    view.show()
+    view.scrollTo(model.index(60000, 0))
+    qtbot.waitUntil(lambda: view.indexAt(QtCore.QPoint(5, 5)).data() not in (None, "Loading..."))
+    assert model.row_count == 100000
@@ -0,0 +1,120 @@
+"""
+Test setup_data_async of the item view sets.
+"""
+
+# Import built-in modules
+import threading
+
+# Import third-party modules
+import pytest
+
+# Import local modules
+from dayu_widgets.item_model import MTableModel
+from dayu_widgets.item_view_full_set import MItemViewFullSet
+from dayu_widgets.item_view_multi_set import MItemViewMultiSet
+from dayu_widgets.item_view_set import MItemViewSet
+
+
+HEADER_LIST = [{"label": "Name", "key": "name"}, {"label": "Status", "key": "status"}]
+
+
+def _make_loader(count, event=None):
+    def _load():
+        if event is not None:
+            event.wait(5)
+        for i in range(count):
+            yield {"name": "job{}".format(i), "status": "done" if i % 2 else "wait"}
+
+    return _load
+
+
+@pytest.fixture(params=(MItemViewSet, MItemViewFullSet, MItemViewMultiSet))
+def item_view_set(request, qtbot):
+    result = request.param()
+    result.set_header_list(HEADER_LIST)
+    qtbot.addWidget(result)
+    return result
+
+
+def test_setup_data_async(qtbot, item_view_set):
+    """The loading mask is shown until the first chunk, the rows are inserted by chunk."""
+    event = threading.Event()
+    inserted = []
+    item_view_set.source_model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+    item_view_set.setup_data_async(_make_loader(25, event), chunk_size=10)
+    assert item_view_set.loading_wrapper.get_dayu_loading()
+    assert item_view_set.source_model.rowCount() == 0
+    event.set()
+    with qtbot.waitSignal(item_view_set.source_model.sig_fetch_finished):
+        pass
+    assert not item_view_set.loading_wrapper.get_dayu_loading()
+    assert inserted == [(0, 9), (10, 19), (20, 24)]
+    assert item_view_set.get_data()[24]["name"] == "job24"
+
+
+def test_newer_load_cancels(qtbot, item_view_set):
+    """A newer load cancels the running one, its chunks are dropped."""
+    event = threading.Event()
+    item_view_set.setup_data_async(_make_loader(100, event))
+    item_view_set.setup_data_async(_make_loader(3))
+    with qtbot.waitSignal(item_view_set.source_model.sig_fetch_finished):
+        pass
+    event.set()
+    qtbot.waitUntil(lambda: not item_view_set.source_model.running_loader_set)
+    assert item_view_set.source_model.rowCount() == 3
+
+    item_view_set.setup_data_async(_make_loader(100, event))
+    item_view_set.setup_data([{"name": "a"}])
+    qtbot.waitUntil(lambda: not item_view_set.source_model.running_loader_set)
+    assert item_view_set.source_model.rowCount() == 1
+    assert not item_view_set.loading_wrapper.get_dayu_loading()
+
+
+def test_multi_set_group_after_loaded(qtbot):
+    """MItemViewMultiSet applies the grouping when all the data is loaded."""
+    item_view_set = MItemViewMultiSet(tree_view=True).groupable()
+    item_view_set.set_header_list(HEADER_LIST)
+    qtbot.addWidget(item_view_set)
+    item_view_set.group_combo.setCurrentIndex(2)
+    with qtbot.waitSignal(item_view_set.source_model.sig_fetch_finished):
+        item_view_set.setup_data_async(_make_loader(6), chunk_size=4)
+    assert len(item_view_set.raw_data_list) == 6
+    assert [data_dict["name"] for data_dict in item_view_set.source_model.get_data_list()] == ["done (3)", "wait (3)"]
+
+
+def test_loader_failed(qtbot, qapp):
+    """A failed root loader keeps the loaded rows and emits sig_fetch_failed."""
+    model = MTableModel()
+    model.set_header_list(HEADER_LIST)
+
+    def _load():
+        yield {"name": "a"}
+        raise ValueError("broken")
+
+    with qtbot.waitSignal(model.sig_fetch_failed) as blocker:
+        model.set_data_loader(_load, chunk_size=1)
+    assert blocker.args == [None, "ValueError: broken"]
+    assert model.rowCount() == 1
+
+
+def test_multi_set_child_fetch_keeps_raw_data(qtbot):
+    """The lazy children loaded or failed after the grouping do not group the groups again."""
+    item_view_set = MItemViewMultiSet(tree_view=True).groupable()
+    item_view_set.set_header_list(HEADER_LIST)
+    qtbot.addWidget(item_view_set)
+    item_view_set.group_combo.setCurrentIndex(2)
+
+    def _load_children():
+        raise ValueError("broken")
+
+    def _load():
+        return [{"name": "a", "status": "done", "children": _load_children}, {"name": "b", "status": "wait"}]
+
+    with qtbot.waitSignal(item_view_set.source_model.sig_fetch_finished):
+        item_view_set.setup_data_async(_load)
+    raw_data_list = list(item_view_set.raw_data_list)
+    model = item_view_set.source_model
+    with qtbot.waitSignal(model.sig_fetch_failed):
+        model.fetch_children(model.index(0, 0, model.index(0, 0)))
+    assert item_view_set.raw_data_list == raw_data_list
+    assert [data_dict["name"] for data_dict in model.get_data_list()] == ["done (1)", "wait (1)"]